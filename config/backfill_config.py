@@ -0,0 +1,13 @@
+"""
+マルチプロセス・バックフィル設定（src/backfill_executor.py）
+"""
+import os
+
+# (年, カテゴリ)単位の作業を並列に実行するワーカープロセス数
+BACKFILL_MAX_WORKERS = int(os.getenv('BACKFILL_MAX_WORKERS', '4'))
+
+# 全ワーカー合計でBloombergに同時発行するリクエスト数の上限（端末のAPI同時リクエスト制限に合わせる）
+BACKFILL_BLOOMBERG_CONCURRENCY = int(os.getenv('BACKFILL_BLOOMBERG_CONCURRENCY', '2'))
+
+# 完了済み作業単位の進捗ファイル（中断後の再開用）
+BACKFILL_PROGRESS_FILE = 'fetch_25years_progress.json'
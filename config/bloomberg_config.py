@@ -1,12 +1,24 @@
 """
 Bloomberg ティッカーとフィールドの定義
 """
+import os
 from datetime import datetime, timedelta
 
 # Bloomberg API設定
 BLOOMBERG_HOST = "localhost"
 BLOOMBERG_PORT = 8194
 
+# イベント待ちのタイムアウト（ミリ秒）と、応答が途絶えたとみなして打ち切る連続タイムアウト回数
+BLOOMBERG_EVENT_TIMEOUT_MS = 20000
+BLOOMBERG_MAX_IDLE_TIMEOUTS = 3
+
+# リクエスト分割（src/request_planner.py）
+# 1リクエストあたりの証券数上限と、推定データ点数（証券数 × フィールド数 × 営業日数）の上限
+MAX_SECURITIES_PER_REQUEST = 100
+MAX_DATA_POINTS_PER_REQUEST = 200000
+# 1セッションで同時に処理中とするリクエスト数
+MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS', '4'))
+
 # データ取得期間設定
 INITIAL_LOAD_PERIODS = {
     'prices': 20,  # 年
@@ -18,8 +30,39 @@ INITIAL_LOAD_PERIODS = {
     'stocks': 20  # 年
 }
 
+# 初回ロードのストリーミング分割日数（カテゴリの期間をこの日数ごとに取得・格納・破棄してメモリ使用量を一定に保つ。0で分割しない）
+INITIAL_LOAD_CHUNK_DAYS = int(os.getenv('INITIAL_LOAD_CHUNK_DAYS', '365'))
+
+# 初回ロードのチェックポイント（カテゴリごとの格納完了日。中断後の再実行で続きから取得する）
+INITIAL_LOAD_CHECKPOINT_FILE = os.getenv(
+    'INITIAL_LOAD_CHECKPOINT_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'initial_load_checkpoint.json')
+)
+
+# 静的リファレンスデータのキャッシュ（src/reference_cache.py）。(証券, フィールド)単位で保持する
+REFERENCE_CACHE_FILE = os.getenv(
+    'REFERENCE_CACHE_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'reference_cache.sqlite3')
+)
+
+# キャッシュ対象フィールドと有効期間（日）。ここにないフィールドは常にBloombergから取得する
+REFERENCE_CACHE_TTL_DAYS = {
+    'FUT_CONT_SIZE': 365,
+    'FUT_TICK_SIZE': 365,
+    'FUT_CONTRACT_DT': 365,
+    'FUT_MONTH_YR': 365,
+    'NAME': 365,
+    'EXCH_CODE': 365,
+    'LAST_TRADEABLE_DT': 90,
+    'FUT_DLV_DT_LAST': 90,
+}
+
+# キャッシュするのは実契約（LPN25等）等の値が変わらない証券のみ。ジェネリック先物（LP1等）は常に取得する
+# 値の日付を過ぎたら期限切れとするフィールド（満期を過ぎた契約の値を使い続けないため）
+REFERENCE_CACHE_EXPIRING_DATE_FIELDS = ['LAST_TRADEABLE_DT', 'FUT_DLV_DT_LAST']
+
 # Bloomberg フィールド定義
-PRICE_FIELDS = ['PX_LAST', 'PX_OPEN', 'PX_HIGH', 'PX_LOW', 'PX_VOLUME', 'OPEN_INT', 'FUT_DLV_DT']
+PRICE_FIELDS = ['PX_LAST', 'PX_OPEN', 'PX_HIGH', 'PX_LOW', 'PX_VOLUME', 'OPEN_INT']
 INVENTORY_FIELDS = ['PX_LAST', 'LAST_PRICE', 'CUR_MKT_VALUE']
 INDICATOR_FIELDS = ['PX_LAST']
 STOCK_FIELDS = ['PX_LAST', 'PX_OPEN', 'PX_HIGH', 'PX_LOW', 'PX_VOLUME']
@@ -197,6 +240,7 @@ BLOOMBERG_TICKERS = {
         },
         'fields': INVENTORY_FIELDS,
         'table': 'T_BandingReport',
+        'report_types': {'long': 'Futures Long', 'short': 'Futures Short'},
         'band_mapping': {
             'A': '5-9%', 'B': '10-19%', 'C': '20-29%', 'D': '30-39%', 'E': '40+%',
             'F': '5-9%', 'G': '10-19%', 'H': '20-29%', 'I': '30-39%', 'J': '40+%'
@@ -212,6 +256,7 @@ BLOOMBERG_TICKERS = {
         },
         'fields': INVENTORY_FIELDS,
         'table': 'T_BandingReport',
+        'report_types': {'warrant': 'Warrant', 'cash': 'Cash', 'tom': 'Tom'},
         'band_mapping': {
             'A': '30-39%', 'B': '40-49%', 'C': '50-79%', 'D': '80-89%', 'E': '90+%'
         }
@@ -231,7 +276,13 @@ BLOOMBERG_TICKERS = {
         },
         'fields': INVENTORY_FIELDS,
         'table': 'T_COTR',
-        'frequency': 'Weekly'
+        'frequency': 'Weekly',
+        'category_names': {
+            'investment_funds': 'Investment Funds',
+            'commercial': 'Commercial Undertakings'
+        },
+        # 各long/shortリスト内の並び順（ポジション、建玉比率）
+        'measure_order': ['Position', 'PctOpenInterest']
     },
     
     # エネルギー価格
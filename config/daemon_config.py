@@ -0,0 +1,22 @@
+"""
+常駐モード（デーモン）設定
+"""
+import os
+
+# ジョブキューのディレクトリ（pending/processing/done/failed のサブディレクトリを使用）
+DAEMON_QUEUE_DIR = os.getenv(
+    'DAEMON_QUEUE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'daemon_queue')
+)
+
+# ジョブキュー・スケジュールの確認間隔（秒）
+DAEMON_POLL_INTERVAL = 30
+
+# マスタデータの再ロード間隔（秒）
+MASTER_DATA_REFRESH_INTERVAL = 6 * 60 * 60
+
+# refetchジョブのデフォルト遡及日数
+DEFAULT_REFETCH_DAYS = 7
+
+# 停止要求ファイル名（キューディレクトリ直下に置くと次のポーリングで停止）
+DAEMON_STOP_FILE = 'STOP'
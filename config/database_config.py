@@ -81,9 +81,80 @@ TABLE_UNIQUE_KEYS = {
     'T_CompanyStockPrice': ['TradeDate', 'CompanyTicker']
 }
 
+# テーブルごとの日付カラム（一括INSERT判定で既存データの有無を確認する範囲）
+TABLE_DATE_COLUMNS = {
+    'T_CommodityPrice': 'TradeDate',
+    'T_CommodityPrice_V2': 'TradeDate',
+    'T_LMEInventory': 'ReportDate',
+    'T_OtherExchangeInventory': 'ReportDate',
+    'T_MarketIndicator': 'ReportDate',
+    'T_MacroEconomicIndicator': 'ReportDate',
+    'T_COTR': 'ReportDate',
+    'T_BandingReport': 'ReportDate',
+    'T_CompanyStockPrice': 'TradeDate'
+}
+
+# データタイプ別のMERGE照合キー（フィルター付き一意インデックスと同じ列で照合する）
+# テーブル名 -> (判別カラム, {判別値: 照合カラム})。該当しない行はユニークキー全体で照合する
+MERGE_KEY_SHAPES = {
+    'T_CommodityPrice': ('DataType', {
+        'Generic': ['TradeDate', 'GenericID'],
+        'Actual': ['TradeDate', 'ActualContractID']
+    }),
+    'T_CommodityPrice_V2': ('DataType', {
+        'Generic': ['TradeDate', 'GenericID'],
+        'Actual': ['TradeDate', 'ActualContractID']
+    })
+}
+
+# マスタデータのローカルスナップショット（DatabaseManager.load_master_data）
+# 変更トークン（行数・最大ID・チェックサム）が一致するテーブルはスナップショットから読み、差分のみ取得する
+MASTER_SNAPSHOT_FILE = os.getenv(
+    'MASTER_SNAPSHOT_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'master_snapshot.pkl')
+)
+
 # バッチサイズ設定
 BATCH_SIZE = 1000
 
+# バックフィルで対象キー範囲に既存行がない場合の一括INSERT（MERGEを使わない）
+# 1回のコミットあたりの行数
+BULK_INSERT_BATCH_SIZE = 100000
+# 一括INSERTの前後で非一意の非クラスタ化インデックスを無効化・再構築する（行数がBULK_INSERT_INDEX_MIN_ROWS以上の場合）
+BULK_INSERT_DISABLE_INDEXES = os.getenv('BULK_INSERT_DISABLE_INDEXES', 'false').lower() == 'true'
+BULK_INSERT_INDEX_MIN_ROWS = 200000
+
+# 書き込みバッファ（DatabaseManager.buffer_upsert）
+# テーブルごとに加工済みデータを蓄積し、行数または経過秒数が上限に達した時点、またはflush_writesでまとめて格納する
+WRITE_BUFFER_MAX_ROWS = int(os.getenv('WRITE_BUFFER_MAX_ROWS', '50000'))
+WRITE_BUFFER_MAX_SECONDS = int(os.getenv('WRITE_BUFFER_MAX_SECONDS', '300'))
+
+# パーティションSWITCHによるバックフィルロード（sql/columnstore/ は任意の手動移行のため、適用後に明示的に有効化する）
+ENABLE_PARTITION_SWITCH = os.getenv('ENABLE_PARTITION_SWITCH', 'false').lower() == 'true'
+
+# 月次パーティション化されたテーブル（sql/columnstore/ 適用後、ENABLE_PARTITION_SWITCHが有効な場合に使用）
+# バックフィル時はステージテーブルに一括ロードし、パーティションSWITCHで本テーブルに反映する
+PARTITIONED_TABLES = {
+    'T_CommodityPrice': {
+        'stage_table': 'T_CommodityPrice_Stage',
+        'prepare_procedure': 'dbo.sp_PrepareCommodityPriceStage',
+        'switch_procedure': 'dbo.sp_SwitchInCommodityPriceStage'
+    }
+}
+
+# パーティションSWITCH経由でロードする最小行数（これ未満は通常のMERGE）
+PARTITION_SWITCH_MIN_ROWS = 50000
+
+# 満期・営業日情報のマテリアライズテーブルを差分リフレッシュする手続き
+# （sql/views/create_commodity_price_enriched.sql）
+ENRICHED_REFRESH_PROCEDURE = 'dbo.sp_RefreshCommodityPriceEnriched'
+
 # リトライ設定
 MAX_RETRIES = 3
-RETRY_DELAY = 5  # seconds
\ No newline at end of file
+RETRY_DELAY = 5  # seconds
+
+# UPSERTで失敗した行の隔離先ディレクトリ（JSON Lines形式）
+QUARANTINE_DIR = os.getenv(
+    'QUARANTINE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'quarantine')
+)
\ No newline at end of file
@@ -1,18 +1,30 @@
 """
 ロギング設定
 """
+import atexit
 import os
 import sys
+import threading
+from collections import Counter
 from loguru import logger
 from datetime import datetime
 
-# ログディレクトリの作成
+# ログディレクトリ（ファイルは最初の書き込み時に作成される）
 LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
-os.makedirs(LOG_DIR, exist_ok=True)
 
 # ログファイル名（日付付き）
 LOG_FILENAME = os.path.join(LOG_DIR, f"bloomberg_ingestion_{datetime.now().strftime('%Y%m%d')}.log")
 
+# シンクへの書き込みをバックグラウンドスレッドで行う（呼び出し側はキューに積むだけで、書式化後のディスクI/O・
+# ローテーション時の圧縮を待たない。プロセス内のスレッド間でも安全）
+# spawnで起動したバックフィルのワーカーはこのモジュールを再インポートして各自のシンクを追加するため、
+# 同じファイルへの書き込み・ローテーションはプロセス間で調停されない点に注意
+LOG_ENQUEUE = os.getenv('LOG_ENQUEUE', 'true').lower() == 'true'
+
+# 繰り返しメッセージのサンプリング（sampled_logger）: メッセージごとに最初のN件と、以降M件ごとに1件を出力
+LOG_SAMPLE_FIRST = int(os.getenv('LOG_SAMPLE_FIRST', '5'))
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', '1000'))
+
 # ロガーの設定
 def setup_logger():
     """
@@ -26,7 +38,8 @@ def setup_logger():
         sys.stdout,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
         level="INFO",
-        colorize=True
+        colorize=True,
+        enqueue=LOG_ENQUEUE
     )
     
     # ファイル出力（DEBUG以上）
@@ -37,7 +50,9 @@ def setup_logger():
         rotation="100 MB",
         retention="30 days",
         compression="zip",
-        encoding="utf-8"
+        encoding="utf-8",
+        delay=True,
+        enqueue=LOG_ENQUEUE
     )
     
     # エラーログ専用ファイル
@@ -47,10 +62,89 @@ def setup_logger():
         level="ERROR",
         rotation="50 MB",
         retention="60 days",
-        encoding="utf-8"
+        encoding="utf-8",
+        delay=True,
+        enqueue=LOG_ENQUEUE
     )
     
     return logger
 
+
+
+class SampledLogger:
+    """
+    行ごとのループ等で繰り返し出力されるメッセージのサンプリング
+
+    メッセージテンプレート（またはkey）ごとに最初のLOG_SAMPLE_FIRST件と、以降LOG_SAMPLE_EVERY件ごとに1件のみ出力し、
+    出力しなかった件数を数えてlog_summaryでまとめて出力する。引数はloguruの遅延書式化（"{}"）で渡す
+    """
+
+    def __init__(self, first: int = LOG_SAMPLE_FIRST, every: int = LOG_SAMPLE_EVERY):
+        """
+        Args:
+            first: メッセージごとに必ず出力する件数
+            every: first件以降、何件ごとに1件出力するか
+        """
+        self.first = first
+        self.every = max(1, every)
+        self.counts: Counter = Counter()
+        self.suppressed: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def log(self, level: str, message: str, *args, key: str = None, **kwargs):
+        """
+        サンプリングしてログ出力
+
+        Args:
+            level: ログレベル
+            message: メッセージテンプレート（例: "マッピングが見つかりません: GenericID={}"）
+            *args: テンプレートの引数（出力する場合のみ書式化される）
+            key: 集計キー（Noneの場合はメッセージテンプレート）
+            **kwargs: テンプレートのキーワード引数
+        """
+        key = key or message
+        with self._lock:
+            self.counts[key] += 1
+            count = self.counts[key]
+            emit = count <= self.first or count % self.every == 0
+            if not emit:
+                self.suppressed[key] += 1
+        if emit:
+            # 呼び出し元（debug/info等を呼んだ関数）の位置を記録する
+            logger.opt(depth=2).log(level, message, *args, **kwargs)
+
+    def debug(self, message: str, *args, **kwargs):
+        self.log('DEBUG', message, *args, **kwargs)
+
+    def info(self, message: str, *args, **kwargs):
+        self.log('INFO', message, *args, **kwargs)
+
+    def warning(self, message: str, *args, **kwargs):
+        self.log('WARNING', message, *args, **kwargs)
+
+    def error(self, message: str, *args, **kwargs):
+        self.log('ERROR', message, *args, **kwargs)
+
+    def log_summary(self):
+        """抑制した件数をメッセージごとに出力し、カウンタをリセット"""
+        with self._lock:
+            suppressed, counts = dict(self.suppressed), dict(self.counts)
+            self.suppressed.clear()
+            self.counts.clear()
+        for key, count in sorted(suppressed.items(), key=lambda item: -item[1]):
+            logger.info("Suppressed {} of {} repeated log messages: {}", count, counts[key], key)
+
+
 # ロガーの初期化
-logger = setup_logger()
\ No newline at end of file
+logger = setup_logger()
+
+# 繰り返しメッセージ用のサンプリングロガー（抑制件数は終了時にも出力）
+sampled_logger = SampledLogger()
+
+
+def log_suppression_summary():
+    """サンプリングで抑制したメッセージの件数を出力"""
+    sampled_logger.log_summary()
+
+
+atexit.register(log_suppression_summary)
\ No newline at end of file
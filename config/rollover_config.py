@@ -0,0 +1,12 @@
+"""
+ロールオーバー・ジェネリック契約マッピング設定
+"""
+import os
+
+# 自動ロールオーバー時にマッピングを事前計算する先行期間（営業日）
+ROLLOVER_HORIZON_TRADING_DAYS = 60
+
+# 価格処理時に不足マッピングをその場で生成しない（EnhancedDataProcessorV2の既定値）
+# 既定は生成する（False）。先行マッピングは限月が連続する範囲のみ書き込まれ、当日分はFUT_CUR_GEN_TICKERで
+# 照合されるが、限月の欠けで書き込まれない日は価格処理時に生成する必要がある
+DISABLE_INLINE_MAPPING = os.getenv('DISABLE_INLINE_MAPPING', 'false').lower() == 'true'
@@ -38,9 +38,9 @@ def fetch_data_with_auto_mapping(start_date: str, end_date: str, categories: lis
         # マスターデータのロード
         ingestor.db_manager.load_master_data()
         
-        # Enhanced Data Processorの初期化
+        # Enhanced Data Processorの初期化（期間指定の取得は先行マッピングの範囲外のため、その場で生成）
         from enhanced_data_processor_v2 import EnhancedDataProcessorV2
-        ingestor.processor = EnhancedDataProcessorV2(ingestor.db_manager)
+        ingestor.processor = EnhancedDataProcessorV2(ingestor.db_manager, inline_mapping=True)
         
         # 日付フォーマット変換
         start_date_bloomberg = start_date.replace('-', '')
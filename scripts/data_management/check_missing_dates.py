@@ -3,17 +3,18 @@
 """
 import sys
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import pandas as pd
 
 # プロジェクトルートを追加
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.database import DatabaseManager
+from src.trading_calendar import get_trading_calendar
 from config.logging_config import logger
 
-def check_missing_dates(days_back=30):
-    """過去N日間のデータ欠損をチェック"""
+def check_missing_dates(days_back=30, exchange='LME'):
+    """過去N日間のデータ欠損をチェック（営業日は取引所カレンダーで判定）"""
     
     db_manager = DatabaseManager()
     db_manager.connect()
@@ -36,9 +37,9 @@ def check_missing_dates(days_back=30):
             existing_dates = pd.read_sql(query, conn, params=(start_date, end_date))
             existing_dates['TradeDate'] = pd.to_datetime(existing_dates['TradeDate']).dt.date
         
-        # 営業日を生成（簡易版：土日を除く）
-        business_days = pd.bdate_range(start=start_date, end=end_date, freq='B')
-        business_days = [d.date() for d in business_days]
+        # 取引所の営業日（M_TradingCalendarの休場日を除外）
+        calendar = get_trading_calendar(db_manager)
+        business_days = calendar.trading_days(start_date, end_date, exchange).astype(date).tolist()
         
         # 欠損日を検出
         existing_set = set(existing_dates['TradeDate'].tolist())
@@ -46,22 +47,22 @@ def check_missing_dates(days_back=30):
         
         if missing_dates:
             logger.warning(f"Found {len(missing_dates)} missing dates:")
-            for date in missing_dates:
-                logger.warning(f"  - {date}")
+            for missing_date in missing_dates:
+                logger.warning(f"  - {missing_date}")
             
-            # 連続する欠損期間を検出
+            # 連続する欠損期間を検出（休場日を挟んでも翌営業日なら連続とみなす）
             missing_ranges = []
             if missing_dates:
                 current_start = missing_dates[0]
                 current_end = missing_dates[0]
                 
-                for date in missing_dates[1:]:
-                    if (date - current_end).days <= 1:
-                        current_end = date
+                for missing_date in missing_dates[1:]:
+                    if calendar.trading_days_between(current_end, missing_date, exchange) <= 1:
+                        current_end = missing_date
                     else:
                         missing_ranges.append((current_start, current_end))
-                        current_start = date
-                        current_end = date
+                        current_start = missing_date
+                        current_end = missing_date
                 
                 missing_ranges.append((current_start, current_end))
             
@@ -104,10 +105,11 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Check and fill missing data')
     parser.add_argument('--days', type=int, default=30, help='Number of days to check')
     parser.add_argument('--auto-fill', action='store_true', help='Automatically fill missing data')
+    parser.add_argument('--exchange', default='LME', help='Exchange calendar for business days (LME/SHFE/CMX)')
     
     args = parser.parse_args()
     
-    missing_ranges = check_missing_dates(args.days)
+    missing_ranges = check_missing_dates(args.days, args.exchange)
     
     if missing_ranges and args.auto_fill:
         auto_fill_missing_data(missing_ranges)
@@ -7,7 +7,8 @@ echo ===================================================
 echo.
 echo WARNING: This will fetch 25 years of data!
 echo This process may take several hours.
-echo The script will process data year by year and save progress.
+echo The script splits the work into (year, category) units, runs them in parallel
+echo worker processes and saves progress after each unit.
 echo If interrupted, you can resume from where it stopped.
 echo.
 echo Data to be fetched:
@@ -27,11 +28,13 @@ if /i not "%confirm%"=="Y" (
 
 echo.
 echo Starting 25-year data fetch...
-echo Check fetch_25years.log for detailed progress
+echo Check logs\bloomberg_ingestion_*.log for detailed progress
 echo.
 
 REM Execute with specific year range if needed
 REM python src/fetch_25years_data.py 2000 2024
+REM Worker processes / Bloomberg concurrent requests (default: BACKFILL_MAX_WORKERS / BACKFILL_BLOOMBERG_CONCURRENCY)
+REM python src/fetch_25years_data.py --workers 6 --bloomberg-concurrency 3
 
 REM Default: last 25 years
 python src/fetch_25years_data.py
@@ -189,7 +189,7 @@ class ContractDateVerifier:
             batch_tickers = tickers[i:i+batch_size]
             
             try:
-                ref_data = self.bloomberg.get_reference_data(batch_tickers, fields)
+                ref_data = self.bloomberg.get_static_reference_data(batch_tickers, fields)
                 
                 if not ref_data.empty:
                     for _, row in ref_data.iterrows():
@@ -0,0 +1,93 @@
+"""
+起動時間（インポート時間）のベンチマーク
+python -X importtime の結果を集計し、閾値超過や重いモジュールの即時読み込みを検出する
+
+使用例:
+    python scripts/testing/benchmark_import_time.py
+    python scripts/testing/benchmark_import_time.py --module utils --threshold-ms 200
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+src_dir = os.path.join(project_root, 'src')
+
+# 起動時に読み込まれてはいけない重いモジュール
+HEAVY_MODULES = ('pandas', 'numpy', 'pyodbc', 'blpapi', 'sqlalchemy')
+
+# 起動時間の上限（ミリ秒）
+DEFAULT_THRESHOLD_MS = 300
+
+IMPORTTIME_PATTERN = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure_import_time(module: str) -> dict:
+    """
+    指定モジュールのインポート時間を計測
+
+    Args:
+        module: 計測対象モジュール名（src配下）
+
+    Returns:
+        dict: モジュール名 -> (自身の時間us, 累積時間us, ネスト深さ)
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [project_root, src_dir, env.get('PYTHONPATH')]))
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=src_dir, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to import {module}:\n{result.stderr}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            timings[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time benchmark')
+    parser.add_argument('--module', default='main', help='Module to import (default: main)')
+    parser.add_argument('--threshold-ms', type=float, default=DEFAULT_THRESHOLD_MS,
+                        help=f'Regression threshold in milliseconds (default: {DEFAULT_THRESHOLD_MS})')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs (best is used)')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to show')
+    args = parser.parse_args()
+
+    runs = [measure_import_time(args.module) for _ in range(args.repeat)]
+    best = min(runs, key=lambda t: t.get(args.module, (0, 0, 0))[1])
+    total_ms = best.get(args.module, (0, 0, 0))[1] / 1000
+
+    print(f"Import time of '{args.module}': {total_ms:.1f} ms (threshold {args.threshold_ms:.1f} ms)")
+
+    print(f"\nSlowest imports (self time):")
+    for name, (self_us, cumulative_us, _) in sorted(best.items(), key=lambda x: x[1][0], reverse=True)[:args.top]:
+        print(f"  {name:<40} self {self_us / 1000:8.1f} ms  cumulative {cumulative_us / 1000:8.1f} ms")
+
+    failed = False
+
+    eager_heavy = [m for m in HEAVY_MODULES if m in best]
+    if eager_heavy:
+        print(f"\nNG: heavy modules imported at startup: {', '.join(eager_heavy)}")
+        failed = True
+
+    if total_ms > args.threshold_ms:
+        print(f"\nNG: import time {total_ms:.1f} ms exceeds threshold {args.threshold_ms:.1f} ms")
+        failed = True
+
+    if not failed:
+        print("\nOK")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+取り込みフレームのメモリ使用量レポート
+Bloomberg生データ・処理済み価格データと同じ形の合成データで、従来の表現（Pythonのstr/dateオブジェクト）と
+compact_frame適用後（category・datetime64・NULL許容整数）の1行あたりのバイト数を比較する
+
+使用例:
+    python scripts/testing/memory_report_frames.py
+    python scripts/testing/memory_report_frames.py --years 25 --securities 60
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+src_dir = os.path.join(project_root, 'src')
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import numpy as np
+import pandas as pd
+
+from utils import compact_frame
+
+PRICE_FIELDS = ['PX_LAST', 'PX_OPEN', 'PX_HIGH', 'PX_LOW', 'PX_VOLUME', 'OPEN_INT']
+
+
+def build_raw_frame(years: int, securities: int) -> pd.DataFrame:
+    """
+    get_historical_dataの従来の出力と同じ形の生データ（security・dateはPythonオブジェクト）
+
+    Args:
+        years: 年数
+        securities: 証券数
+
+    Returns:
+        pd.DataFrame: 生データ
+    """
+    dates = pd.bdate_range(date.today().replace(year=date.today().year - years), date.today())
+    tickers = [f"LP{i + 1} Comdty" for i in range(securities)]
+    rng = np.random.default_rng(0)
+
+    rows = len(dates) * len(tickers)
+    df = pd.DataFrame({
+        # Bloombergのレスポンスと同様に、行ごとに別のstr・dateオブジェクトを持つ
+        'security': [''.join(t) for t in np.repeat(tickers, len(dates))],
+        'date': [d.date() for d in np.tile(dates, len(tickers)).astype('datetime64[us]').astype(object)],
+    })
+    for field in PRICE_FIELDS:
+        df[field] = rng.uniform(5000, 11000, rows).round(2)
+    return df
+
+
+def build_processed_frame(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    process_commodity_pricesの従来の出力と同じ形の処理済みデータ
+
+    Args:
+        raw: 生データ
+
+    Returns:
+        pd.DataFrame: 処理済みデータ（DataTypeはstr、IDはNone混在のobject/float）
+    """
+    generic_numbers = raw['security'].str.extract(r'(\d+)')[0].astype(int)
+    return pd.DataFrame({
+        'TradeDate': raw['date'],
+        'MetalID': 1,
+        'DataType': ['Generic'] * len(raw),
+        'GenericID': generic_numbers.astype(float),
+        'ActualContractID': [None] * len(raw),
+        'SettlementPrice': raw['PX_LAST'],
+        'OpenPrice': raw['PX_OPEN'],
+        'HighPrice': raw['PX_HIGH'],
+        'LowPrice': raw['PX_LOW'],
+        'LastPrice': raw['PX_LAST'],
+        'Volume': raw['PX_VOLUME'].round(),
+        'OpenInterest': raw['OPEN_INT'].round()
+    })
+
+
+def bytes_per_row(df: pd.DataFrame) -> float:
+    """1行あたりのメモリ使用量（オブジェクトの中身を含む）"""
+    return df.memory_usage(deep=True, index=False).sum() / max(len(df), 1)
+
+
+def report(name: str, before: pd.DataFrame, after: pd.DataFrame):
+    """比較結果を出力"""
+    before_bpr, after_bpr = bytes_per_row(before), bytes_per_row(after)
+    print(f"\n{name} ({len(before):,} rows)")
+    print(f"  {'column':<18} {'before dtype':<14} {'after dtype':<16} {'before B/row':>12} {'after B/row':>12}")
+    before_usage = before.memory_usage(deep=True, index=False)
+    after_usage = after.memory_usage(deep=True, index=False)
+    for column in before.columns:
+        print(f"  {column:<18} {str(before[column].dtype):<14} {str(after[column].dtype):<16} "
+              f"{before_usage[column] / len(before):>12.1f} {after_usage[column] / len(after):>12.1f}")
+    print(f"  {'total':<50} {before_bpr:>12.1f} {after_bpr:>12.1f}  "
+          f"(-{(1 - after_bpr / before_bpr) * 100:.0f}%, "
+          f"{before_bpr * len(before) / 2**20:.1f} MB -> {after_bpr * len(after) / 2**20:.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingestion frame memory report')
+    parser.add_argument('--years', type=int, default=20, help='Years of daily data (default: 20)')
+    parser.add_argument('--securities', type=int, default=36, help='Number of securities (default: 36)')
+    args = parser.parse_args()
+
+    raw = build_raw_frame(args.years, args.securities)
+    report('Raw historical frame', raw, compact_frame(raw.copy()))
+
+    processed = build_processed_frame(raw)
+    report('Processed T_CommodityPrice frame', processed, compact_frame(processed.copy()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+-- ###########################################################
+-- MERGE照合条件のベンチマーク（テーブル行数に対するコスト）
+-- 従来のNULL許容照合（col = src OR (col IS NULL AND src IS NULL)）と、
+-- DatabaseManager._merge_groups が生成するデータタイプ別の等値照合を、
+-- T_CommodityPrice_V2 と同じ列・インデックス（フィルター付き一意インデックス）を持つ一時テーブルで比較する
+--   行数 : 10万 / 100万 / 500万（@Sizes を変更可）
+--   計測 : 100行のソース（Generic 80行 + Actual 20行）を1行ずつMERGEした合計のCPU時間・経過時間・論理読み取り
+-- 本番テーブルには書き込まない（tempdbのみ使用）
+-- ###########################################################
+
+USE [JCL];
+GO
+
+SET NOCOUNT ON;
+
+IF OBJECT_ID('tempdb..#Results') IS NOT NULL DROP TABLE #Results;
+CREATE TABLE #Results (
+    TableRows INT NOT NULL,
+    Variant NVARCHAR(20) NOT NULL,
+    CpuMs BIGINT NOT NULL,
+    ElapsedMs BIGINT NOT NULL,
+    LogicalReads BIGINT NOT NULL
+);
+
+DECLARE @Sizes TABLE (TableRows INT NOT NULL);
+INSERT INTO @Sizes VALUES (100000), (1000000), (5000000);
+
+DECLARE @TableRows INT;
+DECLARE size_cursor CURSOR LOCAL FAST_FORWARD FOR SELECT TableRows FROM @Sizes ORDER BY TableRows;
+OPEN size_cursor;
+FETCH NEXT FROM size_cursor INTO @TableRows;
+
+WHILE @@FETCH_STATUS = 0
+BEGIN
+    IF OBJECT_ID('tempdb..#Price') IS NOT NULL DROP TABLE #Price;
+    CREATE TABLE #Price (
+        PriceID BIGINT IDENTITY(1,1) NOT NULL PRIMARY KEY CLUSTERED,
+        TradeDate DATE NOT NULL,
+        MetalID INT NOT NULL,
+        DataType NVARCHAR(10) NOT NULL,
+        GenericID INT NULL,
+        ActualContractID INT NULL,
+        SettlementPrice DECIMAL(18,4) NULL,
+        LastUpdated DATETIME2(0) NOT NULL DEFAULT GETDATE()
+    );
+
+    -- 1日あたりGeneric 60本 + Actual 40本（CHECK制約と同じくどちらか一方のIDのみ設定）
+    ;WITH n AS (
+        SELECT TOP (@TableRows) ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) - 1 AS i
+        FROM sys.all_objects a CROSS JOIN sys.all_objects b CROSS JOIN sys.all_objects c
+    )
+    INSERT INTO #Price WITH (TABLOCK) (TradeDate, MetalID, DataType, GenericID, ActualContractID, SettlementPrice)
+    SELECT DATEADD(DAY, -(i / 100), CAST('2030-01-01' AS DATE)), 1,
+           CASE WHEN i % 100 < 60 THEN N'Generic' ELSE N'Actual' END,
+           CASE WHEN i % 100 < 60 THEN i % 100 + 1 END,
+           CASE WHEN i % 100 >= 60 THEN i % 100 - 59 END,
+           9000 + i % 500
+    FROM n;
+
+    CREATE UNIQUE NONCLUSTERED INDEX UQ_Price_Generic ON #Price (TradeDate, GenericID) WHERE DataType = 'Generic';
+    CREATE UNIQUE NONCLUSTERED INDEX UQ_Price_Actual ON #Price (TradeDate, ActualContractID) WHERE DataType = 'Actual';
+
+    -- ソース: 既存の最新日の100行（全てWHEN MATCHEDになる日次更新と同じ形）
+    IF OBJECT_ID('tempdb..#Source') IS NOT NULL DROP TABLE #Source;
+    SELECT TOP (100) TradeDate, MetalID, DataType, GenericID, ActualContractID, SettlementPrice + 1 AS SettlementPrice
+    INTO #Source
+    FROM #Price
+    ORDER BY TradeDate DESC, PriceID;
+
+    DECLARE @Variant NVARCHAR(20), @Start DATETIME2(7), @Cpu BIGINT, @Reads BIGINT;
+    DECLARE @TradeDate DATE, @MetalID INT, @DataType NVARCHAR(10), @GenericID INT, @ActualID INT, @Price DECIMAL(18,4);
+    DECLARE @Variants TABLE (Variant NVARCHAR(20) NOT NULL);
+    DELETE FROM @Variants;
+    INSERT INTO @Variants VALUES (N'NullSafeOr'), (N'KeyShape');
+
+    DECLARE variant_cursor CURSOR LOCAL FAST_FORWARD FOR SELECT Variant FROM @Variants;
+    OPEN variant_cursor;
+    FETCH NEXT FROM variant_cursor INTO @Variant;
+
+    WHILE @@FETCH_STATUS = 0
+    BEGIN
+        CHECKPOINT;
+        SELECT @Cpu = cpu_time, @Reads = logical_reads FROM sys.dm_exec_requests WHERE session_id = @@SPID;
+        SET @Start = SYSDATETIME();
+
+        DECLARE row_cursor CURSOR LOCAL FAST_FORWARD FOR
+            SELECT TradeDate, MetalID, DataType, GenericID, ActualContractID, SettlementPrice FROM #Source;
+        OPEN row_cursor;
+        FETCH NEXT FROM row_cursor INTO @TradeDate, @MetalID, @DataType, @GenericID, @ActualID, @Price;
+
+        WHILE @@FETCH_STATUS = 0
+        BEGIN
+            IF @Variant = N'NullSafeOr'
+            BEGIN
+                -- 従来: ユニークキー全列をNULL許容のORで照合
+                MERGE #Price AS target
+                USING (SELECT @TradeDate AS TradeDate, @MetalID AS MetalID, @DataType AS DataType,
+                              @GenericID AS GenericID, @ActualID AS ActualContractID, @Price AS SettlementPrice) AS source
+                ON (target.TradeDate = source.TradeDate OR (target.TradeDate IS NULL AND source.TradeDate IS NULL))
+                   AND (target.GenericID = source.GenericID OR (target.GenericID IS NULL AND source.GenericID IS NULL))
+                   AND (target.ActualContractID = source.ActualContractID OR (target.ActualContractID IS NULL AND source.ActualContractID IS NULL))
+                   AND (target.DataType = source.DataType OR (target.DataType IS NULL AND source.DataType IS NULL))
+                WHEN MATCHED THEN
+                    UPDATE SET target.MetalID = source.MetalID, target.SettlementPrice = source.SettlementPrice, LastUpdated = GETDATE()
+                WHEN NOT MATCHED THEN
+                    INSERT (TradeDate, MetalID, DataType, GenericID, ActualContractID, SettlementPrice, LastUpdated)
+                    VALUES (source.TradeDate, source.MetalID, source.DataType, source.GenericID, source.ActualContractID, source.SettlementPrice, GETDATE());
+            END
+            ELSE IF @DataType = N'Generic'
+            BEGIN
+                -- データタイプ別: UQ_Price_Generic と同じ列・フィルターで照合
+                MERGE #Price AS target
+                USING (SELECT @TradeDate AS TradeDate, @MetalID AS MetalID, @DataType AS DataType,
+                              @GenericID AS GenericID, @ActualID AS ActualContractID, @Price AS SettlementPrice) AS source
+                ON target.DataType = N'Generic' AND target.TradeDate = source.TradeDate AND target.GenericID = source.GenericID
+                WHEN MATCHED THEN
+                    UPDATE SET target.MetalID = source.MetalID, target.ActualContractID = source.ActualContractID,
+                               target.SettlementPrice = source.SettlementPrice, LastUpdated = GETDATE()
+                WHEN NOT MATCHED THEN
+                    INSERT (TradeDate, MetalID, DataType, GenericID, ActualContractID, SettlementPrice, LastUpdated)
+                    VALUES (source.TradeDate, source.MetalID, source.DataType, source.GenericID, source.ActualContractID, source.SettlementPrice, GETDATE());
+            END
+            ELSE
+            BEGIN
+                -- データタイプ別: UQ_Price_Actual と同じ列・フィルターで照合
+                MERGE #Price AS target
+                USING (SELECT @TradeDate AS TradeDate, @MetalID AS MetalID, @DataType AS DataType,
+                              @GenericID AS GenericID, @ActualID AS ActualContractID, @Price AS SettlementPrice) AS source
+                ON target.DataType = N'Actual' AND target.TradeDate = source.TradeDate AND target.ActualContractID = source.ActualContractID
+                WHEN MATCHED THEN
+                    UPDATE SET target.MetalID = source.MetalID, target.GenericID = source.GenericID,
+                               target.SettlementPrice = source.SettlementPrice, LastUpdated = GETDATE()
+                WHEN NOT MATCHED THEN
+                    INSERT (TradeDate, MetalID, DataType, GenericID, ActualContractID, SettlementPrice, LastUpdated)
+                    VALUES (source.TradeDate, source.MetalID, source.DataType, source.GenericID, source.ActualContractID, source.SettlementPrice, GETDATE());
+            END
+
+            FETCH NEXT FROM row_cursor INTO @TradeDate, @MetalID, @DataType, @GenericID, @ActualID, @Price;
+        END
+
+        CLOSE row_cursor;
+        DEALLOCATE row_cursor;
+
+        INSERT INTO #Results (TableRows, Variant, CpuMs, ElapsedMs, LogicalReads)
+        SELECT @TableRows, @Variant, r.cpu_time - @Cpu, DATEDIFF(MILLISECOND, @Start, SYSDATETIME()), r.logical_reads - @Reads
+        FROM sys.dm_exec_requests r
+        WHERE r.session_id = @@SPID;
+
+        FETCH NEXT FROM variant_cursor INTO @Variant;
+    END
+
+    CLOSE variant_cursor;
+    DEALLOCATE variant_cursor;
+
+    FETCH NEXT FROM size_cursor INTO @TableRows;
+END
+
+CLOSE size_cursor;
+DEALLOCATE size_cursor;
+
+-- 結果: NullSafeOr は行数に比例して論理読み取りが増え（スキャン）、KeyShape はほぼ一定（シーク）になることを確認
+SELECT TableRows, Variant, CpuMs, ElapsedMs, LogicalReads,
+       CAST(LogicalReads / 100.0 AS DECIMAL(18,1)) AS LogicalReadsPerRow
+FROM #Results
+ORDER BY TableRows, Variant;
+
+DROP TABLE #Results;
+IF OBJECT_ID('tempdb..#Price') IS NOT NULL DROP TABLE #Price;
+IF OBJECT_ID('tempdb..#Source') IS NOT NULL DROP TABLE #Source;
+GO
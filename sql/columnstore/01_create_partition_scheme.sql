@@ -0,0 +1,47 @@
+-- ###########################################################
+-- 列ストア化 Step 1: TradeDate の月次パーティション関数・スキーム作成
+-- 2000-01 ～ 2035-12 の月初を境界とする（RANGE RIGHT: 各月が1パーティション）
+-- ###########################################################
+
+USE [JCL];
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.partition_functions WHERE name = 'PF_MonthlyTradeDate')
+BEGIN
+    DECLARE @Boundaries NVARCHAR(MAX) = N'';
+    DECLARE @Month DATE = '2000-01-01';
+
+    WHILE @Month <= '2035-12-01'
+    BEGIN
+        SET @Boundaries = @Boundaries
+            + CASE WHEN @Boundaries = N'' THEN N'' ELSE N', ' END
+            + N'''' + CONVERT(NVARCHAR(10), @Month, 23) + N'''';
+        SET @Month = DATEADD(MONTH, 1, @Month);
+    END
+
+    EXEC (N'CREATE PARTITION FUNCTION PF_MonthlyTradeDate (DATE) AS RANGE RIGHT FOR VALUES (' + @Boundaries + N');');
+    PRINT 'Created partition function PF_MonthlyTradeDate';
+END
+GO
+
+-- Azure SQL Database ではファイルグループは PRIMARY のみ
+IF NOT EXISTS (SELECT 1 FROM sys.partition_schemes WHERE name = 'PS_MonthlyTradeDate')
+BEGIN
+    CREATE PARTITION SCHEME PS_MonthlyTradeDate
+        AS PARTITION PF_MonthlyTradeDate ALL TO ([PRIMARY]);
+    PRINT 'Created partition scheme PS_MonthlyTradeDate';
+END
+GO
+
+-- 境界の追加（2036年以降のデータを扱う場合に実行）
+-- ALTER PARTITION SCHEME PS_MonthlyTradeDate NEXT USED [PRIMARY];
+-- ALTER PARTITION FUNCTION PF_MonthlyTradeDate() SPLIT RANGE ('2036-01-01');
+
+-- 確認
+SELECT pf.name AS partition_function, COUNT(prv.boundary_id) AS boundary_count,
+       MIN(CAST(prv.value AS DATE)) AS first_boundary, MAX(CAST(prv.value AS DATE)) AS last_boundary
+FROM sys.partition_functions pf
+LEFT JOIN sys.partition_range_values prv ON pf.function_id = prv.function_id
+WHERE pf.name = 'PF_MonthlyTradeDate'
+GROUP BY pf.name;
+GO
@@ -0,0 +1,214 @@
+-- ###########################################################
+-- 列ストア化 Step 2: ファクトテーブルを月次パーティション + クラスター化列ストアに移行
+--   T_CommodityPrice         -> TradeDate で分割、CCI
+--   T_GenericContractMapping -> TradeDate で分割、CCI
+-- 既存テーブルは *_Rowstore にリネームして残す（ベンチマーク比較・ロールバック用）
+-- M_ActualContract 等のマスタは行ストアのまま
+-- ###########################################################
+
+USE [JCL];
+GO
+
+-- ###########################################################
+-- T_CommodityPrice
+-- ###########################################################
+
+IF OBJECT_ID('dbo.T_CommodityPrice_Columnstore', 'U') IS NOT NULL
+    DROP TABLE dbo.T_CommodityPrice_Columnstore;
+GO
+
+CREATE TABLE dbo.T_CommodityPrice_Columnstore (
+    PriceID BIGINT IDENTITY(1,1) NOT NULL,
+    TradeDate DATE NOT NULL,
+    MetalID INT NOT NULL,
+    DataType NVARCHAR(10) NOT NULL,
+    GenericID INT NULL,
+    ActualContractID INT NULL,
+    SettlementPrice DECIMAL(18,4) NULL,
+    OpenPrice DECIMAL(18,4) NULL,
+    HighPrice DECIMAL(18,4) NULL,
+    LowPrice DECIMAL(18,4) NULL,
+    LastPrice DECIMAL(18,4) NULL,
+    Volume BIGINT NULL,
+    OpenInterest BIGINT NULL,
+    LastUpdated DATETIME2(0) NOT NULL CONSTRAINT DF_T_CommodityPrice_CS_LastUpdated DEFAULT GETDATE(),
+
+    CONSTRAINT CHK_T_CommodityPrice_CS_DataType CHECK (
+        (DataType = 'Generic' AND GenericID IS NOT NULL AND ActualContractID IS NULL) OR
+        (DataType = 'Actual' AND ActualContractID IS NOT NULL AND GenericID IS NULL) OR
+        (DataType IN ('Cash', 'TomNext', '3MFutures', 'Spread') AND GenericID IS NULL AND ActualContractID IS NULL)
+    ),
+    CONSTRAINT FK_T_CommodityPrice_CS_MetalID
+        FOREIGN KEY (MetalID) REFERENCES dbo.M_Metal (MetalID),
+    CONSTRAINT FK_T_CommodityPrice_CS_GenericID
+        FOREIGN KEY (GenericID) REFERENCES dbo.M_GenericFutures (GenericID),
+    CONSTRAINT FK_T_CommodityPrice_CS_ActualContractID
+        FOREIGN KEY (ActualContractID) REFERENCES dbo.M_ActualContract (ActualContractID)
+) ON PS_MonthlyTradeDate (TradeDate);
+GO
+
+-- クラスター化列ストア（パーティション整列）
+CREATE CLUSTERED COLUMNSTORE INDEX CCI_T_CommodityPrice
+    ON dbo.T_CommodityPrice_Columnstore
+    ON PS_MonthlyTradeDate (TradeDate);
+GO
+
+-- 主キー・一意制約はパーティション列（TradeDate）を含めて整列させる（パーティションSWITCHの前提）
+-- 一意性は行ストアと同じデータタイプ別のフィルター付き一意インデックスで保証する
+-- （upsert_dataframe の MERGE_KEY_SHAPES・sp_SwitchInCommodityPriceStage の MERGE が同じ列・同じフィルターで照合する）
+ALTER TABLE dbo.T_CommodityPrice_Columnstore
+    ADD CONSTRAINT PK_T_CommodityPrice_CS PRIMARY KEY NONCLUSTERED (PriceID, TradeDate)
+    ON PS_MonthlyTradeDate (TradeDate);
+
+CREATE UNIQUE NONCLUSTERED INDEX UQ_T_CommodityPrice_CS_Generic
+    ON dbo.T_CommodityPrice_Columnstore (TradeDate, GenericID)
+    WHERE DataType = 'Generic'
+    ON PS_MonthlyTradeDate (TradeDate);
+
+CREATE UNIQUE NONCLUSTERED INDEX UQ_T_CommodityPrice_CS_Actual
+    ON dbo.T_CommodityPrice_Columnstore (TradeDate, ActualContractID)
+    WHERE DataType = 'Actual'
+    ON PS_MonthlyTradeDate (TradeDate);
+
+-- Cash・TomNext・3MFutures・Spread（GenericID・ActualContractIDは常にNULL）
+CREATE UNIQUE NONCLUSTERED INDEX UQ_T_CommodityPrice_CS_Other
+    ON dbo.T_CommodityPrice_Columnstore (TradeDate, MetalID, DataType)
+    WHERE DataType <> 'Generic' AND DataType <> 'Actual'
+    ON PS_MonthlyTradeDate (TradeDate);
+GO
+
+-- データ移行（月単位でコピーしてトランザクションログを抑制）
+SET IDENTITY_INSERT dbo.T_CommodityPrice_Columnstore ON;
+
+DECLARE @From DATE = (SELECT DATEFROMPARTS(YEAR(MIN(TradeDate)), MONTH(MIN(TradeDate)), 1) FROM dbo.T_CommodityPrice);
+DECLARE @Last DATE = (SELECT MAX(TradeDate) FROM dbo.T_CommodityPrice);
+
+WHILE @From IS NOT NULL AND @From <= @Last
+BEGIN
+    INSERT INTO dbo.T_CommodityPrice_Columnstore WITH (TABLOCK) (
+        PriceID, TradeDate, MetalID, DataType, GenericID, ActualContractID,
+        SettlementPrice, OpenPrice, HighPrice, LowPrice, LastPrice,
+        Volume, OpenInterest, LastUpdated
+    )
+    SELECT PriceID, TradeDate, MetalID, DataType, GenericID, ActualContractID,
+           SettlementPrice, OpenPrice, HighPrice, LowPrice, LastPrice,
+           Volume, OpenInterest, LastUpdated
+    FROM dbo.T_CommodityPrice
+    WHERE TradeDate >= @From AND TradeDate < DATEADD(MONTH, 1, @From);
+
+    SET @From = DATEADD(MONTH, 1, @From);
+END
+
+SET IDENTITY_INSERT dbo.T_CommodityPrice_Columnstore OFF;
+GO
+
+-- 件数確認後に入れ替え
+IF (SELECT COUNT_BIG(*) FROM dbo.T_CommodityPrice) = (SELECT COUNT_BIG(*) FROM dbo.T_CommodityPrice_Columnstore)
+BEGIN
+    BEGIN TRANSACTION;
+    EXEC sp_rename 'dbo.T_CommodityPrice', 'T_CommodityPrice_Rowstore';
+    EXEC sp_rename 'dbo.T_CommodityPrice_Columnstore', 'T_CommodityPrice';
+    COMMIT TRANSACTION;
+    PRINT 'T_CommodityPrice converted to partitioned clustered columnstore';
+END
+ELSE
+    RAISERROR('Row count mismatch - T_CommodityPrice was not swapped', 16, 1);
+GO
+
+-- 圧縮（移行時のデルタストアを列ストアに）
+ALTER INDEX CCI_T_CommodityPrice ON dbo.T_CommodityPrice REORGANIZE WITH (COMPRESS_ALL_ROW_GROUPS = ON);
+GO
+
+-- ###########################################################
+-- T_GenericContractMapping
+-- ###########################################################
+
+IF OBJECT_ID('dbo.T_GenericContractMapping_Columnstore', 'U') IS NOT NULL
+    DROP TABLE dbo.T_GenericContractMapping_Columnstore;
+GO
+
+CREATE TABLE dbo.T_GenericContractMapping_Columnstore (
+    MappingID INT IDENTITY(1,1) NOT NULL,
+    TradeDate DATE NOT NULL,
+    GenericID INT NOT NULL,
+    ActualContractID INT NOT NULL,
+    DaysToExpiry INT NULL,
+    CreatedAt DATETIME2(7) NULL CONSTRAINT DF_Mapping_CS_CreatedAt DEFAULT GETDATE(),
+    CONSTRAINT FK_Mapping_CS_Generic FOREIGN KEY (GenericID) REFERENCES dbo.M_GenericFutures (GenericID),
+    CONSTRAINT FK_Mapping_CS_Actual FOREIGN KEY (ActualContractID) REFERENCES dbo.M_ActualContract (ActualContractID)
+) ON PS_MonthlyTradeDate (TradeDate);
+GO
+
+CREATE CLUSTERED COLUMNSTORE INDEX CCI_T_GenericContractMapping
+    ON dbo.T_GenericContractMapping_Columnstore
+    ON PS_MonthlyTradeDate (TradeDate);
+GO
+
+ALTER TABLE dbo.T_GenericContractMapping_Columnstore
+    ADD CONSTRAINT PK_Mapping_CS PRIMARY KEY NONCLUSTERED (MappingID, TradeDate)
+    ON PS_MonthlyTradeDate (TradeDate);
+
+ALTER TABLE dbo.T_GenericContractMapping_Columnstore
+    ADD CONSTRAINT UQ_Mapping_CS_Date_Generic UNIQUE NONCLUSTERED (TradeDate, GenericID)
+    ON PS_MonthlyTradeDate (TradeDate);
+GO
+
+SET IDENTITY_INSERT dbo.T_GenericContractMapping_Columnstore ON;
+
+INSERT INTO dbo.T_GenericContractMapping_Columnstore WITH (TABLOCK) (
+    MappingID, TradeDate, GenericID, ActualContractID, DaysToExpiry, CreatedAt
+)
+SELECT MappingID, TradeDate, GenericID, ActualContractID, DaysToExpiry, CreatedAt
+FROM dbo.T_GenericContractMapping;
+
+SET IDENTITY_INSERT dbo.T_GenericContractMapping_Columnstore OFF;
+GO
+
+IF (SELECT COUNT_BIG(*) FROM dbo.T_GenericContractMapping) = (SELECT COUNT_BIG(*) FROM dbo.T_GenericContractMapping_Columnstore)
+BEGIN
+    BEGIN TRANSACTION;
+    EXEC sp_rename 'dbo.T_GenericContractMapping', 'T_GenericContractMapping_Rowstore';
+    EXEC sp_rename 'dbo.T_GenericContractMapping_Columnstore', 'T_GenericContractMapping';
+    COMMIT TRANSACTION;
+    PRINT 'T_GenericContractMapping converted to partitioned clustered columnstore';
+END
+ELSE
+    RAISERROR('Row count mismatch - T_GenericContractMapping was not swapped', 16, 1);
+GO
+
+-- ###########################################################
+-- ビューのメタデータ更新（テーブル入れ替え後）
+-- ###########################################################
+
+DECLARE @ViewName NVARCHAR(256);
+DECLARE view_cursor CURSOR LOCAL FAST_FORWARD FOR
+    SELECT DISTINCT QUOTENAME(SCHEMA_NAME(v.schema_id)) + '.' + QUOTENAME(v.name)
+    FROM sys.views v
+    JOIN sys.sql_expression_dependencies d ON d.referencing_id = v.object_id
+    WHERE d.referenced_entity_name IN ('T_CommodityPrice', 'T_GenericContractMapping');
+
+OPEN view_cursor;
+FETCH NEXT FROM view_cursor INTO @ViewName;
+WHILE @@FETCH_STATUS = 0
+BEGIN
+    EXEC sp_refreshview @ViewName;
+    FETCH NEXT FROM view_cursor INTO @ViewName;
+END
+CLOSE view_cursor;
+DEALLOCATE view_cursor;
+GO
+
+-- 確認: パーティション別の行数と圧縮状態
+SELECT OBJECT_NAME(rg.object_id) AS table_name, rg.partition_number,
+       rg.state_desc, COUNT(*) AS row_groups, SUM(rg.total_rows) AS total_rows
+FROM sys.column_store_row_groups rg
+WHERE OBJECT_NAME(rg.object_id) IN ('T_CommodityPrice', 'T_GenericContractMapping')
+GROUP BY OBJECT_NAME(rg.object_id), rg.partition_number, rg.state_desc
+ORDER BY table_name, rg.partition_number;
+GO
+
+-- ロールバック手順（必要な場合）
+-- EXEC sp_rename 'dbo.T_CommodityPrice', 'T_CommodityPrice_Columnstore';
+-- EXEC sp_rename 'dbo.T_CommodityPrice_Rowstore', 'T_CommodityPrice';
+-- EXEC sp_rename 'dbo.T_GenericContractMapping', 'T_GenericContractMapping_Columnstore';
+-- EXEC sp_rename 'dbo.T_GenericContractMapping_Rowstore', 'T_GenericContractMapping';
@@ -0,0 +1,247 @@
+-- ###########################################################
+-- 列ストア化 Step 3: バックフィル用ステージテーブルとパーティションSWITCH手続き
+-- upsert_dataframe(..., backfill=True) が使用する（config/database_config.py の PARTITIONED_TABLES）
+-- 適用後に環境変数 ENABLE_PARTITION_SWITCH=true で有効化する（既定は無効で、通常のMERGE・一括INSERTを使用）
+--   1. dbo.sp_PrepareCommodityPriceStage  : ステージを空にしてIDENTITYを本テーブルに合わせる
+--   2. ステージに一括INSERT（fast_executemany）
+--   3. dbo.sp_SwitchInCommodityPriceStage : 本テーブル側が空の月はSWITCH、既存データがある月はMERGE
+-- ###########################################################
+
+USE [JCL];
+GO
+
+-- ステージテーブル（SWITCHのため本テーブルと同一の構造・制約・インデックス・パーティション）
+IF OBJECT_ID('dbo.T_CommodityPrice_Stage', 'U') IS NOT NULL
+    DROP TABLE dbo.T_CommodityPrice_Stage;
+GO
+
+CREATE TABLE dbo.T_CommodityPrice_Stage (
+    PriceID BIGINT IDENTITY(1,1) NOT NULL,
+    TradeDate DATE NOT NULL,
+    MetalID INT NOT NULL,
+    DataType NVARCHAR(10) NOT NULL,
+    GenericID INT NULL,
+    ActualContractID INT NULL,
+    SettlementPrice DECIMAL(18,4) NULL,
+    OpenPrice DECIMAL(18,4) NULL,
+    HighPrice DECIMAL(18,4) NULL,
+    LowPrice DECIMAL(18,4) NULL,
+    LastPrice DECIMAL(18,4) NULL,
+    Volume BIGINT NULL,
+    OpenInterest BIGINT NULL,
+    LastUpdated DATETIME2(0) NOT NULL CONSTRAINT DF_T_CommodityPrice_Stage_LastUpdated DEFAULT GETDATE(),
+
+    CONSTRAINT CHK_T_CommodityPrice_Stage_DataType CHECK (
+        (DataType = 'Generic' AND GenericID IS NOT NULL AND ActualContractID IS NULL) OR
+        (DataType = 'Actual' AND ActualContractID IS NOT NULL AND GenericID IS NULL) OR
+        (DataType IN ('Cash', 'TomNext', '3MFutures', 'Spread') AND GenericID IS NULL AND ActualContractID IS NULL)
+    ),
+    CONSTRAINT FK_T_CommodityPrice_Stage_MetalID
+        FOREIGN KEY (MetalID) REFERENCES dbo.M_Metal (MetalID),
+    CONSTRAINT FK_T_CommodityPrice_Stage_GenericID
+        FOREIGN KEY (GenericID) REFERENCES dbo.M_GenericFutures (GenericID),
+    CONSTRAINT FK_T_CommodityPrice_Stage_ActualContractID
+        FOREIGN KEY (ActualContractID) REFERENCES dbo.M_ActualContract (ActualContractID)
+) ON PS_MonthlyTradeDate (TradeDate);
+GO
+
+CREATE CLUSTERED COLUMNSTORE INDEX CCI_T_CommodityPrice_Stage
+    ON dbo.T_CommodityPrice_Stage
+    ON PS_MonthlyTradeDate (TradeDate);
+GO
+
+ALTER TABLE dbo.T_CommodityPrice_Stage
+    ADD CONSTRAINT PK_T_CommodityPrice_Stage PRIMARY KEY NONCLUSTERED (PriceID, TradeDate)
+    ON PS_MonthlyTradeDate (TradeDate);
+
+CREATE UNIQUE NONCLUSTERED INDEX UQ_T_CommodityPrice_Stage_Generic
+    ON dbo.T_CommodityPrice_Stage (TradeDate, GenericID)
+    WHERE DataType = 'Generic'
+    ON PS_MonthlyTradeDate (TradeDate);
+
+CREATE UNIQUE NONCLUSTERED INDEX UQ_T_CommodityPrice_Stage_Actual
+    ON dbo.T_CommodityPrice_Stage (TradeDate, ActualContractID)
+    WHERE DataType = 'Actual'
+    ON PS_MonthlyTradeDate (TradeDate);
+
+CREATE UNIQUE NONCLUSTERED INDEX UQ_T_CommodityPrice_Stage_Other
+    ON dbo.T_CommodityPrice_Stage (TradeDate, MetalID, DataType)
+    WHERE DataType <> 'Generic' AND DataType <> 'Actual'
+    ON PS_MonthlyTradeDate (TradeDate);
+GO
+
+-- ###########################################################
+-- ステージ準備: 空にしてIDENTITYを本テーブルの現在値に合わせる（SWITCH後のPriceID重複防止）
+-- ###########################################################
+CREATE OR ALTER PROCEDURE dbo.sp_PrepareCommodityPriceStage
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    TRUNCATE TABLE dbo.T_CommodityPrice_Stage;
+
+    DECLARE @CurrentID BIGINT = ISNULL(CAST(IDENT_CURRENT('dbo.T_CommodityPrice') AS BIGINT), 0);
+    DBCC CHECKIDENT ('dbo.T_CommodityPrice_Stage', RESEED, @CurrentID) WITH NO_INFOMSGS;
+END
+GO
+
+-- ###########################################################
+-- SWITCH-IN: ステージの各月パーティションを本テーブルへ移動
+--   本テーブル側が空の月 : ALTER TABLE ... SWITCH PARTITION（メタデータ操作のみ）
+--   既存データがある月   : MERGE で反映後、ステージの該当月を削除
+--                          （upsert_dataframe の _merge_groups と同じくキーの形ごとに分け、
+--                            フィルター付き一意インデックスと同じ列・フィルターの等値条件のみで照合する）
+-- 戻り値: SwitchedRows, MergedRows, SwitchedPartitions, MergedPartitions
+-- ###########################################################
+CREATE OR ALTER PROCEDURE dbo.sp_SwitchInCommodityPriceStage
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+
+    DECLARE @SwitchedRows BIGINT = 0, @MergedRows BIGINT = 0;
+    DECLARE @SwitchedPartitions INT = 0, @MergedPartitions INT = 0;
+    DECLARE @Partition INT, @PartitionRows BIGINT;
+    DECLARE @Sql NVARCHAR(MAX);
+
+    DECLARE @Partitions TABLE (PartitionNumber INT PRIMARY KEY, RowCnt BIGINT);
+    INSERT INTO @Partitions (PartitionNumber, RowCnt)
+    SELECT $PARTITION.PF_MonthlyTradeDate(TradeDate), COUNT_BIG(*)
+    FROM dbo.T_CommodityPrice_Stage
+    GROUP BY $PARTITION.PF_MonthlyTradeDate(TradeDate);
+
+    DECLARE partition_cursor CURSOR LOCAL FAST_FORWARD FOR
+        SELECT PartitionNumber, RowCnt FROM @Partitions ORDER BY PartitionNumber;
+
+    OPEN partition_cursor;
+    FETCH NEXT FROM partition_cursor INTO @Partition, @PartitionRows;
+
+    WHILE @@FETCH_STATUS = 0
+    BEGIN
+        BEGIN TRANSACTION;
+
+        IF NOT EXISTS (
+            SELECT 1 FROM dbo.T_CommodityPrice WITH (UPDLOCK, HOLDLOCK)
+            WHERE $PARTITION.PF_MonthlyTradeDate(TradeDate) = @Partition
+        )
+        BEGIN
+            SET @Sql = N'ALTER TABLE dbo.T_CommodityPrice_Stage SWITCH PARTITION ' + CAST(@Partition AS NVARCHAR(10))
+                     + N' TO dbo.T_CommodityPrice PARTITION ' + CAST(@Partition AS NVARCHAR(10)) + N';';
+            EXEC sp_executesql @Sql;
+
+            SET @SwitchedRows += @PartitionRows;
+            SET @SwitchedPartitions += 1;
+        END
+        ELSE
+        BEGIN
+            -- ジェネリック先物（UQ_*_Generic と同じ照合）
+            MERGE dbo.T_CommodityPrice AS target
+            USING (
+                SELECT TradeDate, MetalID, DataType, GenericID, ActualContractID,
+                       SettlementPrice, OpenPrice, HighPrice, LowPrice, LastPrice, Volume, OpenInterest
+                FROM dbo.T_CommodityPrice_Stage
+                WHERE $PARTITION.PF_MonthlyTradeDate(TradeDate) = @Partition
+                    AND DataType = 'Generic'
+            ) AS source
+            ON target.DataType = N'Generic'
+               AND target.TradeDate = source.TradeDate
+               AND target.GenericID = source.GenericID
+            WHEN MATCHED THEN
+                UPDATE SET target.SettlementPrice = source.SettlementPrice,
+                           target.OpenPrice = source.OpenPrice,
+                           target.HighPrice = source.HighPrice,
+                           target.LowPrice = source.LowPrice,
+                           target.LastPrice = source.LastPrice,
+                           target.Volume = source.Volume,
+                           target.OpenInterest = source.OpenInterest,
+                           target.LastUpdated = GETDATE()
+            WHEN NOT MATCHED THEN
+                INSERT (TradeDate, MetalID, DataType, GenericID, ActualContractID,
+                        SettlementPrice, OpenPrice, HighPrice, LowPrice, LastPrice, Volume, OpenInterest, LastUpdated)
+                VALUES (source.TradeDate, source.MetalID, source.DataType, source.GenericID, source.ActualContractID,
+                        source.SettlementPrice, source.OpenPrice, source.HighPrice, source.LowPrice, source.LastPrice,
+                        source.Volume, source.OpenInterest, GETDATE());
+
+            SET @MergedRows += @@ROWCOUNT;
+
+            -- 実契約（UQ_*_Actual と同じ照合）
+            MERGE dbo.T_CommodityPrice AS target
+            USING (
+                SELECT TradeDate, MetalID, DataType, GenericID, ActualContractID,
+                       SettlementPrice, OpenPrice, HighPrice, LowPrice, LastPrice, Volume, OpenInterest
+                FROM dbo.T_CommodityPrice_Stage
+                WHERE $PARTITION.PF_MonthlyTradeDate(TradeDate) = @Partition
+                    AND DataType = 'Actual'
+            ) AS source
+            ON target.DataType = N'Actual'
+               AND target.TradeDate = source.TradeDate
+               AND target.ActualContractID = source.ActualContractID
+            WHEN MATCHED THEN
+                UPDATE SET target.SettlementPrice = source.SettlementPrice,
+                           target.OpenPrice = source.OpenPrice,
+                           target.HighPrice = source.HighPrice,
+                           target.LowPrice = source.LowPrice,
+                           target.LastPrice = source.LastPrice,
+                           target.Volume = source.Volume,
+                           target.OpenInterest = source.OpenInterest,
+                           target.LastUpdated = GETDATE()
+            WHEN NOT MATCHED THEN
+                INSERT (TradeDate, MetalID, DataType, GenericID, ActualContractID,
+                        SettlementPrice, OpenPrice, HighPrice, LowPrice, LastPrice, Volume, OpenInterest, LastUpdated)
+                VALUES (source.TradeDate, source.MetalID, source.DataType, source.GenericID, source.ActualContractID,
+                        source.SettlementPrice, source.OpenPrice, source.HighPrice, source.LowPrice, source.LastPrice,
+                        source.Volume, source.OpenInterest, GETDATE());
+
+            SET @MergedRows += @@ROWCOUNT;
+
+            -- その他のデータタイプ（GenericID・ActualContractIDはCHECK制約により常にNULL）
+            MERGE dbo.T_CommodityPrice AS target
+            USING (
+                SELECT TradeDate, MetalID, DataType, GenericID, ActualContractID,
+                       SettlementPrice, OpenPrice, HighPrice, LowPrice, LastPrice, Volume, OpenInterest
+                FROM dbo.T_CommodityPrice_Stage
+                WHERE $PARTITION.PF_MonthlyTradeDate(TradeDate) = @Partition
+                    AND DataType <> 'Generic' AND DataType <> 'Actual'
+            ) AS source
+            ON target.TradeDate = source.TradeDate
+               AND target.MetalID = source.MetalID
+               AND target.DataType = source.DataType
+               AND target.GenericID IS NULL
+               AND target.ActualContractID IS NULL
+            WHEN MATCHED THEN
+                UPDATE SET target.SettlementPrice = source.SettlementPrice,
+                           target.OpenPrice = source.OpenPrice,
+                           target.HighPrice = source.HighPrice,
+                           target.LowPrice = source.LowPrice,
+                           target.LastPrice = source.LastPrice,
+                           target.Volume = source.Volume,
+                           target.OpenInterest = source.OpenInterest,
+                           target.LastUpdated = GETDATE()
+            WHEN NOT MATCHED THEN
+                INSERT (TradeDate, MetalID, DataType, GenericID, ActualContractID,
+                        SettlementPrice, OpenPrice, HighPrice, LowPrice, LastPrice, Volume, OpenInterest, LastUpdated)
+                VALUES (source.TradeDate, source.MetalID, source.DataType, source.GenericID, source.ActualContractID,
+                        source.SettlementPrice, source.OpenPrice, source.HighPrice, source.LowPrice, source.LastPrice,
+                        source.Volume, source.OpenInterest, GETDATE());
+
+            SET @MergedRows += @@ROWCOUNT;
+            SET @MergedPartitions += 1;
+
+            DELETE FROM dbo.T_CommodityPrice_Stage
+            WHERE $PARTITION.PF_MonthlyTradeDate(TradeDate) = @Partition;
+        END
+
+        COMMIT TRANSACTION;
+        FETCH NEXT FROM partition_cursor INTO @Partition, @PartitionRows;
+    END
+
+    CLOSE partition_cursor;
+    DEALLOCATE partition_cursor;
+
+    -- SWITCHで移動したPriceIDに合わせて本テーブルのIDENTITYを補正
+    DBCC CHECKIDENT ('dbo.T_CommodityPrice', RESEED) WITH NO_INFOMSGS;
+
+    SELECT @SwitchedRows AS SwitchedRows, @MergedRows AS MergedRows,
+           @SwitchedPartitions AS SwitchedPartitions, @MergedPartitions AS MergedPartitions;
+END
+GO
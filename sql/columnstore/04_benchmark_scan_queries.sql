@@ -0,0 +1,102 @@
+-- ###########################################################
+-- 列ストア化 Step 4: スキャン性能ベンチマーク
+-- 移行後に残る *_Rowstore テーブル（従来の行ストア）と列ストア版で同じクエリを実行し、
+-- STATISTICS IO/TIME の logical reads・CPU time・elapsed time を比較する
+--   行ストア : T_CommodityPrice_Rowstore, T_GenericContractMapping_Rowstore
+--   列ストア : T_CommodityPrice, T_GenericContractMapping
+-- 各クエリは2回以上実行し、2回目以降（ウォームキャッシュ）の値を採用する
+-- ###########################################################
+
+USE [JCL];
+GO
+
+SET STATISTICS IO ON;
+SET STATISTICS TIME ON;
+GO
+
+DECLARE @From DATE = DATEADD(YEAR, -10, CAST(GETDATE() AS DATE));
+
+-- -----------------------------------------------------------
+-- Q1: 10年分の月次平均価格（ジェネリック別）- 大量スキャン + 集計
+-- -----------------------------------------------------------
+PRINT '--- Q1 rowstore ---';
+SELECT p.GenericID, DATEFROMPARTS(YEAR(p.TradeDate), MONTH(p.TradeDate), 1) AS MonthStart,
+       AVG(p.SettlementPrice) AS AvgPrice, SUM(p.Volume) AS TotalVolume
+FROM dbo.T_CommodityPrice_Rowstore p
+WHERE p.DataType = 'Generic' AND p.TradeDate >= @From
+GROUP BY p.GenericID, DATEFROMPARTS(YEAR(p.TradeDate), MONTH(p.TradeDate), 1)
+OPTION (MAXDOP 1);
+
+PRINT '--- Q1 columnstore ---';
+SELECT p.GenericID, DATEFROMPARTS(YEAR(p.TradeDate), MONTH(p.TradeDate), 1) AS MonthStart,
+       AVG(p.SettlementPrice) AS AvgPrice, SUM(p.Volume) AS TotalVolume
+FROM dbo.T_CommodityPrice p
+WHERE p.DataType = 'Generic' AND p.TradeDate >= @From
+GROUP BY p.GenericID, DATEFROMPARTS(YEAR(p.TradeDate), MONTH(p.TradeDate), 1)
+OPTION (MAXDOP 1);
+
+-- -----------------------------------------------------------
+-- Q2: V_CommodityPriceWithMaturityEx 相当の結合
+--     価格 × マッピング × 実契約 × ジェネリックマスタ（残存日数の分布）
+-- -----------------------------------------------------------
+PRINT '--- Q2 rowstore ---';
+SELECT gf.ExchangeCode, YEAR(p.TradeDate) AS TradeYear,
+       COUNT_BIG(*) AS PriceRows,
+       AVG(CAST(DATEDIFF(DAY, p.TradeDate, ac.LastTradeableDate) AS FLOAT)) AS AvgCalendarDaysToExpiry
+FROM dbo.T_CommodityPrice_Rowstore p
+INNER JOIN dbo.M_GenericFutures gf ON gf.GenericID = p.GenericID
+INNER JOIN dbo.T_GenericContractMapping_Rowstore m
+    ON m.GenericID = p.GenericID AND m.TradeDate = p.TradeDate
+INNER JOIN dbo.M_ActualContract ac ON ac.ActualContractID = m.ActualContractID
+WHERE p.DataType = 'Generic' AND p.TradeDate >= @From
+GROUP BY gf.ExchangeCode, YEAR(p.TradeDate)
+OPTION (MAXDOP 1);
+
+PRINT '--- Q2 columnstore ---';
+SELECT gf.ExchangeCode, YEAR(p.TradeDate) AS TradeYear,
+       COUNT_BIG(*) AS PriceRows,
+       AVG(CAST(DATEDIFF(DAY, p.TradeDate, ac.LastTradeableDate) AS FLOAT)) AS AvgCalendarDaysToExpiry
+FROM dbo.T_CommodityPrice p
+INNER JOIN dbo.M_GenericFutures gf ON gf.GenericID = p.GenericID
+INNER JOIN dbo.T_GenericContractMapping m
+    ON m.GenericID = p.GenericID AND m.TradeDate = p.TradeDate
+INNER JOIN dbo.M_ActualContract ac ON ac.ActualContractID = m.ActualContractID
+WHERE p.DataType = 'Generic' AND p.TradeDate >= @From
+GROUP BY gf.ExchangeCode, YEAR(p.TradeDate)
+OPTION (MAXDOP 1);
+
+-- -----------------------------------------------------------
+-- Q3: 単月の期間指定（パーティション除外の確認）
+--     実行プランの "Actual Partition Count" が 1 になることを確認
+-- -----------------------------------------------------------
+DECLARE @MonthStart DATE = DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1);
+
+PRINT '--- Q3 rowstore ---';
+SELECT p.MetalID, p.DataType, COUNT_BIG(*) AS RowCnt, MAX(p.SettlementPrice) AS MaxPrice
+FROM dbo.T_CommodityPrice_Rowstore p
+WHERE p.TradeDate >= DATEADD(MONTH, -1, @MonthStart) AND p.TradeDate < @MonthStart
+GROUP BY p.MetalID, p.DataType;
+
+PRINT '--- Q3 columnstore ---';
+SELECT p.MetalID, p.DataType, COUNT_BIG(*) AS RowCnt, MAX(p.SettlementPrice) AS MaxPrice
+FROM dbo.T_CommodityPrice p
+WHERE p.TradeDate >= DATEADD(MONTH, -1, @MonthStart) AND p.TradeDate < @MonthStart
+GROUP BY p.MetalID, p.DataType;
+GO
+
+SET STATISTICS IO OFF;
+SET STATISTICS TIME OFF;
+GO
+
+-- 列ストアの圧縮状況（行グループが COMPRESSED で 1,048,576 行に近いほど効率的）
+SELECT OBJECT_NAME(object_id) AS table_name, state_desc,
+       COUNT(*) AS row_groups, SUM(total_rows) AS total_rows,
+       SUM(size_in_bytes) / 1024 / 1024 AS size_mb
+FROM sys.column_store_row_groups
+WHERE OBJECT_NAME(object_id) IN ('T_CommodityPrice', 'T_GenericContractMapping')
+GROUP BY OBJECT_NAME(object_id), state_desc;
+
+-- 行ストアとのサイズ比較
+EXEC sp_spaceused 'dbo.T_CommodityPrice_Rowstore';
+EXEC sp_spaceused 'dbo.T_CommodityPrice';
+GO
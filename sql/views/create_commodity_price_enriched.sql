@@ -0,0 +1,496 @@
+-- 満期・営業日情報のマテリアライズ
+-- V_CommodityPriceWithMaturityEx 等は行ごとに dbo.GetTradingDaysBetween を呼び出していたため、
+-- 価格×実契約×残存日数（暦日・営業日）を T_CommodityPriceEnriched に保持し、ビューはこれを参照する
+-- 日次パイプラインが dbo.sp_RefreshCommodityPriceEnriched を呼び出し、新規・変更のあった TradeDate のみ再計算する
+
+USE [JCL];
+GO
+
+-- ###########################################################
+-- 1. マテリアライズテーブル
+-- ###########################################################
+IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'T_CommodityPriceEnriched')
+BEGIN
+    CREATE TABLE T_CommodityPriceEnriched (
+        TradeDate DATE NOT NULL,
+        GenericID INT NOT NULL,
+        PriceID BIGINT NOT NULL,
+        MetalID INT NOT NULL,
+        ExchangeCode NVARCHAR(10) NOT NULL,
+        ActualContractID INT NULL,
+
+        -- 価格データ
+        OpenPrice DECIMAL(18,4) NULL,
+        HighPrice DECIMAL(18,4) NULL,
+        LowPrice DECIMAL(18,4) NULL,
+        LastPrice DECIMAL(18,4) NULL,
+        SettlementPrice DECIMAL(18,4) NULL,
+        Volume BIGINT NULL,
+        OpenInterest BIGINT NULL,
+
+        -- 満期情報（実契約から取得）
+        LastTradeableDate DATE NULL,
+        FutureDeliveryDateLast DATE NULL,
+
+        -- 残存日数
+        CalendarDaysToExpiry INT NULL,
+        TradingDaysToExpiry INT NULL,
+        TradingDaysToMaturity INT NULL,
+        SuggestedRolloverDate DATE NULL,
+        TradingDaysToRollover INT NULL,
+
+        SourceLastUpdated DATETIME2(0) NOT NULL,
+        RefreshedAt DATETIME2(0) NOT NULL DEFAULT GETDATE(),
+        CONSTRAINT PK_T_CommodityPriceEnriched PRIMARY KEY CLUSTERED (TradeDate, GenericID)
+    );
+
+    CREATE INDEX IX_CommodityPriceEnriched_GenericID ON T_CommodityPriceEnriched (GenericID, TradeDate);
+
+    PRINT 'T_CommodityPriceEnriched table created successfully';
+END
+GO
+
+-- リフレッシュ履歴（前回のリフレッシュ開始時刻を次回の差分検出の基準にする）
+IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'T_EnrichmentRefreshLog')
+BEGIN
+    CREATE TABLE T_EnrichmentRefreshLog (
+        RefreshID INT IDENTITY(1,1) PRIMARY KEY,
+        TableName NVARCHAR(128) NOT NULL,
+        RefreshStartedAt DATETIME2(0) NOT NULL,
+        RefreshedDates INT NOT NULL,
+        RefreshedRows INT NOT NULL,
+        IsFullRange BIT NOT NULL DEFAULT 0
+    );
+
+    CREATE INDEX IX_EnrichmentRefreshLog_Table ON T_EnrichmentRefreshLog (TableName, RefreshStartedAt);
+END
+GO
+
+-- 実契約・取引所カレンダーの変更検出（満期日の修正・休場日の追加は行の更新時刻を設定しない経路があるため rowversion を使用）
+IF COL_LENGTH('T_EnrichmentRefreshLog', 'RowVersionWatermark') IS NULL
+    ALTER TABLE T_EnrichmentRefreshLog ADD RowVersionWatermark BINARY(8) NULL;
+GO
+
+IF COL_LENGTH('M_ActualContract', 'RowVer') IS NULL
+    ALTER TABLE M_ActualContract ADD RowVer ROWVERSION;
+GO
+
+IF COL_LENGTH('M_TradingCalendar', 'RowVer') IS NULL
+    ALTER TABLE M_TradingCalendar ADD RowVer ROWVERSION;
+GO
+
+-- ###########################################################
+-- 2. 差分リフレッシュ手続き
+--   @StartDate/@EndDate 指定時 : 指定期間の全 TradeDate を再計算（M_ActualContract の満期日修正後など）
+--   未指定時                   : 前回リフレッシュ以降に価格（LastUpdated）または
+--                                マッピング（CreatedAt、更新時も再設定される）が変わった TradeDate、
+--                                実契約（M_ActualContract.RowVer）が変わった契約にマッピングされた TradeDate、
+--                                休場日（M_TradingCalendar.RowVer）が変わった日を残存期間に含む TradeDate のみ
+--                                （カレンダー行の削除は検出しないため、期間指定で再計算する）
+--   初回（履歴なし）           : 全期間
+-- 営業日数は M_TradingCalendar の累積営業日数の差で集合演算として計算する
+-- （GetTradingDaysBetween と同じく StartDate < 日付 <= EndDate を数える）
+-- 戻り値: RefreshedDates, RefreshedRows
+-- ###########################################################
+CREATE OR ALTER PROCEDURE dbo.sp_RefreshCommodityPriceEnriched
+    @StartDate DATE = NULL,
+    @EndDate DATE = NULL
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+
+    DECLARE @RefreshStartedAt DATETIME2(0) = SYSDATETIME();
+    -- 未コミットの更新を取りこぼさないよう、実行中のトランザクションを含む最小の rowversion を基準にする
+    DECLARE @RowVersionStarted BINARY(8) = MIN_ACTIVE_ROWVERSION();
+    DECLARE @Watermark DATETIME2(0);
+    DECLARE @RowVersionWatermark BINARY(8);
+    DECLARE @IsFullRange BIT = 0;
+    DECLARE @RefreshedDates INT, @RefreshedRows INT;
+
+    SELECT TOP 1
+        @Watermark = RefreshStartedAt,
+        @RowVersionWatermark = RowVersionWatermark
+    FROM T_EnrichmentRefreshLog
+    WHERE TableName = 'T_CommodityPriceEnriched'
+    ORDER BY RefreshStartedAt DESC, RefreshID DESC;
+
+    -- rowversion 導入前の履歴しかない場合は全実契約・全カレンダーを変更ありとみなす
+    SET @RowVersionWatermark = ISNULL(@RowVersionWatermark, 0x0000000000000000);
+
+    CREATE TABLE #Dates (TradeDate DATE PRIMARY KEY);
+
+    IF @StartDate IS NOT NULL OR @EndDate IS NOT NULL OR @Watermark IS NULL
+    BEGIN
+        SET @IsFullRange = 1;
+
+        INSERT INTO #Dates (TradeDate)
+        SELECT DISTINCT TradeDate
+        FROM T_CommodityPrice
+        WHERE DataType = 'Generic'
+            AND TradeDate >= ISNULL(@StartDate, '1900-01-01')
+            AND TradeDate <= ISNULL(@EndDate, '9999-12-31');
+    END
+    ELSE
+    BEGIN
+        -- リフレッシュ実行中にコミットされた行を取りこぼさないよう基準時刻に余裕を持たせる
+        SET @Watermark = DATEADD(MINUTE, -5, @Watermark);
+
+        INSERT INTO #Dates (TradeDate)
+        SELECT TradeDate FROM T_CommodityPrice
+        WHERE DataType = 'Generic' AND LastUpdated >= @Watermark
+        UNION
+        SELECT TradeDate FROM T_GenericContractMapping
+        WHERE CreatedAt >= @Watermark
+        UNION
+        -- 満期日・引渡日が変わった実契約（ActualContractResolver・満期日修正スクリプト等）
+        SELECT gcm.TradeDate
+        FROM T_GenericContractMapping gcm
+        INNER JOIN M_ActualContract ac ON ac.ActualContractID = gcm.ActualContractID
+        WHERE ac.RowVer >= @RowVersionWatermark;
+
+        -- 休場日が変わった日: 取引日から最終取引日・最終引渡日までの営業日数、
+        -- またはロールオーバー推奨日から最終取引日までの営業日数に影響する行
+        SELECT ExchangeCode, CalendarDate
+        INTO #ChangedCalendar
+        FROM M_TradingCalendar
+        WHERE RowVer >= @RowVersionWatermark;
+
+        IF EXISTS (SELECT 1 FROM #ChangedCalendar)
+        BEGIN
+            INSERT INTO #Dates (TradeDate)
+            SELECT DISTINCT e.TradeDate
+            FROM T_CommodityPriceEnriched e
+            WHERE NOT EXISTS (SELECT 1 FROM #Dates d WHERE d.TradeDate = e.TradeDate)
+                AND EXISTS (
+                    SELECT 1 FROM #ChangedCalendar c
+                    WHERE c.ExchangeCode = e.ExchangeCode
+                        AND (c.CalendarDate <= e.LastTradeableDate OR c.CalendarDate <= e.FutureDeliveryDateLast)
+                        AND (c.CalendarDate > e.TradeDate OR c.CalendarDate >= e.SuggestedRolloverDate)
+                );
+        END
+    END
+
+    SELECT @RefreshedDates = COUNT(*) FROM #Dates;
+
+    -- 取引所別の累積営業日数
+    CREATE TABLE #Calendar (
+        ExchangeCode NVARCHAR(10) NOT NULL,
+        CalendarDate DATE NOT NULL,
+        IsTradingDay BIT NOT NULL,
+        CumTradingDays INT NOT NULL,
+        PRIMARY KEY (ExchangeCode, CalendarDate)
+    );
+
+    INSERT INTO #Calendar (ExchangeCode, CalendarDate, IsTradingDay, CumTradingDays)
+    SELECT ExchangeCode, CalendarDate, IsTradingDay,
+           SUM(CAST(IsTradingDay AS INT)) OVER (
+               PARTITION BY ExchangeCode ORDER BY CalendarDate ROWS UNBOUNDED PRECEDING
+           )
+    FROM M_TradingCalendar;
+
+    BEGIN TRANSACTION;
+
+    DELETE e
+    FROM T_CommodityPriceEnriched e
+    INNER JOIN #Dates d ON e.TradeDate = d.TradeDate;
+
+    INSERT INTO T_CommodityPriceEnriched (
+        TradeDate, GenericID, PriceID, MetalID, ExchangeCode, ActualContractID,
+        OpenPrice, HighPrice, LowPrice, LastPrice, SettlementPrice, Volume, OpenInterest,
+        LastTradeableDate, FutureDeliveryDateLast,
+        CalendarDaysToExpiry, TradingDaysToExpiry, TradingDaysToMaturity,
+        SuggestedRolloverDate, TradingDaysToRollover,
+        SourceLastUpdated, RefreshedAt
+    )
+    SELECT
+        cp.TradeDate,
+        cp.GenericID,
+        cp.PriceID,
+        gf.MetalID,
+        gf.ExchangeCode,
+        gcm.ActualContractID,
+        cp.OpenPrice,
+        cp.HighPrice,
+        cp.LowPrice,
+        cp.LastPrice,
+        cp.SettlementPrice,
+        cp.Volume,
+        cp.OpenInterest,
+        ac.LastTradeableDate,
+        ac.DeliveryDate,
+        DATEDIFF(day, cp.TradeDate, ac.LastTradeableDate),
+        td.TradingDaysToExpiry,
+        COALESCE(
+            c_delivery.CumTradingDays - c_trade.CumTradingDays,
+            -- カレンダー未登録の期間は土日除外の簡易計算
+            DATEDIFF(day, cp.TradeDate, ac.DeliveryDate) - DATEDIFF(week, cp.TradeDate, ac.DeliveryDate) * 2
+        ),
+        c_rollover.CalendarDate,
+        td.TradingDaysToExpiry - gf.RolloverDays,
+        CASE WHEN gcm.CreatedAt > cp.LastUpdated THEN gcm.CreatedAt ELSE cp.LastUpdated END,
+        @RefreshStartedAt
+    FROM T_CommodityPrice cp
+    INNER JOIN #Dates d ON d.TradeDate = cp.TradeDate
+    INNER JOIN M_GenericFutures gf ON gf.GenericID = cp.GenericID
+    LEFT JOIN T_GenericContractMapping gcm
+        ON gcm.GenericID = cp.GenericID AND gcm.TradeDate = cp.TradeDate
+    LEFT JOIN M_ActualContract ac ON ac.ActualContractID = gcm.ActualContractID
+    LEFT JOIN #Calendar c_trade
+        ON c_trade.ExchangeCode = gf.ExchangeCode AND c_trade.CalendarDate = cp.TradeDate
+    LEFT JOIN #Calendar c_expiry
+        ON c_expiry.ExchangeCode = gf.ExchangeCode AND c_expiry.CalendarDate = ac.LastTradeableDate
+    LEFT JOIN #Calendar c_delivery
+        ON c_delivery.ExchangeCode = gf.ExchangeCode AND c_delivery.CalendarDate = ac.DeliveryDate
+    CROSS APPLY (
+        SELECT COALESCE(
+            c_expiry.CumTradingDays - c_trade.CumTradingDays,
+            DATEDIFF(day, cp.TradeDate, ac.LastTradeableDate) - DATEDIFF(week, cp.TradeDate, ac.LastTradeableDate) * 2
+        ) AS TradingDaysToExpiry
+    ) td
+    -- ロールオーバー推奨日: 最終取引日の RolloverDays 営業日前の営業日
+    LEFT JOIN #Calendar c_rollover
+        ON c_rollover.ExchangeCode = gf.ExchangeCode
+        AND c_rollover.IsTradingDay = 1
+        AND c_rollover.CumTradingDays = c_expiry.CumTradingDays - gf.RolloverDays
+    WHERE cp.DataType = 'Generic';
+
+    SET @RefreshedRows = @@ROWCOUNT;
+
+    INSERT INTO T_EnrichmentRefreshLog (
+        TableName, RefreshStartedAt, RefreshedDates, RefreshedRows, IsFullRange, RowVersionWatermark
+    )
+    VALUES (
+        'T_CommodityPriceEnriched', @RefreshStartedAt, @RefreshedDates, @RefreshedRows, @IsFullRange,
+        @RowVersionStarted
+    );
+
+    COMMIT TRANSACTION;
+
+    SELECT @RefreshedDates AS RefreshedDates, @RefreshedRows AS RefreshedRows;
+END;
+GO
+
+-- ###########################################################
+-- 3. ビュー（T_CommodityPriceEnriched を参照）
+-- ###########################################################
+
+-- 既存のビューを削除
+IF EXISTS (SELECT * FROM sys.objects WHERE name = 'V_CommodityPriceWithMaturityEx' AND type = 'V')
+    DROP VIEW V_CommodityPriceWithMaturityEx;
+IF EXISTS (SELECT * FROM sys.objects WHERE name = 'V_MaturitySummaryWithTradingDays' AND type = 'V')
+    DROP VIEW V_MaturitySummaryWithTradingDays;
+IF EXISTS (SELECT * FROM sys.objects WHERE name = 'V_RolloverAlertsWithTradingDays' AND type = 'V')
+    DROP VIEW V_RolloverAlertsWithTradingDays;
+IF EXISTS (SELECT * FROM sys.objects WHERE name = 'V_TradingDaysCalculationDetail' AND type = 'V')
+    DROP VIEW V_TradingDaysCalculationDetail;
+GO
+
+-- 営業日ベースの満期情報を含む拡張ビュー
+CREATE VIEW V_CommodityPriceWithMaturityEx AS
+SELECT
+    -- 基本情報
+    e.PriceID,
+    e.TradeDate,
+    e.GenericID,
+    gf.GenericTicker,
+    gf.GenericNumber,
+    m.MetalCode,
+    m.MetalName,
+    e.ExchangeCode,
+    CASE
+        WHEN e.ExchangeCode = 'CMX' THEN 'COMEX'
+        WHEN e.ExchangeCode = 'LME' THEN 'London Metal Exchange'
+        WHEN e.ExchangeCode = 'SHFE' THEN 'Shanghai Futures Exchange'
+        ELSE e.ExchangeCode
+    END AS ExchangeName,
+
+    -- 価格データ
+    e.OpenPrice,
+    e.HighPrice,
+    e.LowPrice,
+    e.LastPrice,
+    e.SettlementPrice,
+    e.Volume,
+    e.OpenInterest,
+
+    -- 満期情報（T_GenericContractMapping・M_ActualContractから）
+    e.LastTradeableDate,
+    e.FutureDeliveryDateLast,
+    gf.LastRefreshDate,
+
+    -- 暦日・営業日ベースの残存日数
+    e.CalendarDaysToExpiry,
+    e.TradingDaysToExpiry,
+    e.CalendarDaysToExpiry - e.TradingDaysToExpiry as HolidaysInPeriod,
+    CASE
+        WHEN e.CalendarDaysToExpiry > 0 THEN
+            CAST(e.TradingDaysToExpiry * 100.0 / e.CalendarDaysToExpiry as DECIMAL(5,2))
+        ELSE NULL
+    END as TradingDayRate,
+    e.TradingDaysToMaturity,
+
+    -- ロールオーバー
+    gf.RolloverDays,
+    e.SuggestedRolloverDate,
+    e.TradingDaysToRollover,
+    CASE
+        WHEN e.CalendarDaysToExpiry <= 5 THEN 'URGENT'
+        WHEN e.CalendarDaysToExpiry <= 10 THEN 'SOON'
+        ELSE 'OK'
+    END as RolloverRecommendation,
+
+    -- 期間計算
+    DATEDIFF(week, e.TradeDate, e.LastTradeableDate) as WeeksToExpiry,
+    DATEDIFF(month, e.TradeDate, e.LastTradeableDate) as MonthsToExpiry,
+    DATEDIFF(day, e.LastTradeableDate, e.FutureDeliveryDateLast) as SettlementPeriodDays,
+
+    -- 実際の契約情報
+    e.ActualContractID,
+    ac.ContractTicker as ActualContract,
+    ac.ContractMonth,
+    ac.ContractMonthCode,
+    ac.ContractYear,
+
+    -- データ品質フラグ
+    CASE
+        WHEN e.SettlementPrice IS NOT NULL AND e.OpenPrice IS NOT NULL
+             AND e.HighPrice IS NOT NULL AND e.LowPrice IS NOT NULL THEN 1
+        ELSE 0
+    END as HasCompletePriceData,
+
+    CASE
+        WHEN e.Volume IS NOT NULL AND e.Volume > 0 THEN 1
+        ELSE 0
+    END as HasVolumeData,
+
+    -- 日中変動率
+    CASE
+        WHEN e.LastPrice IS NOT NULL AND e.OpenPrice IS NOT NULL AND e.OpenPrice <> 0 THEN
+            ROUND((e.LastPrice - e.OpenPrice) / e.OpenPrice * 100, 6)
+        ELSE NULL
+    END as IntradayChangePercent,
+
+    -- 日中レンジ
+    CASE
+        WHEN e.HighPrice IS NOT NULL AND e.LowPrice IS NOT NULL AND e.LowPrice <> 0 THEN
+            ROUND((e.HighPrice - e.LowPrice) / e.LowPrice * 100, 6)
+        ELSE NULL
+    END as IntradayRangePercent,
+
+    e.SourceLastUpdated as LastUpdated,
+    e.RefreshedAt
+
+FROM T_CommodityPriceEnriched e
+INNER JOIN M_GenericFutures gf ON e.GenericID = gf.GenericID
+INNER JOIN M_Metal m ON e.MetalID = m.MetalID
+LEFT JOIN M_ActualContract ac ON e.ActualContractID = ac.ActualContractID;
+
+GO
+
+-- 営業日情報のサマリービュー
+CREATE VIEW V_MaturitySummaryWithTradingDays AS
+SELECT
+    ExchangeCode,
+    COUNT(DISTINCT GenericTicker) as ActiveContracts,
+
+    -- 暦日ベースの統計
+    AVG(CalendarDaysToExpiry) as AvgCalendarDays,
+    MIN(CalendarDaysToExpiry) as MinCalendarDays,
+    MAX(CalendarDaysToExpiry) as MaxCalendarDays,
+
+    -- 営業日ベースの統計
+    AVG(TradingDaysToExpiry) as AvgTradingDays,
+    MIN(TradingDaysToExpiry) as MinTradingDays,
+    MAX(TradingDaysToExpiry) as MaxTradingDays,
+
+    -- 営業日率
+    AVG(TradingDayRate) as AvgTradingDayRate,
+
+    -- 平均休日数
+    AVG(HolidaysInPeriod) as AvgHolidays
+
+FROM V_CommodityPriceWithMaturityEx
+WHERE TradeDate = (SELECT MAX(TradeDate) FROM T_CommodityPriceEnriched)
+    AND TradingDaysToExpiry IS NOT NULL
+    AND Volume > 0
+GROUP BY ExchangeCode;
+
+GO
+
+-- 営業日ベースのロールオーバー警告ビュー
+CREATE VIEW V_RolloverAlertsWithTradingDays AS
+SELECT TOP 100 PERCENT
+    ExchangeCode,
+    GenericTicker,
+    TradeDate,
+    LastTradeableDate,
+    TradingDaysToExpiry,
+    TradingDaysToRollover,
+    SuggestedRolloverDate,
+    Volume,
+    OpenInterest,
+    CASE
+        WHEN TradingDaysToRollover <= 0 THEN 'IMMEDIATE'
+        WHEN TradingDaysToRollover <= 5 THEN 'URGENT'
+        WHEN TradingDaysToRollover <= 10 THEN 'SOON'
+        ELSE 'OK'
+    END as RolloverStatus,
+    CASE
+        WHEN TradingDaysToRollover <= 0 THEN '即時ロールオーバー必要'
+        WHEN TradingDaysToRollover <= 5 THEN '5営業日以内にロールオーバー推奨'
+        WHEN TradingDaysToRollover <= 10 THEN '10営業日以内にロールオーバー検討'
+        ELSE '正常'
+    END as StatusMessage
+FROM V_CommodityPriceWithMaturityEx
+WHERE TradeDate = (SELECT MAX(TradeDate) FROM T_CommodityPriceEnriched)
+    AND TradingDaysToRollover IS NOT NULL
+    AND Volume > 0
+    AND TradingDaysToRollover <= 20  -- 20営業日以内のもののみ表示
+ORDER BY TradingDaysToRollover;
+
+GO
+
+-- デバッグ用：特定銘柄の営業日計算詳細
+CREATE VIEW V_TradingDaysCalculationDetail AS
+SELECT TOP 100
+    GenericTicker,
+    TradeDate,
+    LastTradeableDate,
+    CONCAT(
+        '取引日: ', FORMAT(TradeDate, 'yyyy-MM-dd (ddd)'), ' → ',
+        '最終取引日: ', FORMAT(LastTradeableDate, 'yyyy-MM-dd (ddd)'), ' = ',
+        '暦日: ', CalendarDaysToExpiry, '日 (',
+        '営業日: ', TradingDaysToExpiry, '日 + ',
+        '休日: ', HolidaysInPeriod, '日)'
+    ) as CalculationDetail,
+    TradingDayRate as '営業日率(%)',
+    Volume
+FROM V_CommodityPriceWithMaturityEx
+WHERE TradeDate = (SELECT MAX(TradeDate) FROM T_CommodityPriceEnriched)
+    AND TradingDaysToExpiry IS NOT NULL
+    AND Volume > 0
+ORDER BY TradingDaysToExpiry;
+
+GO
+
+-- 初回ロード（全期間）
+EXEC dbo.sp_RefreshCommodityPriceEnriched @StartDate = '1900-01-01';
+GO
+
+-- 確認用クエリ
+SELECT TOP 20
+    TradeDate,
+    GenericTicker,
+    ActualContract,
+    LastTradeableDate,
+    CalendarDaysToExpiry,
+    TradingDaysToExpiry,
+    TradingDaysToRollover,
+    RolloverRecommendation
+FROM V_CommodityPriceWithMaturityEx
+WHERE GenericTicker = 'LP1 Comdty'
+ORDER BY TradeDate DESC;
+
+SELECT TOP 10 * FROM T_EnrichmentRefreshLog ORDER BY RefreshID DESC;
+GO
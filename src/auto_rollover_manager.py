@@ -5,26 +5,35 @@ GenericTickerが指し示す実際の先物契約を自動的に更新する
 import sys
 import os
 from datetime import datetime, date, timedelta
+import numpy as np
 import pandas as pd
 from typing import Optional, Dict, List
 
 # プロジェクトルートとsrcディレクトリをPythonパスに追加
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 src_dir = os.path.join(project_root, 'src')
-sys.path.insert(0, project_root)
-sys.path.insert(0, src_dir)
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
 from bloomberg_api import BloombergDataFetcher
+from contract_resolver import contract_security, get_contract_resolver
 from database import DatabaseManager
+from trading_calendar import get_trading_calendar
 from config.logging_config import logger
+from config.rollover_config import ROLLOVER_HORIZON_TRADING_DAYS
 
 
 class AutoRolloverManager:
     """自動ロールオーバー管理クラス"""
     
-    def __init__(self):
-        self.bloomberg = BloombergDataFetcher()
-        self.db_manager = DatabaseManager()
+    def __init__(self, bloomberg: Optional[BloombergDataFetcher] = None,
+                 db_manager: Optional[DatabaseManager] = None):
+        # 接続済みのインスタンスが渡された場合は接続・切断を呼び出し元に任せる（常駐モード用）
+        self.owns_connections = bloomberg is None and db_manager is None
+        self.bloomberg = bloomberg or BloombergDataFetcher()
+        self.db_manager = db_manager or DatabaseManager()
+        self.calendar = None
         
     def execute_auto_rollover(self) -> bool:
         """自動ロールオーバーを実行"""
@@ -32,13 +41,21 @@ class AutoRolloverManager:
         
         try:
             # 接続
-            if not self.bloomberg.connect():
-                logger.warning("Bloomberg API接続失敗 - モックモードで実行")
-            self.db_manager.connect()
+            if self.owns_connections:
+                if not self.bloomberg.connect():
+                    logger.warning("Bloomberg API接続失敗 - モックモードで実行")
+                self.db_manager.connect()
+                
+            # 営業日カレンダー（M_TradingCalendar）
+            self.calendar = get_trading_calendar(self.db_manager)
             
             # 1. 満期日情報を更新
             logger.info("ステップ1: 満期日情報を更新")
-            self._update_maturity_dates()
+            try:
+                self._update_maturity_dates()
+            except Exception as e:
+                # 満期日更新の失敗はロールオーバー判定を止めない（前回の満期日を使用）
+                logger.error(f"満期日更新エラー: {e}")
             
             # 2. ロールオーバーが必要な契約を確認
             logger.info("ステップ2: ロールオーバー必要性チェック")
@@ -46,15 +63,19 @@ class AutoRolloverManager:
             
             if rollover_candidates.empty:
                 logger.info("ロールオーバーが必要な契約はありません")
-                return True
-            
-            logger.info(f"ロールオーバー候補: {len(rollover_candidates)}件")
-            
-            # 3. 各ジェネリック先物のマッピングを更新
-            logger.info("ステップ3: ジェネリック先物マッピング更新")
-            success_count = self._update_generic_mappings(rollover_candidates)
+                success_count = 0
+            else:
+                logger.info(f"ロールオーバー候補: {len(rollover_candidates)}件")
+                
+                # 3. 各ジェネリック先物のマッピングを更新
+                logger.info("ステップ3: ジェネリック先物マッピング更新")
+                success_count = self._update_generic_mappings(rollover_candidates)
+                
+            # 4. 先行期間のマッピングを事前計算（日次の価格処理でマッピング不足を発生させない）
+            logger.info(f"ステップ4: 先行{ROLLOVER_HORIZON_TRADING_DAYS}営業日のマッピング事前計算")
+            forward_count = self._precompute_forward_mappings()
             
-            logger.info(f"=== ロールオーバー処理完了: {success_count}件更新 ===")
+            logger.info(f"=== ロールオーバー処理完了: {success_count}件更新、先行マッピング{forward_count}件更新 ===")
             return True
             
         except Exception as e:
@@ -62,11 +83,12 @@ class AutoRolloverManager:
             return False
             
         finally:
-            self.bloomberg.disconnect()
-            self.db_manager.disconnect()
+            if self.owns_connections:
+                self.bloomberg.disconnect()
+                self.db_manager.disconnect()
             
     def _update_maturity_dates(self):
-        """満期日情報を更新"""
+        """満期日情報を更新（全ジェネリックを一括取得し、1トランザクションで一括UPDATE）"""
         # 全ジェネリック先物のリストを取得
         with self.db_manager.get_connection() as conn:
             query = """
@@ -77,114 +99,144 @@ class AutoRolloverManager:
             """
             generic_futures = pd.read_sql(query, conn)
             
-        # Bloomberg APIから満期日情報を取得
-        tickers = generic_futures['GenericTicker'].tolist()
+        # ティッカー -> GenericID
+        generic_ids = dict(zip(generic_futures['GenericTicker'], generic_futures['GenericID']))
+        
+        # 満期日情報を取得（ジェネリックはロールで値が変わるため、キャッシュせず毎回取得）
+        tickers = list(generic_ids)
         fields = ['LAST_TRADEABLE_DT', 'FUT_DLV_DT_LAST']
         
-        # バッチで取得
-        batch_size = 25
-        current_time = datetime.now()
+        ref_data = self.bloomberg.get_reference_data(tickers, fields)
+        if ref_data.empty:
+            logger.warning("満期日情報を取得できませんでした")
+            return
+            
+        ref_data = ref_data.reindex(columns=['security'] + fields)
+        ref_data['GenericID'] = ref_data['security'].astype(str).map(generic_ids)
+        ref_data = ref_data.dropna(subset=['GenericID'])
         
-        for i in range(0, len(tickers), batch_size):
-            batch_tickers = tickers[i:i+batch_size]
-            try:
-                ref_data = self.bloomberg.get_reference_data(batch_tickers, fields)
-                
-                if not ref_data.empty:
-                    for _, row in ref_data.iterrows():
-                        ticker = row['security']
-                        generic_id = generic_futures[
-                            generic_futures['GenericTicker'] == ticker
-                        ]['GenericID'].iloc[0]
-                        
-                        last_tradeable = row.get('LAST_TRADEABLE_DT')
-                        delivery_date = row.get('FUT_DLV_DT_LAST')
-                        
-                        # 日付変換
-                        if pd.notna(last_tradeable):
-                            last_tradeable = pd.to_datetime(last_tradeable).date()
-                        if pd.notna(delivery_date):
-                            delivery_date = pd.to_datetime(delivery_date).date()
-                        
-                        # DB更新
-                        self._update_maturity_in_db(generic_id, last_tradeable, delivery_date, current_time)
-                        
-            except Exception as e:
-                logger.error(f"満期日更新エラー (バッチ {i//batch_size + 1}): {e}")
-                
-    def _update_maturity_in_db(self, generic_id: int, last_tradeable: date, 
-                               delivery_date: date, update_time: datetime):
-        """データベースに満期日を更新"""
+        # 日付変換（欠損はNULLで更新）
+        last_tradeable = pd.to_datetime(ref_data['LAST_TRADEABLE_DT'], errors='coerce')
+        delivery_date = pd.to_datetime(ref_data['FUT_DLV_DT_LAST'], errors='coerce')
+        rows = [
+            (int(generic_id), lt.date() if pd.notna(lt) else None, dd.date() if pd.notna(dd) else None)
+            for generic_id, lt, dd in zip(ref_data['GenericID'], last_tradeable, delivery_date)
+        ]
+        
+        # 一時テーブルに投入し、集合演算の1回のUPDATEで反映
         with self.db_manager.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                UPDATE M_GenericFutures
+                CREATE TABLE #MaturityStage (
+                    GenericID INT PRIMARY KEY,
+                    LastTradeableDate DATE NULL,
+                    FutureDeliveryDateLast DATE NULL
+                )
+            """)
+            cursor.executemany(
+                "INSERT INTO #MaturityStage (GenericID, LastTradeableDate, FutureDeliveryDateLast) VALUES (?, ?, ?)",
+                rows
+            )
+            cursor.execute("""
+                UPDATE gf
                 SET 
-                    LastTradeableDate = ?,
-                    FutureDeliveryDateLast = ?,
+                    LastTradeableDate = s.LastTradeableDate,
+                    FutureDeliveryDateLast = s.FutureDeliveryDateLast,
                     LastRefreshDate = ?
-                WHERE GenericID = ?
-            """, (last_tradeable, delivery_date, update_time, int(generic_id)))
+                FROM M_GenericFutures gf
+                INNER JOIN #MaturityStage s ON gf.GenericID = s.GenericID
+            """, (datetime.now(),))
+            updated_count = cursor.rowcount
+            cursor.execute("DROP TABLE #MaturityStage")
             conn.commit()
             
+        logger.info(f"満期日情報を更新: {updated_count}/{len(tickers)}件")
+            
     def _check_rollover_needed(self) -> pd.DataFrame:
-        """ロールオーバーが必要な契約を確認"""
+        """
+        ロールオーバーが必要な契約を確認（残存日数は取引所の営業日ベース）
+        
+        当日のマッピング（事前計算した先行マッピングを含む）はBloombergの現在の契約（FUT_CUR_GEN_TICKER）と照合し、
+        一致しないものも更新対象とする
+        
+        Returns:
+            pd.DataFrame: 更新対象のジェネリック（FUT_CUR_GEN_TICKER列付き）
+        """
         with self.db_manager.get_connection() as conn:
-            # ロールオーバー判定クエリ
             query = """
-                WITH RolloverCheck AS (
-                    SELECT 
-                        gf.GenericID,
-                        gf.GenericTicker,
-                        gf.ExchangeCode,
-                        gf.GenericNumber,
-                        gf.LastTradeableDate,
-                        gf.RolloverDays,
-                        -- 現在のマッピング
-                        gcm.ActualContractID as CurrentContractID,
-                        ac.ContractTicker as CurrentContract,
-                        -- ロールオーバー判定
-                        CASE 
-                            WHEN gf.LastTradeableDate IS NULL THEN 0
-                            WHEN DATEDIFF(day, GETDATE(), gf.LastTradeableDate) <= gf.RolloverDays THEN 1
-                            ELSE 0
-                        END as NeedsRollover,
-                        DATEDIFF(day, GETDATE(), gf.LastTradeableDate) as DaysToExpiry
-                    FROM M_GenericFutures gf
-                    LEFT JOIN T_GenericContractMapping gcm ON gf.GenericID = gcm.GenericID
-                        AND gcm.TradeDate = CAST(GETDATE() AS DATE)
-                    LEFT JOIN M_ActualContract ac ON gcm.ActualContractID = ac.ActualContractID
-                    WHERE gf.IsActive = 1
-                )
-                SELECT *
-                FROM RolloverCheck
-                WHERE NeedsRollover = 1
-                OR CurrentContractID IS NULL  -- マッピングがない場合も更新対象
-                ORDER BY ExchangeCode, GenericNumber
+                SELECT 
+                    gf.GenericID,
+                    gf.GenericTicker,
+                    gf.MetalID,
+                    gf.ExchangeCode,
+                    gf.GenericNumber,
+                    gf.LastTradeableDate,
+                    gf.RolloverDays,
+                    -- 現在のマッピング
+                    gcm.ActualContractID as CurrentContractID,
+                    ac.ContractTicker as CurrentContract
+                FROM M_GenericFutures gf
+                LEFT JOIN T_GenericContractMapping gcm ON gf.GenericID = gcm.GenericID
+                    AND gcm.TradeDate = CAST(GETDATE() AS DATE)
+                LEFT JOIN M_ActualContract ac ON gcm.ActualContractID = ac.ActualContractID
+                WHERE gf.IsActive = 1
+                ORDER BY gf.ExchangeCode, gf.GenericNumber
             """
             
             df = pd.read_sql(query, conn)
             
-            # ログ出力
-            for _, row in df.iterrows():
-                if row['NeedsRollover'] == 1:
-                    logger.info(f"{row['GenericTicker']}: 満期まで{row['DaysToExpiry']}日 - ロールオーバー必要")
-                else:
-                    logger.info(f"{row['GenericTicker']}: 現在のマッピングなし - 新規作成必要")
-                    
-            return df
+        # ロールオーバー判定（最終取引日までの営業日数がRolloverDays以下）
+        if self.calendar is None:
+            self.calendar = get_trading_calendar(self.db_manager)
+        df['DaysToExpiry'] = self.calendar.trading_days_between(
+            date.today(), df['LastTradeableDate'], df['ExchangeCode']
+        )
+        df['NeedsRollover'] = (df['DaysToExpiry'] <= df['RolloverDays']).astype(int)
+        
+        # 現在の契約はロールで変わるため、毎回Bloombergから取得（全ジェネリックを1リクエストで照合）
+        ref_data = self.bloomberg.get_reference_data(df['GenericTicker'].tolist(), ['FUT_CUR_GEN_TICKER'])
+        ref_data = ref_data.reindex(columns=['security', 'FUT_CUR_GEN_TICKER']).dropna(subset=['security'])
+        if ref_data.empty:
+            logger.warning("現在の契約を取得できないため、当日のマッピングを照合できません")
+        df['FUT_CUR_GEN_TICKER'] = df['GenericTicker'].map(
+            dict(zip(ref_data['security'].astype(str), ref_data['FUT_CUR_GEN_TICKER']))
+        ).astype(object)
+        
+        # 当日のマッピングがBloombergの現在の契約と異なる（先行マッピングの誤り等）
+        current = df['CurrentContract'].astype(str).str.split(' ').str[0]
+        bloomberg_current = df['FUT_CUR_GEN_TICKER'].astype(str).str.split(' ').str[0]
+        df['Mismatch'] = df['CurrentContract'].notna() & df['FUT_CUR_GEN_TICKER'].notna() & (current != bloomberg_current)
+        
+        # マッピングがない場合も更新対象
+        df = df[(df['NeedsRollover'] == 1) | df['CurrentContractID'].isna() | df['Mismatch']].reset_index(drop=True)
+        
+        # ログ出力
+        for _, row in df.iterrows():
+            if row['NeedsRollover'] == 1:
+                logger.info(f"{row['GenericTicker']}: 満期まで{row['DaysToExpiry']:.0f}営業日 - ロールオーバー必要")
+            elif row['Mismatch']:
+                logger.warning(f"{row['GenericTicker']}: 当日のマッピング {row['CurrentContract']} が"
+                               f"現在の契約 {row['FUT_CUR_GEN_TICKER']} と異なります - 修正")
+            else:
+                logger.info(f"{row['GenericTicker']}: 現在のマッピングなし - 新規作成必要")
+                
+        return df
             
     def _update_generic_mappings(self, rollover_candidates: pd.DataFrame) -> int:
-        """ジェネリック先物のマッピングを更新"""
+        """
+        ジェネリック先物のマッピングを更新
+        
+        Args:
+            rollover_candidates: _check_rollover_neededの結果（FUT_CUR_GEN_TICKER列付き）
+            
+        Returns:
+            int: 更新したマッピング件数
+        """
         success_count = 0
         today = date.today()
         
-        # ティッカーリストを作成
-        tickers = rollover_candidates['GenericTicker'].tolist()
-        
-        # Bloombergから現在のジェネリック契約情報を取得
+        # 実契約の静的情報
         fields = [
-            'FUT_CUR_GEN_TICKER',     # 現在のジェネリック契約
             'LAST_TRADEABLE_DT',      # 最終取引日
             'FUT_DLV_DT_LAST',        # 最終引渡日
             'FUT_CONTRACT_DT',        # 契約月
@@ -192,12 +244,29 @@ class AutoRolloverManager:
             'FUT_TICK_SIZE'           # ティックサイズ
         ]
         
-        ref_data = self.bloomberg.get_reference_data(tickers, fields)
-        
-        if ref_data.empty:
+        # 現在のジェネリック契約（_check_rollover_neededでBloombergから取得済み）
+        ref_data = rollover_candidates[['GenericTicker', 'FUT_CUR_GEN_TICKER']].rename(
+            columns={'GenericTicker': 'security'}
+        )
+        if ref_data['FUT_CUR_GEN_TICKER'].isna().all():
             logger.error("Bloombergからデータを取得できませんでした")
             return 0
             
+        # 静的情報は現在の実契約ティッカー単位で取得（リファレンスキャッシュから返る）
+        ref_data = ref_data.merge(
+            self._contract_reference(ref_data['FUT_CUR_GEN_TICKER'], fields),
+            on='FUT_CUR_GEN_TICKER', how='left'
+        )
+            
+        # 実契約を一括で解決（未登録の契約はまとめて作成）
+        generic_by_ticker = rollover_candidates.drop_duplicates('GenericTicker').set_index('GenericTicker')
+        contract_ids = get_contract_resolver(self.db_manager).resolve(pd.DataFrame({
+            'ContractTicker': ref_data['FUT_CUR_GEN_TICKER'],
+            'MetalID': ref_data['security'].map(generic_by_ticker['MetalID']),
+            'ExchangeCode': ref_data['security'].map(generic_by_ticker['ExchangeCode']),
+            **{field: ref_data[field] for field in fields}
+        }))
+        
         # 各ティッカーのマッピングを更新
         for _, row in ref_data.iterrows():
             ticker = row['security']
@@ -214,100 +283,50 @@ class AutoRolloverManager:
             
             logger.info(f"{ticker} -> {current_contract} へマッピング更新")
             
-            # 実契約を作成または取得
-            actual_contract_id = self._ensure_actual_contract(
-                current_contract, generic_info, row
-            )
+            actual_contract_id = contract_ids.get(str(current_contract))
             
             if actual_contract_id:
                 # マッピングを更新
-                self._update_mapping(today, generic_info['GenericID'], actual_contract_id, row)
+                self._update_mapping(today, generic_info['GenericID'], actual_contract_id, row,
+                                     generic_info['ExchangeCode'])
                 success_count += 1
                 
         return success_count
         
-    def _ensure_actual_contract(self, contract_ticker: str, generic_info: pd.Series, 
-                                bloomberg_data: pd.Series) -> Optional[int]:
-        """実契約を確認し、存在しない場合は作成"""
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # 既存チェック
-            cursor.execute(
-                "SELECT ActualContractID FROM M_ActualContract WHERE ContractTicker = ?",
-                (contract_ticker,)
-            )
-            existing = cursor.fetchone()
-            
-            if existing:
-                return existing[0]
-                
-            # 新規作成
-            # 契約月の解析
-            contract_date = bloomberg_data.get('FUT_CONTRACT_DT')
-            contract_month = None
-            contract_year = None
-            contract_month_code = None
-            
-            if pd.notna(contract_date):
-                try:
-                    contract_dt = pd.to_datetime(contract_date)
-                    contract_month = contract_dt.replace(day=1).date()
-                    contract_year = contract_dt.year
-                    
-                    # 月コード生成
-                    month_codes = ['F', 'G', 'H', 'J', 'K', 'M', 'N', 'Q', 'U', 'V', 'X', 'Z']
-                    contract_month_code = month_codes[contract_dt.month - 1]
-                except Exception as e:
-                    logger.warning(f"契約月解析エラー: {e}")
-                    
-            # MetalIDを取得
-            cursor.execute(
-                "SELECT MetalID FROM M_GenericFutures WHERE GenericID = ?",
-                (int(generic_info['GenericID']),)
-            )
-            metal_id = cursor.fetchone()[0]
-            
-            # 挿入
-            cursor.execute("""
-                INSERT INTO M_ActualContract (
-                    ContractTicker, MetalID, ExchangeCode, ContractMonth, 
-                    ContractYear, ContractMonthCode, LastTradeableDate, 
-                    DeliveryDate, ContractSize, TickSize
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                contract_ticker,
-                metal_id,
-                generic_info['ExchangeCode'],
-                contract_month,
-                contract_year,
-                contract_month_code,
-                bloomberg_data.get('LAST_TRADEABLE_DT'),
-                bloomberg_data.get('FUT_DLV_DT_LAST'),
-                float(bloomberg_data.get('FUT_CONT_SIZE')) if pd.notna(bloomberg_data.get('FUT_CONT_SIZE')) else None,
-                float(bloomberg_data.get('FUT_TICK_SIZE')) if pd.notna(bloomberg_data.get('FUT_TICK_SIZE')) else None
-            ))
-            
-            cursor.execute("SELECT @@IDENTITY")
-            actual_contract_id = cursor.fetchone()[0]
-            conn.commit()
-            
-            logger.info(f"新規実契約作成: {contract_ticker} (ID: {actual_contract_id})")
-            return actual_contract_id
+    def _contract_reference(self, contracts: pd.Series, fields: List[str]) -> pd.DataFrame:
+        """
+        実契約ティッカーの静的情報を取得
+        
+        Args:
+            contracts: FUT_CUR_GEN_TICKERの値（'HGH7'等）
+            fields: 取得フィールド
             
+        Returns:
+            pd.DataFrame: 'FUT_CUR_GEN_TICKER'列と各フィールド列
+        """
+        securities = {contract_security(c): c for c in contracts.dropna().astype(str).unique()}
+        ref_data = pd.DataFrame()
+        if securities:
+            ref_data = self.bloomberg.get_static_reference_data(list(securities), fields)
+        ref_data = ref_data.reindex(columns=['security'] + fields)
+        ref_data['FUT_CUR_GEN_TICKER'] = ref_data['security'].astype(str).map(securities).astype(object)
+        return ref_data.drop(columns='security').dropna(subset=['FUT_CUR_GEN_TICKER'])
+        
     def _update_mapping(self, trade_date: date, generic_id: int, 
-                        actual_contract_id: int, bloomberg_data: pd.Series):
+                        actual_contract_id: int, bloomberg_data: pd.Series,
+                        exchange_code: Optional[str] = None):
         """ジェネリック・実契約マッピングを更新"""
         with self.db_manager.get_connection() as conn:
             cursor = conn.cursor()
             
-            # 残存日数計算
+            # 残存日数計算（取引所の営業日ベース）
             days_to_expiry = None
             last_tradeable = bloomberg_data.get('LAST_TRADEABLE_DT')
             if pd.notna(last_tradeable):
                 try:
-                    last_tradeable_dt = pd.to_datetime(last_tradeable).date()
-                    days_to_expiry = (last_tradeable_dt - trade_date).days
+                    days_to_expiry = get_trading_calendar(self.db_manager).trading_days_between(
+                        trade_date, last_tradeable, exchange_code
+                    )
                 except Exception as e:
                     logger.warning(f"残存日数計算エラー: {e}")
                     
@@ -337,6 +356,176 @@ class AutoRolloverManager:
                 
             conn.commit()
             
+    def _precompute_forward_mappings(self, horizon: int = ROLLOVER_HORIZON_TRADING_DAYS) -> int:
+        """
+        翌営業日からhorizon営業日分のジェネリック・実契約マッピングを事前計算してUPSERT
+        
+        登録済みの実契約の最終取引日と取引所カレンダーから、各営業日にGenericNumber番目となる契約を決定する
+        （残存営業日数がRolloverDaysを超える契約を満期日順に数える。_check_rollover_neededと同じ判定）。
+        M_ActualContractに限月の欠けがある場合、欠け以降の契約を選ぶ行は書き込まず、既存の先行行も削除する
+        
+        Args:
+            horizon: 先行期間（営業日）
+            
+        Returns:
+            int: 追加・変更されたマッピング件数
+        """
+        with self.db_manager.get_connection() as conn:
+            generic_futures = pd.read_sql("""
+                SELECT GenericID, MetalID, ExchangeCode, GenericNumber, RolloverDays
+                FROM M_GenericFutures
+                WHERE IsActive = 1
+            """, conn)
+            contracts = pd.read_sql("""
+                SELECT ActualContractID, MetalID, ExchangeCode, ContractMonth, LastTradeableDate
+                FROM M_ActualContract
+                WHERE LastTradeableDate >= CAST(GETDATE() AS DATE)
+            """, conn)
+            
+        mappings = self._build_forward_mappings(generic_futures, contracts, horizon)
+        if mappings.empty:
+            logger.warning("事前計算できる先行マッピングがありません")
+            
+        rows = [
+            (trade_date, int(generic_id), int(contract_id), int(days_to_expiry))
+            for trade_date, generic_id, contract_id, days_to_expiry in mappings.itertuples(index=False, name=None)
+        ]
+        
+        # 一時テーブルに投入し、変更のある行のみMERGE（CreatedAtは変更時のみ更新）
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE #ForwardMapping (
+                    TradeDate DATE NOT NULL,
+                    GenericID INT NOT NULL,
+                    ActualContractID INT NOT NULL,
+                    DaysToExpiry INT NULL,
+                    PRIMARY KEY (TradeDate, GenericID)
+                )
+            """)
+            if rows:
+                cursor.fast_executemany = True
+                cursor.executemany(
+                        "INSERT INTO #ForwardMapping (TradeDate, GenericID, ActualContractID, DaysToExpiry) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+            cursor.execute("""
+                MERGE T_GenericContractMapping AS target
+                USING #ForwardMapping AS source
+                ON target.TradeDate = source.TradeDate AND target.GenericID = source.GenericID
+                WHEN MATCHED AND (
+                    target.ActualContractID <> source.ActualContractID
+                    OR target.DaysToExpiry IS NULL
+                    OR target.DaysToExpiry <> source.DaysToExpiry
+                ) THEN
+                    UPDATE SET 
+                        ActualContractID = source.ActualContractID,
+                        DaysToExpiry = source.DaysToExpiry,
+                        CreatedAt = GETDATE()
+                WHEN NOT MATCHED THEN
+                    INSERT (TradeDate, GenericID, ActualContractID, DaysToExpiry)
+                    VALUES (source.TradeDate, source.GenericID, source.ActualContractID, source.DaysToExpiry);
+            """)
+            changed_count = max(cursor.rowcount, 0)
+            # 限月の欠けで今回算出できなかった翌営業日以降の行は、以前の誤った算出結果の可能性があるため削除
+            # （当日・過去の行はBloombergの現在の契約で確定する）
+            cursor.execute("""
+                DELETE target
+                FROM T_GenericContractMapping target
+                WHERE target.TradeDate > CAST(GETDATE() AS DATE)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM #ForwardMapping source
+                      WHERE source.TradeDate = target.TradeDate AND source.GenericID = target.GenericID
+                  )
+            """)
+            removed_count = max(cursor.rowcount, 0)
+            cursor.execute("DROP TABLE #ForwardMapping")
+            conn.commit()
+            
+        logger.info(f"先行マッピング: {len(rows)}件計算、{changed_count}件追加・変更、{removed_count}件削除（未確定）")
+        return changed_count + removed_count
+        
+    def _build_forward_mappings(self, generic_futures: pd.DataFrame, contracts: pd.DataFrame,
+                                horizon: int) -> pd.DataFrame:
+        """
+        先行期間の各営業日・ジェネリックに対応する実契約を算出
+        
+        Args:
+            generic_futures: GenericID, MetalID, ExchangeCode, GenericNumber, RolloverDays
+            contracts: ActualContractID, MetalID, ExchangeCode, ContractMonth, LastTradeableDate
+            horizon: 先行期間（営業日）
+            
+        Returns:
+            pd.DataFrame: TradeDate, GenericID, ActualContractID, DaysToExpiry
+                （限月の欠けより後の契約を選ぶ行は含まない）
+        """
+        if self.calendar is None:
+            self.calendar = get_trading_calendar(self.db_manager)
+            
+        columns = ['TradeDate', 'GenericID', 'ActualContractID', 'DaysToExpiry']
+        today = date.today()
+        contracts = contracts.dropna(subset=['LastTradeableDate'])
+        contract_months = pd.to_datetime(contracts['ContractMonth'], errors='coerce')
+        contracts = contracts.assign(MonthIndex=contract_months.dt.year * 12 + contract_months.dt.month)
+        contracts = contracts.sort_values(['MonthIndex', 'LastTradeableDate'])
+        
+        frames = []
+        unresolved = 0
+        
+        for (metal_id, exchange), generics in generic_futures.groupby(['MetalID', 'ExchangeCode']):
+            # 翌営業日からhorizon営業日分の取引日
+            horizon_end = self.calendar.add_trading_days(today, horizon, exchange)
+            trade_dates = self.calendar.trading_days(today + timedelta(days=1), horizon_end, exchange)
+            
+            # MetalIDは取引所別（CU_CMX等）のため契約はMetalIDのみで照合する
+            # （M_ActualContract.ExchangeCodeは作成経路により'CMX'/'COMEX'が混在する）
+            group_contracts = contracts[contracts['MetalID'] == metal_id]
+            
+            # 最も近い限月から連続している契約のみ使用（欠けた限月があるとN番目の契約がずれるため）
+            month_index = group_contracts['MonthIndex'].to_numpy(dtype=float)
+            contiguous = np.logical_and.accumulate(month_index - month_index[:1] == np.arange(len(month_index)))
+            if not contiguous.all():
+                logger.warning(f"MetalID {metal_id}: 実契約の限月に欠けがあるため、"
+                               f"{int((~contiguous).sum())}契約を先行マッピングに使用しません")
+            group_contracts = group_contracts[contiguous]
+            if group_contracts.empty:
+                unresolved += len(generics) * len(trade_dates)
+                continue
+                
+            # 取引日 × 契約（満期日順）の残存営業日数
+            contract_ids = group_contracts['ActualContractID'].to_numpy()
+            n_dates, n_contracts = len(trade_dates), len(contract_ids)
+            days_to_expiry = self.calendar.trading_days_between(
+                np.repeat(trade_dates, n_contracts),
+                np.tile(group_contracts['LastTradeableDate'].to_numpy(), n_dates),
+                exchange
+            ).reshape(n_dates, n_contracts)
+            
+            for generic in generics.itertuples(index=False):
+                rollover_days = generic.RolloverDays if pd.notna(generic.RolloverDays) else 0
+                eligible = days_to_expiry > rollover_days
+                
+                # GenericNumber番目の取引可能な契約（満期日順）
+                hit = eligible & (np.cumsum(eligible, axis=1) == generic.GenericNumber)
+                resolved = hit.any(axis=1)
+                column = hit.argmax(axis=1)[resolved]
+                unresolved += int((~resolved).sum())
+                
+                frames.append(pd.DataFrame({
+                    'TradeDate': trade_dates[resolved].astype(object),
+                    'GenericID': generic.GenericID,
+                    'ActualContractID': contract_ids[column],
+                    'DaysToExpiry': days_to_expiry[resolved, column]
+                }, columns=columns))
+                
+        if unresolved:
+            # 該当する限月の実契約が未登録・限月が不連続（M_ActualContract）の場合は当日のロールオーバーで作成される
+            logger.info(f"先行マッピング: 実契約未登録・限月不連続のため{unresolved}件をスキップ")
+            
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
+        
     def verify_rollover_status(self):
         """ロールオーバー状況を確認"""
         logger.info("\n=== ロールオーバー状況確認 ===")
@@ -0,0 +1,275 @@
+"""
+マルチプロセス・バックフィル実行
+(年, カテゴリ)単位の作業をプロセスプールで並列に取得・加工し、Bloombergへの同時リクエスト数を
+全ワーカー合計で制限する。DB書き込みは親プロセスのテーブル別書き込みスレッド（1テーブル1本）に
+集約し、同一テーブルへの並列MERGEによるデッドロックを防ぐ
+"""
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# プロジェクトルートとsrcディレクトリをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(project_root, 'src')
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import pandas as pd
+
+from config.backfill_config import (
+    BACKFILL_MAX_WORKERS, BACKFILL_BLOOMBERG_CONCURRENCY, BACKFILL_PROGRESS_FILE
+)
+from config.bloomberg_config import BLOOMBERG_TICKERS
+from config.logging_config import logger
+
+# Generic-Actual契約マッピング（HistoricalMappingUpdaterが自身で書き込む作業単位）
+MAPPING_UNIT = 'GENERIC_CONTRACT_MAPPING'
+
+Unit = Tuple[int, str]
+
+# ワーカープロセスの状態（_init_workerで設定）
+_worker_ingestor = None
+_bloomberg_slots = None
+_mapping_lock = None
+
+
+def _init_worker(bloomberg_slots, mapping_lock):
+    """ワーカープロセスの初期化（Bloomberg・DB接続とマスタデータのロードはプロセスごとに1回）"""
+    global _worker_ingestor, _bloomberg_slots, _mapping_lock
+    from main import BloombergSQLIngestor
+
+    _bloomberg_slots = bloomberg_slots
+    _mapping_lock = mapping_lock
+    _worker_ingestor = BloombergSQLIngestor()
+    _worker_ingestor.initialize()
+    # プールのワーカーはatexitを実行しないため、multiprocessingの終了処理で切断する
+    multiprocessing.util.Finalize(_worker_ingestor, _worker_ingestor.cleanup, exitpriority=10)
+
+
+def _year_range(year: int) -> Tuple[str, str]:
+    """年の取得期間（YYYYMMDD）。今年は今日まで"""
+    today = datetime.now()
+    end_date = today.strftime('%Y%m%d') if year == today.year else f"{year}1231"
+    return f"{year}0101", end_date
+
+
+def _run_unit(year: int, category_name: str) -> Tuple[Optional[str], pd.DataFrame]:
+    """
+    ワーカープロセスで1作業単位を取得・加工
+
+    Args:
+        year: 対象年
+        category_name: カテゴリ名（またはMAPPING_UNIT）
+
+    Returns:
+        Tuple[Optional[str], pd.DataFrame]: (格納先テーブル名, 加工済みデータ)。
+            マッピングはワーカー内で書き込み済みのため (None, 空DataFrame)
+    """
+    start_date, end_date = _year_range(year)
+
+    if category_name == MAPPING_UNIT:
+        from historical_mapping_updater import HistoricalMappingUpdater
+
+        # マッピングテーブルの書き込みはUpdater内で行われるため、ロックで同時に1ワーカーのみとする
+        with _mapping_lock, _bloomberg_slots:
+            HistoricalMappingUpdater(_worker_ingestor.bloomberg, _worker_ingestor.db_manager).update_historical_mappings(
+                f"{start_date[:4]}-{start_date[4:6]}-{start_date[6:]}",
+                f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:]}"
+            )
+        return None, pd.DataFrame()
+
+    ticker_info = BLOOMBERG_TICKERS[category_name]
+    with _bloomberg_slots:
+        df = _worker_ingestor.fetch_category(category_name, ticker_info, start_date, end_date)
+    return ticker_info['table'], _worker_ingestor.transform_category(df, ticker_info)
+
+
+class BackfillExecutor:
+    """(年, カテゴリ)単位のバックフィルを並列実行"""
+
+    def __init__(self, start_year: int, end_year: int,
+                 max_workers: int = BACKFILL_MAX_WORKERS,
+                 bloomberg_concurrency: int = BACKFILL_BLOOMBERG_CONCURRENCY,
+                 categories: Optional[List[str]] = None,
+                 include_mappings: bool = True,
+                 progress_file: str = BACKFILL_PROGRESS_FILE):
+        """
+        Args:
+            start_year: 開始年
+            end_year: 終了年
+            max_workers: ワーカープロセス数
+            bloomberg_concurrency: 全ワーカー合計のBloomberg同時リクエスト数
+            categories: 対象カテゴリ（Noneの場合はBLOOMBERG_TICKERSの全カテゴリ）
+            include_mappings: Generic-Actual契約マッピングも取得するか
+            progress_file: 進捗ファイルのパス（Noneの場合は保存しない）
+        """
+        self.start_year = start_year
+        self.end_year = end_year
+        self.max_workers = max_workers
+        self.bloomberg_concurrency = bloomberg_concurrency
+        self.categories = categories or list(BLOOMBERG_TICKERS.keys())
+        self.include_mappings = include_mappings
+        self.progress_file = progress_file
+
+        self.completed_units = set()
+        self.failed_units: List[Unit] = []
+        self.data_counts: Dict[str, int] = {}
+        self._progress_lock = threading.Lock()
+        self._writers: Dict[str, ThreadPoolExecutor] = {}
+        self._store = None
+        self._finished = 0
+
+    def all_units(self) -> List[Unit]:
+        """
+        全作業単位を年順に列挙
+
+        Returns:
+            List[Unit]: (年, カテゴリ名) のリスト
+        """
+        units = []
+        for year in range(self.start_year, self.end_year + 1):
+            if self.include_mappings:
+                units.append((year, MAPPING_UNIT))
+            for category_name in self.categories:
+                # 週次データは最新値のリファレンス取得のため最終年のみ
+                if BLOOMBERG_TICKERS[category_name].get('frequency') == 'Weekly' and year != self.end_year:
+                    continue
+                units.append((year, category_name))
+        return units
+
+    def pending_units(self) -> List[Unit]:
+        """未完了の作業単位"""
+        return [unit for unit in self.all_units() if unit not in self.completed_units]
+
+    def load_progress(self) -> List[int]:
+        """
+        進捗ファイルから完了済み作業単位を読み込む
+
+        Returns:
+            List[int]: 全作業単位が完了済みの年
+        """
+        if self.progress_file and os.path.exists(self.progress_file):
+            with open(self.progress_file, 'r') as f:
+                progress = json.load(f)
+            self.completed_units = {tuple(unit) for unit in progress.get('completed_units', [])}
+            # 旧形式（年単位）の進捗は、その年の全作業単位を完了済みとして扱う
+            for year in progress.get('completed_years', []):
+                self.completed_units.update(unit for unit in self.all_units() if unit[0] == year)
+        return self.completed_years()
+
+    def completed_years(self) -> List[int]:
+        """全作業単位が完了済みの年"""
+        pending_years = {year for year, _ in self.pending_units()}
+        return [year for year in range(self.start_year, self.end_year + 1) if year not in pending_years]
+
+    def reset_progress(self):
+        """進捗をクリア"""
+        self.completed_units = set()
+
+    def _save_progress(self):
+        if not self.progress_file:
+            return
+        with open(self.progress_file, 'w') as f:
+            json.dump({
+                'completed_units': sorted([list(unit) for unit in self.completed_units]),
+                'completed_years': self.completed_years()
+            }, f, indent=2)
+
+    def _writer(self, table_name: str) -> ThreadPoolExecutor:
+        """テーブルごとの書き込みスレッド（1テーブル1本）"""
+        if table_name not in self._writers:
+            self._writers[table_name] = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"writer-{table_name}"
+            )
+        return self._writers[table_name]
+
+    def _complete_unit(self, unit: Unit, record_count: int, total: int):
+        """作業単位の完了を記録（書き込みスレッド・メインスレッドから呼ばれる）"""
+        with self._progress_lock:
+            year, category_name = unit
+            self.completed_units.add(unit)
+            self.data_counts[category_name] = self.data_counts.get(category_name, 0) + record_count
+            self._save_progress()
+            self._finished += 1
+            logger.info(f"[{self._finished}/{total}] {year} {category_name}: {record_count} records")
+
+    def _fail_unit(self, unit: Unit, error: Exception):
+        with self._progress_lock:
+            self._finished += 1
+            self.failed_units.append(unit)
+            logger.error(f"Backfill unit {unit[0]} {unit[1]} failed: {error}")
+
+    def _store_unit(self, unit: Unit, table_name: str, processed_df: pd.DataFrame, total: int):
+        """書き込みスレッドで加工済みデータを格納"""
+        try:
+            record_count = self._store.store_category(unit[1], table_name, processed_df)
+        except Exception as e:
+            self._fail_unit(unit, e)
+            return
+        self._complete_unit(unit, record_count, total)
+
+    def run(self) -> Dict[str, int]:
+        """
+        バックフィルを実行
+
+        Returns:
+            Dict[str, int]: カテゴリ別の格納レコード数
+        """
+        from main import BloombergSQLIngestor
+
+        units = self.pending_units()
+        total = len(units)
+        self._finished = 0
+        logger.info(f"Backfill {self.start_year}-{self.end_year}: {total} units, "
+                    f"{self.max_workers} workers, Bloomberg concurrency {self.bloomberg_concurrency}")
+        if not units:
+            return self.data_counts
+
+        # 書き込み側（親プロセス）はDB接続のみ。パーティション化テーブルはSWITCH経由でロード
+        self._store = BloombergSQLIngestor()
+        self._store.db_manager.connect()
+        self._store.backfill = True
+
+        context = multiprocessing.get_context('spawn')
+        bloomberg_slots = context.BoundedSemaphore(self.bloomberg_concurrency)
+        mapping_lock = context.Lock()
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=context,
+                initializer=_init_worker, initargs=(bloomberg_slots, mapping_lock)
+            ) as pool:
+                futures = {pool.submit(_run_unit, *unit): unit for unit in units}
+                for future in as_completed(futures):
+                    unit = futures[future]
+                    try:
+                        table_name, processed_df = future.result()
+                    except Exception as e:
+                        self._fail_unit(unit, e)
+                        continue
+
+                    if table_name is None:
+                        self._complete_unit(unit, 0, total)
+                    else:
+                        self._writer(table_name).submit(self._store_unit, unit, table_name, processed_df, total)
+        finally:
+            for writer in self._writers.values():
+                writer.shutdown(wait=True)
+            self._writers = {}
+
+        try:
+            self._store.refresh_enriched_prices()
+        finally:
+            self._store.db_manager.disconnect()
+
+        if self.failed_units:
+            logger.warning(f"Backfill finished with {len(self.failed_units)} failed units "
+                           f"(rerun to retry): {sorted(self.failed_units)}")
+        return self.data_counts
@@ -10,20 +10,26 @@ except ImportError:
     MOCK_MODE = True
 
 import pandas as pd
-from typing import Optional, Any, Union
+from collections import deque
+from typing import Iterator, Optional, Any, Union
 from datetime import datetime, date
-import time
 import sys
 import os
 
 # プロジェクトルートとsrcディレクトリをPythonパスに追加
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 src_dir = os.path.join(project_root, 'src')
-sys.path.insert(0, project_root)
-sys.path.insert(0, src_dir)
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
-from config.bloomberg_config import BLOOMBERG_HOST, BLOOMBERG_PORT
+from config.bloomberg_config import (
+    BLOOMBERG_HOST, BLOOMBERG_PORT, BLOOMBERG_EVENT_TIMEOUT_MS, BLOOMBERG_MAX_IDLE_TIMEOUTS,
+    MAX_CONCURRENT_REQUESTS
+)
 from config.logging_config import logger
+from utils import compact_frame
+from request_planner import plan_historical_requests, plan_reference_requests
 
 
 class BloombergDataFetcher:
@@ -32,6 +38,7 @@ class BloombergDataFetcher:
     def __init__(self):
         self.session = None
         self.service = None
+        self._correlation_counter = 0
         
     def connect(self) -> bool:
         """Bloomberg APIに接続"""
@@ -82,113 +89,192 @@ class BloombergDataFetcher:
         Returns:
             pd.DataFrame: 取得したデータ
         """
-        if not self.service:
-            logger.error("Bloomberg service not initialized")
+        try:
+            frames = list(self.iter_historical_data(securities, fields, start_date, end_date, overrides))
+        except Exception as e:
+            logger.error(f"Error retrieving historical data: {e}")
             return pd.DataFrame()
             
-        try:
-            # リクエストの作成
-            request = self.service.createRequest("HistoricalDataRequest")
+        # DataFrameに変換
+        if frames:
+            df = compact_frame(pd.concat(frames, ignore_index=True))
+            logger.info(f"Retrieved {len(df)} historical data records")
+            return df
+        else:
+            logger.warning("No historical data retrieved")
+            return pd.DataFrame()
             
-            # 証券の追加（最大100件まで）
-            for security in securities[:100]:
-                request.getElement("securities").appendValue(security)
-                
-            # フィールドの追加
-            for field in fields:
-                request.getElement("fields").appendValue(field)
-                
-            # 日付範囲の設定
-            request.set("startDate", start_date)
-            request.set("endDate", end_date)
-            
-            # オプション設定
-            request.set("periodicitySelection", "DAILY")
-            request.set("overrideOption", "OVERRIDE_OPTION_GPA")
-            request.set("adjustmentFollowDPDF", True)
-            
-            # 全データソースからデータを取得（一時的にコメントアウト - 無効なオーバーライドのため）
-            # overrides_element = request.getElement("overrides")
-            # override_element = overrides_element.appendElement()
-            # override_element.setElement("fieldId", "ALL_AVAILABLE_PRICING_SOURCE")
-            # override_element.setElement("value", "Y")
-            
-            # カスタムオーバーライドの適用
-            if overrides:
-                overrides_element = request.getElement("overrides")
-                for field_id, value in overrides.items():
-                    override_element = overrides_element.appendElement()
-                    override_element.setElement("fieldId", field_id)
-                    override_element.setElement("value", value)
+    def iter_historical_data(self, securities: list[str], fields: list[str],
+                             start_date: str, end_date: str,
+                             overrides: Optional[dict[str, Any]] = None) -> Iterator[pd.DataFrame]:
+        """
+        ヒストリカルデータを証券ごとに逐次取得するジェネレータ
+        
+        リクエストは証券数・推定データ点数の上限内のシャードに分割し（request_planner）、
+        MAX_CONCURRENT_REQUESTS件まで同時に処理する。PARTIAL_RESPONSE/RESPONSEのメッセージ
+        （1メッセージ = 1シャードの1証券）を受信するたびにデコードして返すため、呼び出し側は後続の
+        ダウンロード中に処理・格納を始められる。期間分割されたシャードでは同じ証券が複数回返る
+        
+        Args:
+            securities: 証券リスト（Bloombergティッカー）
+            fields: フィールドリスト
+            start_date: 開始日（YYYYMMDD形式）
+            end_date: 終了日（YYYYMMDD形式）
+            overrides: オーバーライド設定
+            
+        Yields:
+            pd.DataFrame: 1証券分のデータ（security, date, 各フィールド）
+            
+        Raises:
+            RuntimeError: Bloombergサービスが初期化されていない場合
+            TimeoutError: 応答が途絶えた場合（途中までの結果を完了扱いにしないため）
+        """
+        if not self.service:
+            raise RuntimeError("Bloomberg service not initialized")
+            
+        shards = plan_historical_requests(securities, fields, start_date, end_date)
+        if len(shards) > 1:
+            logger.info(f"Historical request split into {len(shards)} shards "
+                        f"({len(securities)} securities, {start_date}-{end_date})")
+        requests = [
+            self._create_historical_request(shard.securities, shard.fields, shard.start_date, shard.end_date, overrides)
+            for shard in shards
+        ]
+        
+        for msg in self._iter_responses(requests):
+            # 新しいバージョンでは文字列で指定
+            if str(msg.messageType()) == 'HistoricalDataResponse':
+                data_list = []
+                self._process_historical_response(msg, data_list)
+                if data_list:
+                    yield compact_frame(pd.DataFrame(data_list))
                     
-            # リクエストの送信
-            self.session.sendRequest(request)
+    def _iter_responses(self, requests: list) -> Iterator[Any]:
+        """
+        複数リクエストを同時実行数の上限まで並行して送信し、受信したメッセージを順次返す
+        
+        各リクエストはCorrelationIdで識別し、RESPONSE（最終イベント）を受信したら次のリクエストを送信する。
+        イベント数の上限は設けず、応答が途絶えた場合は例外で打ち切る。途中で反復を止めた場合は
+        処理中のリクエストをキャンセルする
+        
+        Args:
+            requests: 送信するリクエストのリスト
             
-            # レスポンスの処理
-            data_list = []
-            max_iterations = 100  # 反復回数を現実的な値に減少
-            iteration_count = 0
-            
-            while True:
-                iteration_count += 1
-                if iteration_count > max_iterations:
-                    logger.warning(f"Max iterations ({max_iterations}) reached, breaking loop")
-                    break
+        Yields:
+            blpapi.Message: 応答メッセージ（responseErrorを含むものは除外）
+            
+        Raises:
+            TimeoutError: BLOOMBERG_MAX_IDLE_TIMEOUTS回続けて応答がなかった場合
+        """
+        pending = deque(requests)
+        in_flight = set()
+        idle_timeouts = 0
+        
+        def send_next():
+            while pending and len(in_flight) < MAX_CONCURRENT_REQUESTS:
+                correlation_id = self.session.sendRequest(pending.popleft(), correlationId=self._next_correlation_id())
+                in_flight.add(correlation_id)
+                
+        try:
+            send_next()
+            while in_flight:
+                event = self.session.nextEvent(BLOOMBERG_EVENT_TIMEOUT_MS)
+                event_type = event.eventType()
                 
-                try:
-                    # タイムアウトを20秒に延長し、大量データ処理に対応
-                    event = self.session.nextEvent(20000)
-                except Exception as e:
-                    logger.error(f"Error getting next event after {iteration_count} iterations: {e}")
-                    # セッションの健全性をチェック
-                    if not self.session or not self.session.eventHandler():
-                        logger.error("Session appears to be corrupted, breaking loop")
-                        break
-                    # 軽微なタイムアウトの場合は継続
-                    if iteration_count < 3:
-                        logger.warning("Retrying nextEvent...")
-                        time.sleep(1)
+                if event_type == blpapi.Event.TIMEOUT:
+                    idle_timeouts += 1
+                    if idle_timeouts >= BLOOMBERG_MAX_IDLE_TIMEOUTS:
+                        raise TimeoutError(
+                            f"No Bloomberg response for {idle_timeouts * BLOOMBERG_EVENT_TIMEOUT_MS // 1000}s, "
+                            f"aborting {len(in_flight)} in-flight and {len(pending)} pending requests"
+                        )
+                    logger.warning(f"Waiting for Bloomberg response ({idle_timeouts})...")
+                    continue
+                idle_timeouts = 0
+                
+                for msg in event:
+                    # 他のリクエスト（キャンセル済みを含む）のメッセージは無視
+                    correlation_id = next((cid for cid in msg.correlationIds() if cid in in_flight), None)
+                    if correlation_id is None:
+                        continue
+                        
+                    if event_type == blpapi.Event.REQUEST_STATUS:
+                        logger.error(f"Bloomberg request failed: {msg}")
+                        in_flight.discard(correlation_id)
                         continue
+                        
+                    if msg.hasElement("responseError"):
+                        error = msg.getElement("responseError")
+                        logger.error(f"Bloomberg response error: {error}")
                     else:
-                        break
+                        yield msg
+                        
+                    if event_type == blpapi.Event.RESPONSE:
+                        in_flight.discard(correlation_id)
+                        
+                send_next()
+        finally:
+            for correlation_id in in_flight:
+                self._cancel_request(correlation_id)
                 
-                # イベントが正常に取得できた場合の処理
-                if event:
-                    for msg in event:
-                        if msg.hasElement("responseError"):
-                            error = msg.getElement("responseError")
-                            logger.error(f"Bloomberg response error: {error}")
-                            continue
-                            
-                        # 新しいバージョンでは文字列で指定
-                        if str(msg.messageType()) == 'HistoricalDataResponse':
-                            self._process_historical_response(msg, data_list)
-                            
-                    if event.eventType() == blpapi.Event.RESPONSE:
-                        break
-                else:
-                    logger.warning(f"Received null event at iteration {iteration_count}")
-                    if iteration_count > 5:
-                        break
-                    
-            # DataFrameに変換
-            if data_list:
-                df = pd.DataFrame(data_list)
-                logger.info(f"Retrieved {len(df)} historical data records")
-                return df
-            else:
-                logger.warning("No historical data retrieved")
-                return pd.DataFrame()
+    def _create_historical_request(self, securities: list[str], fields: list[str],
+                                   start_date: str, end_date: str,
+                                   overrides: Optional[dict[str, Any]] = None):
+        """HistoricalDataRequestを作成"""
+        request = self.service.createRequest("HistoricalDataRequest")
+        
+        # 証券の追加（件数はrequest_plannerで上限内に分割済み）
+        for security in securities:
+            request.getElement("securities").appendValue(security)
+            
+        # フィールドの追加
+        for field in fields:
+            request.getElement("fields").appendValue(field)
+            
+        # 日付範囲の設定
+        request.set("startDate", start_date)
+        request.set("endDate", end_date)
+        
+        # オプション設定
+        request.set("periodicitySelection", "DAILY")
+        request.set("overrideOption", "OVERRIDE_OPTION_GPA")
+        request.set("adjustmentFollowDPDF", True)
+        
+        # 全データソースからデータを取得（一時的にコメントアウト - 無効なオーバーライドのため）
+        # overrides_element = request.getElement("overrides")
+        # override_element = overrides_element.appendElement()
+        # override_element.setElement("fieldId", "ALL_AVAILABLE_PRICING_SOURCE")
+        # override_element.setElement("value", "Y")
+        
+        # カスタムオーバーライドの適用
+        if overrides:
+            overrides_element = request.getElement("overrides")
+            for field_id, value in overrides.items():
+                override_element = overrides_element.appendElement()
+                override_element.setElement("fieldId", field_id)
+                override_element.setElement("value", value)
                 
+        return request
+        
+    def _next_correlation_id(self):
+        """リクエストを識別するCorrelationIdを採番"""
+        self._correlation_counter += 1
+        return blpapi.CorrelationId(self._correlation_counter)
+        
+    def _cancel_request(self, correlation_id):
+        """未完了のリクエストをキャンセル（後続リクエストに古い応答が混ざらないようにする）"""
+        try:
+            self.session.cancel(correlation_id)
         except Exception as e:
-            logger.error(f"Error retrieving historical data: {e}")
-            return pd.DataFrame()
+            logger.debug(f"Failed to cancel Bloomberg request: {e}")
             
     def get_reference_data(self, securities: list[str], fields: list[str],
                           overrides: Optional[dict[str, Any]] = None) -> pd.DataFrame:
         """
         リファレンスデータ（直近値）を取得
         
+        証券数の上限ごとにリクエストを分割し、同時に処理する
+        
         Args:
             securities: 証券リスト
             fields: フィールドリスト
@@ -202,50 +288,21 @@ class BloombergDataFetcher:
             return pd.DataFrame()
             
         try:
-            # リクエストの作成
-            request = self.service.createRequest("ReferenceDataRequest")
-            
-            # 証券の追加（最大100件まで）
-            for security in securities[:100]:
-                request.getElement("securities").appendValue(security)
-                
-            # フィールドの追加
-            for field in fields:
-                request.getElement("fields").appendValue(field)
-                
-            # オーバーライドの適用
-            if overrides:
-                overrides_element = request.getElement("overrides")
-                for field_id, value in overrides.items():
-                    override_element = overrides_element.appendElement()
-                    override_element.setElement("fieldId", field_id)
-                    override_element.setElement("value", value)
-                    
-            # リクエストの送信
-            self.session.sendRequest(request)
+            requests = [
+                self._create_reference_request(shard.securities, shard.fields, overrides)
+                for shard in plan_reference_requests(securities, fields)
+            ]
             
             # レスポンスの処理
             data_list = []
-            
-            while True:
-                event = self.session.nextEvent(500)
-                
-                for msg in event:
-                    if msg.hasElement("responseError"):
-                        error = msg.getElement("responseError")
-                        logger.error(f"Bloomberg response error: {error}")
-                        continue
-                        
-                    # 新しいバージョンでは文字列で指定
-                    if str(msg.messageType()) == 'ReferenceDataResponse':
-                        self._process_reference_response(msg, data_list)
-                        
-                if event.eventType() == blpapi.Event.RESPONSE:
-                    break
+            for msg in self._iter_responses(requests):
+                # 新しいバージョンでは文字列で指定
+                if str(msg.messageType()) == 'ReferenceDataResponse':
+                    self._process_reference_response(msg, data_list)
                     
             # DataFrameに変換
             if data_list:
-                df = pd.DataFrame(data_list)
+                df = compact_frame(pd.DataFrame(data_list))
                 logger.info(f"Retrieved {len(df)} reference data records")
                 return df
             else:
@@ -256,6 +313,48 @@ class BloombergDataFetcher:
             logger.error(f"Error retrieving reference data: {e}")
             return pd.DataFrame()
             
+    def get_static_reference_data(self, securities: list[str], fields: list[str],
+                                  refresh: bool = False) -> pd.DataFrame:
+        """
+        静的リファレンスデータ（契約サイズ・ティックサイズ・最終取引日等）を取得
+        
+        REFERENCE_CACHE_TTL_DAYSのフィールドは永続キャッシュから返し、未取得・期限切れの
+        (証券, フィールド)のみBloombergにリクエストする。対象外のフィールドは常に取得する
+        
+        Args:
+            securities: 証券リスト
+            fields: フィールドリスト
+            refresh: キャッシュを読まずに再取得する（結果はキャッシュに保存）
+            
+        Returns:
+            pd.DataFrame: 'security'列と各フィールド列
+        """
+        from reference_cache import get_reference_cache
+        
+        df = get_reference_cache().fetch(securities, fields, self.get_reference_data, refresh=refresh)
+        return compact_frame(df) if not df.empty else df
+        
+    def _create_reference_request(self, securities: list[str], fields: list[str],
+                                  overrides: Optional[dict[str, Any]] = None):
+        """ReferenceDataRequestを作成"""
+        request = self.service.createRequest("ReferenceDataRequest")
+        
+        for security in securities:
+            request.getElement("securities").appendValue(security)
+            
+        for field in fields:
+            request.getElement("fields").appendValue(field)
+            
+        # オーバーライドの適用
+        if overrides:
+            overrides_element = request.getElement("overrides")
+            for field_id, value in overrides.items():
+                override_element = overrides_element.appendElement()
+                override_element.setElement("fieldId", field_id)
+                override_element.setElement("value", value)
+                
+        return request
+        
     def _process_historical_response(self, msg: blpapi.Message, data_list: list[dict]):
         """
         ヒストリカルデータレスポンスを処理
@@ -374,41 +473,27 @@ class BloombergDataFetcher:
                      batch_size: int = 100,
                      request_type: str = "historical") -> pd.DataFrame:
         """
-        大量の証券に対してバッチ処理でデータを取得
+        大量の証券に対してデータを取得
+        
+        リクエストの分割と同時実行はget_historical_data/get_reference_dataが行う
+        （request_planner、MAX_CONCURRENT_REQUESTS）。batch_sizeは互換性のため残している
         
         Args:
             securities: 証券リスト
             fields: フィールドリスト
             start_date: 開始日
             end_date: 終了日
-            batch_size: バッチサイズ（最大100）
+            batch_size: 未使用（分割はrequest_plannerの上限に従う）
             request_type: "historical" または "reference"
             
         Returns:
             pd.DataFrame: 取得したデータ
         """
-        all_data = []
-        
-        for i in range(0, len(securities), batch_size):
-            batch_securities = securities[i:i + batch_size]
-            logger.info(f"Processing batch {i//batch_size + 1}/{(len(securities)-1)//batch_size + 1}")
+        if request_type == "historical":
+            combined_df = self.get_historical_data(securities, fields, start_date, end_date)
+        else:
+            combined_df = self.get_reference_data(securities, fields)
             
-            if request_type == "historical":
-                batch_data = self.get_historical_data(batch_securities, fields,
-                                                     start_date, end_date)
-            else:
-                batch_data = self.get_reference_data(batch_securities, fields)
-                
-            if not batch_data.empty:
-                all_data.append(batch_data)
-                
-            # API制限を考慮して少し待機
-            if i + batch_size < len(securities):
-                time.sleep(0.5)
-                
-        if all_data:
-            combined_df = pd.concat(all_data, ignore_index=True)
+        if not combined_df.empty:
             logger.info(f"Total records retrieved: {len(combined_df)}")
-            return combined_df
-        else:
-            return pd.DataFrame()
\ No newline at end of file
+        return combined_df
@@ -0,0 +1,268 @@
+"""
+実契約（M_ActualContract）の解決
+先物契約ティッカー（LPN25・HGN5・CUZ5等）の取引所・限月コード・契約月・年をベクトル演算で一括解析し、
+ティッカー -> ActualContractID のメモリ上のインデックスで解決する。未登録の契約は1往復のバッチで一括作成する。
+AutoRolloverManager・HistoricalMappingUpdater・DataProcessorで共有する
+"""
+import os
+import sys
+from datetime import date
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# プロジェクトルートとsrcディレクトリをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(project_root, 'src')
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from database import MASTER_PARAMETER_LIMIT
+from ticker_registry import FUTURES_EXCHANGES
+from config.logging_config import logger
+
+# 限月コード（1月 -> F ... 12月 -> Z）
+MONTH_CODES = 'FGHJKMNQUVXZ'
+MONTH_NUMBERS = {code: month for month, code in enumerate(MONTH_CODES, start=1)}
+
+# 'LPN25 Comdty' / 'HGN5' -> (取引所プレフィックス, 限月コード, 年（2桁または1桁）)
+CONTRACT_TICKER_PATTERN = rf'^(?P<prefix>{"|".join(FUTURES_EXCHANGES)})(?P<month_code>[{MONTH_CODES}])(?P<year>\d{{1,2}})(?:\s|$)'
+
+# M_ActualContractの挿入列
+CONTRACT_INSERT_COLUMNS = [
+    'ContractTicker', 'MetalID', 'ExchangeCode', 'ContractMonth', 'ContractYear',
+    'ContractMonthCode', 'LastTradeableDate', 'DeliveryDate', 'ContractSize', 'TickSize'
+]
+
+# Bloombergリファレンスフィールド -> M_ActualContractの列
+REFERENCE_COLUMNS = {
+    'LAST_TRADEABLE_DT': 'LastTradeableDate',
+    'FUT_DLV_DT_LAST': 'DeliveryDate',
+    'FUT_CONT_SIZE': 'ContractSize',
+    'FUT_TICK_SIZE': 'TickSize'
+}
+
+AsOf = Union[date, pd.Timestamp, pd.Series, np.ndarray, List, None]
+
+
+def contract_security(ticker: str) -> str:
+    """
+    FUT_CUR_GEN_TICKERの値（'HGH7'）をBloombergリクエスト用の証券名（'HGH7 Comdty'）に変換
+
+    Args:
+        ticker: 契約ティッカー（イエローキー付きの場合はそのまま返す）
+
+    Returns:
+        str: 証券名
+    """
+    ticker = str(ticker).strip()
+    return ticker if ' ' in ticker else f"{ticker} Comdty"
+
+
+def parse_contract_tickers(tickers, as_of: AsOf = None) -> pd.DataFrame:
+    """
+    先物契約ティッカーを一括解析
+
+    1桁年（HGN5等）は基準日の前年から9年先までの範囲で年を決定する
+
+    Args:
+        tickers: 契約ティッカーの配列（'LPN25'・'HGN5 Comdty'等）
+        as_of: 1桁年の基準日（スカラーまたはティッカーと同じ長さの配列。Noneの場合は今日）
+
+    Returns:
+        pd.DataFrame: ContractTicker, ExchangeCode, ContractMonthCode, ContractMonth, ContractYear
+            （解析できないティッカーは ContractTicker 以外がNaN/NaT）
+    """
+    tickers = pd.Series(tickers, dtype=object).reset_index(drop=True)
+    parts = tickers.astype(str).str.extract(CONTRACT_TICKER_PATTERN)
+
+    months = parts['month_code'].map(MONTH_NUMBERS)
+    digits = pd.to_numeric(parts['year'], errors='coerce')
+
+    if as_of is None:
+        base_year = pd.Series(date.today().year - 1, index=tickers.index)
+    elif np.ndim(as_of) == 0:
+        base_year = pd.Series(pd.Timestamp(as_of).year - 1, index=tickers.index)
+    else:
+        base_year = pd.Series(pd.to_datetime(np.asarray(as_of)).year - 1, index=tickers.index)
+    one_digit = parts['year'].str.len() == 1
+    years = digits.where(~one_digit, base_year + (digits - base_year) % 10).where(one_digit, 2000 + digits)
+
+    return pd.DataFrame({
+        'ContractTicker': tickers,
+        'ExchangeCode': parts['prefix'].map(FUTURES_EXCHANGES),
+        'ContractMonthCode': parts['month_code'],
+        'ContractMonth': pd.to_datetime(
+            pd.DataFrame({'year': years, 'month': months, 'day': 1}), errors='coerce'
+        ),
+        'ContractYear': years.astype('Int64')
+    })
+
+
+def build_contract_frame(contracts: pd.DataFrame) -> pd.DataFrame:
+    """
+    M_ActualContractの挿入行を一括作成
+
+    契約月はティッカーから解析し、FUT_CONTRACT_DTがある契約はその値を優先する
+
+    Args:
+        contracts: ContractTicker, MetalID と任意の ExchangeCode・AsOf・Bloombergリファレンスフィールド
+            （FUT_CONTRACT_DT・LAST_TRADEABLE_DT・FUT_DLV_DT_LAST・FUT_CONT_SIZE・FUT_TICK_SIZE）
+
+    Returns:
+        pd.DataFrame: CONTRACT_INSERT_COLUMNSの列（契約ごとに1行）
+    """
+    contracts = contracts.drop_duplicates(subset=['ContractTicker'], keep='last').reset_index(drop=True)
+    parsed = parse_contract_tickers(contracts['ContractTicker'], contracts.get('AsOf'))
+
+    if 'FUT_CONTRACT_DT' in contracts.columns:
+        contract_dt = pd.to_datetime(contracts['FUT_CONTRACT_DT'], errors='coerce')
+        known = contract_dt.notna()
+        parsed.loc[known, 'ContractMonth'] = contract_dt[known].dt.to_period('M').dt.to_timestamp()
+        parsed.loc[known, 'ContractYear'] = contract_dt[known].dt.year
+        parsed.loc[known, 'ContractMonthCode'] = contract_dt[known].dt.month.map(dict(enumerate(MONTH_CODES, start=1)))
+
+    if 'ExchangeCode' in contracts.columns:
+        parsed['ExchangeCode'] = contracts['ExchangeCode'].astype(object).where(
+            contracts['ExchangeCode'].notna(), parsed['ExchangeCode']
+        )
+
+    result = parsed.assign(MetalID=contracts['MetalID'])
+    for field, column in REFERENCE_COLUMNS.items():
+        values = contracts[field] if field in contracts.columns else pd.Series(None, index=contracts.index)
+        if column in ('LastTradeableDate', 'DeliveryDate'):
+            values = pd.to_datetime(values, errors='coerce').dt.date
+        else:
+            values = pd.to_numeric(values, errors='coerce')
+        result[column] = values
+    result['ContractMonth'] = result['ContractMonth'].dt.date
+    result['ContractYear'] = result['ContractYear'].astype('Int64')
+    return result[CONTRACT_INSERT_COLUMNS]
+
+
+class ActualContractResolver:
+    """ContractTicker -> ActualContractID の解決（メモリ上のインデックス + 未登録分の一括作成）"""
+
+    def __init__(self, db_manager):
+        """
+        Args:
+            db_manager: DatabaseManager（load_master_data済みの場合はスナップショットからインデックスを作成）
+        """
+        self.db_manager = db_manager
+        self.index: Optional[Dict[str, int]] = None
+
+    def _load_index(self) -> Dict[str, int]:
+        """インデックスを作成（初回のみ）"""
+        if self.index is None:
+            contracts = self.db_manager.master_tables.get('actual_contracts')
+            if contracts is None:
+                contracts = self.db_manager.execute_query(
+                    "SELECT ActualContractID, ContractTicker FROM M_ActualContract"
+                )
+            self.index = dict(zip(contracts['ContractTicker'], contracts['ActualContractID'].astype(int)))
+            logger.debug(f"Loaded actual contract index: {len(self.index)} contracts")
+        return self.index
+
+    def lookup(self, tickers: List[str]) -> Dict[str, int]:
+        """
+        登録済みの契約のみ解決（作成しない）
+
+        Args:
+            tickers: 契約ティッカーのリスト
+
+        Returns:
+            Dict[str, int]: 契約ティッカー -> ActualContractID（登録済みのもののみ）
+        """
+        index = self._load_index()
+        return {ticker: index[ticker] for ticker in tickers if ticker in index}
+
+    def resolve(self, contracts: pd.DataFrame) -> Dict[str, int]:
+        """
+        契約をまとめて解決し、未登録の契約は一括作成
+
+        Args:
+            contracts: build_contract_frameの入力と同じ形式（ContractTicker・MetalID は必須）
+
+        Returns:
+            Dict[str, int]: 契約ティッカー -> ActualContractID（契約月を判定できず作成できなかった契約は含まない）
+        """
+        if contracts.empty:
+            return {}
+
+        index = self._load_index()
+        contracts = contracts[contracts['ContractTicker'].notna()]
+        contracts = contracts.assign(ContractTicker=contracts['ContractTicker'].astype(str))
+        missing = contracts[~contracts['ContractTicker'].isin(index)]
+
+        if not missing.empty:
+            rows = build_contract_frame(missing)
+            unparsed = rows['ContractMonth'].isna() | rows['ExchangeCode'].isna() | rows['MetalID'].isna()
+            if unparsed.any():
+                logger.warning(f"Cannot determine contract month/exchange, skipping: "
+                               f"{rows.loc[unparsed, 'ContractTicker'].tolist()}")
+            rows = rows[~unparsed]
+            if not rows.empty:
+                self._insert_contracts(rows)
+
+        return {ticker: index[ticker] for ticker in contracts['ContractTicker'].unique() if ticker in index}
+
+    def _insert_contracts(self, rows: pd.DataFrame):
+        """
+        未登録の契約を一括作成し、インデックスに追加
+
+        resolve_master_idsと同じく、UPDLOCK/HOLDLOCK付きのNOT EXISTSで並行実行時の重複作成を防ぐ
+
+        Args:
+            rows: build_contract_frameの出力
+        """
+        columns = ', '.join(CONTRACT_INSERT_COLUMNS)
+        row_placeholder = f"({', '.join(['?'] * len(CONTRACT_INSERT_COLUMNS))})"
+        chunk_size = max(1, MASTER_PARAMETER_LIMIT // (len(CONTRACT_INSERT_COLUMNS) + 1))
+        values = self.db_manager._to_rows(rows)
+
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            for i in range(0, len(values), chunk_size):
+                chunk = values[i:i + chunk_size]
+                cursor.execute(f"""
+                    SET NOCOUNT ON;
+                    INSERT INTO M_ActualContract ({columns})
+                    OUTPUT INSERTED.ContractTicker
+                    SELECT {columns}
+                    FROM (VALUES {', '.join([row_placeholder] * len(chunk))}) AS v ({columns})
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM M_ActualContract t WITH (UPDLOCK, HOLDLOCK)
+                        WHERE t.ContractTicker = v.ContractTicker
+                    );
+                    SELECT ActualContractID, ContractTicker FROM M_ActualContract
+                    WHERE ContractTicker IN ({', '.join(['?'] * len(chunk))});
+                """, [value for row in chunk for value in row] + [row[0] for row in chunk])
+                created = [r[0] for r in cursor.fetchall()]
+                cursor.nextset()
+                for actual_contract_id, ticker in cursor.fetchall():
+                    self.index[ticker] = int(actual_contract_id)
+
+                for ticker in created:
+                    logger.info(f"Created new actual contract: {ticker} (ID: {self.index.get(ticker)})")
+            conn.commit()
+
+
+_contract_resolver: Optional[ActualContractResolver] = None
+
+
+def get_contract_resolver(db_manager) -> ActualContractResolver:
+    """
+    プロセス共通の実契約リゾルバーを取得（DatabaseManagerが変わった場合は作り直す）
+
+    Args:
+        db_manager: DatabaseManager
+
+    Returns:
+        ActualContractResolver: リゾルバー
+    """
+    global _contract_resolver
+    if _contract_resolver is None or _contract_resolver.db_manager is not db_manager:
+        _contract_resolver = ActualContractResolver(db_manager)
+    return _contract_resolver
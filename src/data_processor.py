@@ -11,11 +11,18 @@ import os
 # プロジェクトルートとsrcディレクトリをPythonパスに追加
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 src_dir = os.path.join(project_root, 'src')
-sys.path.insert(0, project_root)
-sys.path.insert(0, src_dir)
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
-from config.bloomberg_config import BLOOMBERG_TICKERS
-from config.logging_config import logger
+from contract_resolver import get_contract_resolver
+from ticker_registry import get_ticker_spec, indicator_unit, ticker_frame, LME_INVENTORY_DATA_TYPES
+from utils import compact_frame
+
+from config.logging_config import logger, sampled_logger
+
+# 在庫値の取得フィールド（優先順）
+INVENTORY_VALUE_FIELDS = ['PX_LAST', 'LAST_PRICE', 'PX_CLOSE', 'PX_MID', 'PX_BID', 'PX_ASK']
 
 
 class DataProcessor:
@@ -39,143 +46,32 @@ class DataProcessor:
         if df.empty:
             return pd.DataFrame()
             
+        # 実契約は全証券まとめて解決（未登録の契約は一括作成）
+        try:
+            actual_contract_ids = self._resolve_actual_contracts(df, ticker_info)
+        except Exception as e:
+            logger.error(f"Error resolving actual contracts: {e}")
+            actual_contract_ids = {}
+            
+        # 証券ごとのID解決（同一証券の複数日付で使い回す）
+        security_ids = {}
+        for security in df['security'].unique():
+            try:
+                security_ids[security] = self._resolve_price_security(security, ticker_info, actual_contract_ids)
+            except Exception as e:
+                logger.error(f"Error resolving price security {security}: {e}")
+                
         processed_data = []
         
         for _, row in df.iterrows():
             try:
-                # 基本情報の取得
                 security = row['security']
-                trade_date = pd.to_datetime(row['date']).date()
-                
-                # メタルIDの取得（取引所に応じて適切なメタルコードを使用）
-                base_metal_code = ticker_info.get('metal', 'COPPER')
-                
-                # 取引所別のメタルコードを決定
-                if security.startswith('CU') and not security.startswith('CU_'):
-                    metal_code = 'CU_SHFE'  # SHFE
-                elif security.startswith('HG'):
-                    metal_code = 'CU_CMX'   # COMEX
-                else:
-                    metal_code = base_metal_code  # LME (COPPER)
-                
-                metal_id = self.db_manager.get_or_create_master_id('metals', metal_code)
-                
-                # データタイプとIDの判定
-                generic_id = None
-                actual_contract_id = None
-                data_type = None
-                
-                # 1. Cash価格の判定（LMCADY Indexなど）
-                if 'Index' in security and any(cash_code in security for cash_code in ['LMCADY', 'LMCADS']):
-                    data_type = 'Cash'
-                    logger.debug(f"{security} identified as Cash")
-                    
-                # 2. Tom-Next価格の判定（CAD TT00 Comdtyなど）
-                elif 'TT00' in security or 'TN00' in security:
-                    data_type = 'TomNext'
-                    logger.debug(f"{security} identified as TomNext")
-                    
-                # 3. 3M先物の判定（LMCADS03 Comdty）
-                elif 'LMCADS03' in security:
-                    data_type = '3MFutures'
-                    logger.debug(f"{security} identified as 3M Futures")
-                    
-                # 4. スプレッドの判定（LMCADS 0003 Comdty）
-                elif 'LMCADS 0003' in security:
-                    data_type = 'Spread'
-                    logger.debug(f"{security} identified as Spread")
-                    
-                # 5. ジェネリック先物の判定（LP1-LP36, CU1-CU12, HG1-HG26）
-                elif any(prefix in security for prefix in ['LP', 'CU', 'HG']) and re.search(r'\d+', security):
-                    data_type = 'Generic'
-                    
-                    # 取引所コードを決定
-                    if security.startswith('LP'):
-                        exchange_code = 'LME'
-                    elif security.startswith('CU'):
-                        exchange_code = 'SHFE'
-                    elif security.startswith('HG'):
-                        exchange_code = 'COMEX'
-                    else:
-                        exchange_code = ticker_info.get('exchange', 'LME')
-                    
-                    # M_GenericFuturesからGenericIDを取得
-                    with self.db_manager.get_connection() as conn:
-                        cursor = conn.cursor()
-                        cursor.execute("""
-                            SELECT GenericID FROM M_GenericFutures 
-                            WHERE GenericTicker = ? AND IsActive = 1
-                        """, (security,))
-                        result = cursor.fetchone()
-                        if result:
-                            generic_id = result[0]
-                            logger.debug(f"Found existing generic future: {security} (ID: {generic_id})")
-                        else:
-                            # 新規ジェネリック先物の場合は作成
-                            # LP1 -> 1, CU1 -> 1, HG1 -> 1のようにジェネリック番号を抽出
-                            generic_number = self._extract_generic_number(security)
-                            description = f"{exchange_code} Copper Generic {generic_number} Future"
-                            
-                            # この時点でmetal_idは既に正しい値（取引所別）になっている
-                            exchange_metal_id = metal_id
-                            
-                            cursor.execute("""
-                                INSERT INTO M_GenericFutures (
-                                    GenericTicker, MetalID, ExchangeCode, GenericNumber, 
-                                    Description, IsActive, CreatedDate
-                                ) VALUES (?, ?, ?, ?, ?, 1, ?)
-                            """, (security, exchange_metal_id, exchange_code, generic_number, 
-                                  description, datetime.now()))
-                            cursor.execute("SELECT @@IDENTITY")
-                            generic_id = cursor.fetchone()[0]
-                            conn.commit()
-                            logger.info(f"Created new generic future: {security} (ID: {generic_id}, Exchange: {exchange_code})")
-                    
-                # 6. 実際の契約月限（LPN25, HGN5, CUA5など）
-                elif (re.match(r'^LP[A-Z]\d{2}', security) or 
-                      re.match(r'^HG[A-Z]\d{1,2}', security) or 
-                      re.match(r'^CU[A-Z]\d{1,2}', security)):
-                    data_type = 'Actual'
-                    
-                    # 取引所コードを決定
-                    if security.startswith('LP'):
-                        exchange_code = 'LME'
-                    elif security.startswith('CU'):
-                        exchange_code = 'SHFE'
-                    elif security.startswith('HG'):
-                        exchange_code = 'COMEX'
-                    else:
-                        exchange_code = ticker_info.get('exchange', 'LME')
-                    
-                    # ActualContractIDの取得または作成
-                    with self.db_manager.get_connection() as conn:
-                        cursor = conn.cursor()
-                        cursor.execute("""
-                            SELECT ActualContractID FROM M_ActualContract
-                            WHERE ContractTicker = ?
-                        """, (security,))
-                        result = cursor.fetchone()
-                        if result:
-                            actual_contract_id = result[0]
-                        else:
-                            # 新規実契約の作成
-                            # この時点でmetal_idは既に正しい値（取引所別）になっている
-                            exchange_metal_id = metal_id
-                            
-                            cursor.execute("""
-                                INSERT INTO M_ActualContract 
-                                (ContractTicker, MetalID, ExchangeCode, IsActive, CreatedDate)
-                                VALUES (?, ?, ?, 1, GETDATE())
-                            """, (security, exchange_metal_id, exchange_code))
-                            cursor.execute("SELECT @@IDENTITY")
-                            actual_contract_id = cursor.fetchone()[0]
-                            conn.commit()
-                            logger.info(f"Created new actual contract: {security} (ID: {actual_contract_id}, Exchange: {exchange_code})")
-                            
-                else:
-                    # その他の場合はスキップ
-                    logger.warning(f"Unknown security type: {security}")
+                resolved = security_ids.get(security)
+                if resolved is None:
                     continue
+                    
+                metal_id, data_type, generic_id, actual_contract_id = resolved
+                trade_date = pd.to_datetime(row['date']).date()
                 
                 # 価格データの構築（新テーブル構造）
                 processed_row = {
@@ -197,22 +93,120 @@ class DataProcessor:
                 processed_row = self._clean_numeric_fields(processed_row)
                 processed_data.append(processed_row)
                 
-                logger.debug(f"Processed: {security} -> DataType={data_type}, GenericID={generic_id}, ActualContractID={actual_contract_id}")
-                
             except Exception as e:
-                logger.error(f"Error processing price data for {row.get('security')}: {e}")
+                sampled_logger.error("Error processing price data for {}: {}", row.get('security'), e,
+                                    key=f"Error processing price data for {row.get('security')}")
                 continue
                 
-        result_df = pd.DataFrame(processed_data)
+        result_df = compact_frame(pd.DataFrame(processed_data))
         logger.info(f"Processed {len(result_df)} price records")
         
         # データタイプ別の件数を表示
         if not result_df.empty:
-            type_counts = result_df.groupby('DataType').size()
+            type_counts = result_df.groupby('DataType', observed=True).size()
             logger.info(f"Data type breakdown: {type_counts.to_dict()}")
         
         return result_df
         
+    def _price_metal_code(self, spec, ticker_info: Dict) -> str:
+        """取引所別のメタルコード（LMEは設定のメタルコード）"""
+        return spec.metal if spec.metal in ('CU_SHFE', 'CU_CMX') else ticker_info.get('metal', 'COPPER')
+        
+    def _resolve_actual_contracts(self, df: pd.DataFrame, ticker_info: Dict) -> Dict[str, int]:
+        """
+        実契約ティッカーのActualContractIDを一括で解決（未登録の契約はまとめて作成）
+        
+        1桁年のティッカー（HGN5等）はデータの最初の日付を基準に年を判定する
+        
+        Args:
+            df: Bloombergから取得した生データ（security・date列）
+            ticker_info: ティッカー設定情報
+            
+        Returns:
+            Dict[str, int]: 証券コード -> ActualContractID
+        """
+        first_dates = pd.to_datetime(df['date']).groupby(df['security'].astype(str)).min()
+        specs = {security: get_ticker_spec(security) for security in first_dates.index}
+        actual = [security for security, spec in specs.items()
+                  if spec is not None and spec.table == 'T_CommodityPrice' and spec.data_type == 'Actual']
+        if not actual:
+            return {}
+            
+        metal_codes = {security: self._price_metal_code(specs[security], ticker_info) for security in actual}
+        metal_ids = self.db_manager.resolve_master_ids('metals', list(set(metal_codes.values())))
+        
+        return get_contract_resolver(self.db_manager).resolve(pd.DataFrame({
+            'ContractTicker': actual,
+            'MetalID': [metal_ids.get(metal_codes[security]) for security in actual],
+            'ExchangeCode': [specs[security].exchange or ticker_info.get('exchange', 'LME') for security in actual],
+            'AsOf': first_dates[actual].values
+        }))
+        
+    def _resolve_price_security(self, security: str, ticker_info: Dict,
+                                actual_contract_ids: Optional[Dict[str, int]] = None) -> Optional[Tuple]:
+        """
+        価格ティッカーのメタルID・データタイプ・GenericID・ActualContractIDを解決
+        
+        Args:
+            security: 証券コード
+            ticker_info: ティッカー設定情報
+            actual_contract_ids: 証券コード -> ActualContractID（_resolve_actual_contractsの結果）
+            
+        Returns:
+            Optional[Tuple]: (MetalID, DataType, GenericID, ActualContractID)、判定できない場合はNone
+        """
+        spec = get_ticker_spec(security)
+        if spec is None or spec.table != 'T_CommodityPrice' or spec.data_type is None:
+            logger.warning(f"Unknown security type: {security}")
+            return None
+            
+        metal_code = self._price_metal_code(spec, ticker_info)
+        metal_id = self.db_manager.get_or_create_master_id('metals', metal_code)
+        exchange_code = spec.exchange or ticker_info.get('exchange', 'LME')
+        
+        generic_id = None
+        actual_contract_id = None
+        
+        if spec.data_type == 'Generic':
+            # M_GenericFuturesからGenericIDを取得
+            with self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT GenericID FROM M_GenericFutures 
+                    WHERE GenericTicker = ? AND IsActive = 1
+                """, (security,))
+                result = cursor.fetchone()
+                if result:
+                    generic_id = result[0]
+                    logger.debug("Found existing generic future: {} (ID: {})", security, generic_id)
+                else:
+                    # 新規ジェネリック先物の場合は作成
+                    # LP1 -> 1, CU1 -> 1, HG1 -> 1のようにジェネリック番号を抽出
+                    generic_number = self._extract_generic_number(security)
+                    description = f"{exchange_code} Copper Generic {generic_number} Future"
+                    
+                    cursor.execute("""
+                        INSERT INTO M_GenericFutures (
+                            GenericTicker, MetalID, ExchangeCode, GenericNumber, 
+                            Description, IsActive, CreatedDate
+                        ) VALUES (?, ?, ?, ?, ?, 1, ?)
+                    """, (security, metal_id, exchange_code, generic_number, 
+                          description, datetime.now()))
+                    cursor.execute("SELECT @@IDENTITY")
+                    generic_id = cursor.fetchone()[0]
+                    conn.commit()
+                    logger.info(f"Created new generic future: {security} (ID: {generic_id}, Exchange: {exchange_code})")
+                    
+        elif spec.data_type == 'Actual':
+            actual_contract_id = (actual_contract_ids or {}).get(security)
+            if actual_contract_id is None:
+                logger.warning(f"Actual contract not resolved, skipping: {security}")
+                return None
+                    
+        logger.debug("Resolved: {} -> DataType={}, GenericID={}, ActualContractID={}",
+                     security, spec.data_type, generic_id, actual_contract_id)
+        return metal_id, spec.data_type, generic_id, actual_contract_id
+        
     def _extract_generic_number(self, ticker: str) -> int:
         """ティッカーからジェネリック番号を抽出"""
         # LP1 -> 1, LP12 -> 12, CU1 -> 1, HG1 -> 1
@@ -233,78 +227,60 @@ class DataProcessor:
         if df.empty:
             return pd.DataFrame()
             
-        # 在庫データを地域・タイプ別に整理
-        inventory_by_region = {}
+        # 地域・データタイプはティッカーレジストリから取得
+        lookup = ticker_frame('LME_INVENTORY').set_index('security')
+        # securityはcategory型のため、後段で未知ティッカーの値を代入できるようobject型で受ける
+        region_codes = df['security'].map(lookup['region']).astype(object)
+        data_types = df['security'].map(lookup['data_type']).astype(object)
+        
+        # 設定にないティッカーはプレフィックスと地域サフィックスから判定（例: 'NLSCA %AMER Index' -> NLSCA, %AMER Index）
+        unknown = data_types.isna()
+        if unknown.any():
+            prefix_pattern = '|'.join(LME_INVENTORY_DATA_TYPES)
+            parts = df.loc[unknown, 'security'].str.extract(rf'({prefix_pattern}).*?(%\S+ Index)?$')
+            data_types[unknown] = parts[0].map(LME_INVENTORY_DATA_TYPES)
+            # 地域指定がない、または未定義のサフィックスはGLOBAL
+            region_codes[unknown] = parts[1].map(ticker_info['region_mapping']).fillna('GLOBAL')
+        
+        # 値の取得（PX_LASTが0/NaNの場合は代替フィールドを列方向に補完）
+        value_fields = [f for f in INVENTORY_VALUE_FIELDS if f in df.columns]
+        if value_fields:
+            raw_values = df[value_fields].apply(pd.to_numeric, errors='coerce')
+            values = raw_values.where(raw_values != 0).bfill(axis=1).iloc[:, 0]
+            
+            if 'PX_LAST' in raw_values:
+                px_last = raw_values['PX_LAST']
+                zero_count = int((px_last.isna() | (px_last == 0)).sum())
+                if zero_count > 0:
+                    logger.warning(f"Zero/NaN PX_LAST for {zero_count} inventory rows, using fallback fields where available")
+                # 代替フィールドも無い場合は元の値を維持
+                values = values.fillna(px_last)
+        else:
+            values = pd.Series(0, index=df.index)
+            
+        records = pd.DataFrame({
+            'ReportDate': pd.to_datetime(df['date']).dt.date,
+            'RegionCode': region_codes,
+            'DataType': data_types,
+            'Value': values
+        }).dropna(subset=['DataType'])
+        
+        if records.empty:
+            logger.info("Processed 0 inventory records")
+            return pd.DataFrame()
+            
+        # 日付×地域ごとに1行へピボット（同一キーは後のデータを優先）
+        records = records.drop_duplicates(subset=['ReportDate', 'RegionCode', 'DataType'], keep='last')
+        result_df = records.pivot(index=['ReportDate', 'RegionCode'], columns='DataType', values='Value').reset_index()
+        result_df.columns.name = None
+        
+        # マスタIDはコードごとに1回だけ解決
+        region_ids = self.db_manager.resolve_master_ids('regions', list(result_df['RegionCode'].unique()))
+        result_df.insert(1, 'RegionID', result_df.pop('RegionCode').map(region_ids))
+        result_df.insert(2, 'MetalID', self.db_manager.get_or_create_master_id('metals', ticker_info['metal']))
         
-        for _, row in df.iterrows():
-            try:
-                security = row['security']
-                report_date = pd.to_datetime(row['date']).date()
-                value = row.get('PX_LAST', 0)
-                
-                # デバッグ: 値が0の場合の確認
-                if value == 0 or pd.isna(value):
-                    logger.warning(f"Zero/NaN value for {security} on {report_date}. Available fields: {list(row.keys())}")
-                    # 他のフィールドを確認
-                    for field in ['LAST_PRICE', 'PX_CLOSE', 'PX_MID', 'PX_BID', 'PX_ASK']:
-                        if field in row and row[field] != 0 and not pd.isna(row[field]):
-                            value = row[field]
-                            logger.info(f"Using {field} instead: {value}")
-                            break
-                
-                # 地域の識別
-                region_code = 'GLOBAL'  # デフォルト
-                
-                # デバッグ: ティッカーと地域マッピングをログ出力
-                logger.debug(f"Processing security: {security}")
-                logger.debug(f"Available region mappings: {ticker_info['region_mapping']}")
-                
-                # 地域マッピングをチェック
-                for suffix, region in ticker_info['region_mapping'].items():
-                    logger.debug(f"Checking if '{security}' ends with '{suffix}'")
-                    if suffix in security and security.endswith(suffix):
-                        region_code = region
-                        logger.info(f"Matched region: {security} -> {region_code}")
-                        break
-                        
-                # "Index"で終わり、地域指定がない場合はGLOBAL
-                if security.endswith(' Index') and '%' not in security:
-                    region_code = 'GLOBAL'
-                    logger.debug(f"Set to GLOBAL: {security}")
-                
-                logger.debug(f"Final region_code for {security}: {region_code}")
-                        
-                # データタイプの識別
-                data_type = None
-                if 'NLSCA' in security:
-                    data_type = 'TotalStock'
-                elif 'NLECA' in security:
-                    data_type = 'OnWarrant'
-                elif 'NLFCA' in security:
-                    data_type = 'CancelledWarrant'
-                elif 'NLJCA' in security:
-                    data_type = 'Inflow'
-                elif 'NLKCA' in security:
-                    data_type = 'Outflow'
-                    
-                if data_type:
-                    key = (report_date, region_code)
-                    if key not in inventory_by_region:
-                        inventory_by_region[key] = {
-                            'ReportDate': report_date,
-                            'RegionID': self.db_manager.get_or_create_master_id('regions', region_code),
-                            'MetalID': self.db_manager.get_or_create_master_id('metals', ticker_info['metal'])
-                        }
-                    inventory_by_region[key][data_type] = value
-                    
-            except Exception as e:
-                logger.error(f"Error processing inventory data for {row.get('security')}: {e}")
-                continue
-                
-        # DataFrameに変換
-        result_df = pd.DataFrame(list(inventory_by_region.values()))
         logger.info(f"Processed {len(result_df)} inventory records")
-        return result_df
+        return compact_frame(result_df)
         
     def process_market_indicators(self, df: pd.DataFrame, ticker_info: Dict) -> pd.DataFrame:
         """
@@ -320,6 +296,27 @@ class DataProcessor:
         if df.empty:
             return pd.DataFrame()
             
+        # メタルIDの取得（金属特有の指標の場合）
+        metal_id = None
+        if 'metal' in ticker_info:
+            metal_id = self.db_manager.get_or_create_master_id('metals', ticker_info['metal'])
+            
+        # インジケーターIDの取得（証券ごとに1回、未登録分は一括作成）
+        securities = list(df['security'].unique())
+        codes = {security: security.split()[0] for security in securities}  # "SOFRRATE Index" -> "SOFRRATE"
+        extra = {}
+        for security in securities:
+            spec = get_ticker_spec(security)
+            extra[codes[security]] = {
+                'Category': ticker_info.get('category', 'Unknown'),
+                'Unit': spec.unit if spec and spec.unit else indicator_unit(security),
+                'Freq': 'Daily'
+            }
+        code_ids = self.db_manager.resolve_master_ids(
+            'indicators', list(codes.values()),
+            names={code: security for security, code in codes.items()}, extra=extra
+        )
+        
         processed_data = []
         
         for _, row in df.iterrows():
@@ -327,26 +324,7 @@ class DataProcessor:
                 security = row['security']
                 report_date = pd.to_datetime(row['date']).date()
                 value = row.get('PX_LAST')
-                
-                # インジケーターコードの生成
-                indicator_code = security.split()[0]  # "SOFRRATE Index" -> "SOFRRATE"
-                
-                # インジケーターIDの取得
-                indicator_id = self.db_manager.get_or_create_master_id(
-                    'indicators', 
-                    indicator_code,
-                    name=security,
-                    additional_fields={
-                        'Category': ticker_info.get('category', 'Unknown'),
-                        'Unit': self._determine_unit(security),
-                        'Freq': 'Daily'
-                    }
-                )
-                
-                # メタルIDの取得（金属特有の指標の場合）
-                metal_id = None
-                if 'metal' in ticker_info:
-                    metal_id = self.db_manager.get_or_create_master_id('metals', ticker_info['metal'])
+                indicator_id = code_ids[codes[security]]
                     
                 processed_row = {
                     'ReportDate': report_date,
@@ -358,10 +336,11 @@ class DataProcessor:
                 processed_data.append(processed_row)
                 
             except Exception as e:
-                logger.error(f"Error processing indicator data for {row.get('security')}: {e}")
+                sampled_logger.error("Error processing indicator data for {}: {}", row.get('security'), e,
+                                    key=f"Error processing indicator data for {row.get('security')}")
                 continue
                 
-        result_df = pd.DataFrame(processed_data)
+        result_df = compact_frame(pd.DataFrame(processed_data))
         logger.info(f"Processed {len(result_df)} indicator records")
         return result_df
         
@@ -379,67 +358,34 @@ class DataProcessor:
         if df.empty:
             return pd.DataFrame()
             
-        # COTRデータをカテゴリ別に整理
-        cotr_by_date = {}
+        # ティッカー属性を結合（対応表にないティッカーは除外）
+        records = df.assign(Value=df['PX_LAST'] if 'PX_LAST' in df.columns else 0)
+        lookup = ticker_frame('COTR_DATA')[['security', 'group', 'data_type']]
+        lookup = lookup.rename(columns={'group': 'Category', 'data_type': 'Column'})
+        records = records[['security', 'date', 'Value']].merge(lookup, on='security', how='inner')
+        
+        if records.empty:
+            logger.info("Processed 0 COTR records")
+            return pd.DataFrame()
+            
+        records['ReportDate'] = pd.to_datetime(records['date']).dt.date
+        records = records.drop_duplicates(subset=['ReportDate', 'Category', 'Column'], keep='last')
+        
+        # 日付×カテゴリごとに1行へピボット
+        result_df = records.pivot(index=['ReportDate', 'Category'], columns='Column', values='Value').reset_index()
+        result_df.columns.name = None
+        
+        # NetPositionを計算（ロング・ショート両方のポジションがある場合）
+        if 'LongPosition' in result_df.columns and 'ShortPosition' in result_df.columns:
+            result_df['NetPosition'] = result_df['LongPosition'] - result_df['ShortPosition']
+            
+        # マスタIDはコードごとに1回だけ解決
+        category_ids = self.db_manager.resolve_master_ids('cotr_categories', list(result_df['Category'].unique()))
+        result_df.insert(1, 'MetalID', self.db_manager.get_or_create_master_id('metals', 'COPPER'))
+        result_df.insert(2, 'COTRCategoryID', result_df.pop('Category').map(category_ids))
         
-        for _, row in df.iterrows():
-            try:
-                security = row['security']
-                report_date = pd.to_datetime(row['date']).date()
-                value = row.get('PX_LAST', 0)
-                
-                # カテゴリの識別
-                category = None
-                position_type = None
-                
-                if 'CTCTMHZA' in security or 'CTCTLUZX' in security:
-                    category = 'Investment Funds'
-                    position_type = 'long'
-                elif 'CTCTGKLQ' in security or 'CTCTWVTK' in security:
-                    category = 'Investment Funds'
-                    position_type = 'short'
-                elif 'CTCTVDQG' in security or 'CTCTFSWP' in security:
-                    category = 'Commercial Undertakings'
-                    position_type = 'long'
-                elif 'CTCTFHAX' in security or 'CTCTZTIH' in security:
-                    category = 'Commercial Undertakings'
-                    position_type = 'short'
-                    
-                if category:
-                    key = (report_date, category)
-                    if key not in cotr_by_date:
-                        cotr_by_date[key] = {
-                            'ReportDate': report_date,
-                            'MetalID': self.db_manager.get_or_create_master_id('metals', 'COPPER'),
-                            'COTRCategoryID': self.db_manager.get_or_create_master_id('cotr_categories', category)
-                        }
-                        
-                    # ポジションまたはパーセンテージの設定
-                    if 'LUZX' in security or 'WVTK' in security or 'FSWP' in security or 'ZTIH' in security:
-                        # パーセンテージデータ
-                        if position_type == 'long':
-                            cotr_by_date[key]['LongPctOpenInterest'] = value
-                        else:
-                            cotr_by_date[key]['ShortPctOpenInterest'] = value
-                    else:
-                        # ポジションデータ
-                        if position_type == 'long':
-                            cotr_by_date[key]['LongPosition'] = value
-                        else:
-                            cotr_by_date[key]['ShortPosition'] = value
-                            
-            except Exception as e:
-                logger.error(f"Error processing COTR data for {row.get('security')}: {e}")
-                continue
-                
-        # NetPositionを計算
-        for data in cotr_by_date.values():
-            if 'LongPosition' in data and 'ShortPosition' in data:
-                data['NetPosition'] = data.get('LongPosition', 0) - data.get('ShortPosition', 0)
-                
-        result_df = pd.DataFrame(list(cotr_by_date.values()))
         logger.info(f"Processed {len(result_df)} COTR records")
-        return result_df
+        return compact_frame(result_df)
         
     def process_banding_report(self, df: pd.DataFrame, ticker_info: Dict) -> pd.DataFrame:
         """
@@ -455,74 +401,32 @@ class DataProcessor:
         if df.empty:
             return pd.DataFrame()
             
-        processed_data = []
+        # ティッカー属性を結合（対応表にないティッカーは除外）
+        records = df.assign(Value=df['PX_LAST'] if 'PX_LAST' in df.columns else 0)
+        lookup = ticker_frame()
+        lookup = lookup.loc[lookup['table'] == 'T_BandingReport', ['security', 'data_type', 'band', 'tenor']]
+        lookup = lookup.rename(columns={'data_type': 'ReportType', 'band': 'BandCode', 'tenor': 'TenorName'})
+        records = records[['security', 'date', 'Value']].merge(lookup, on='security', how='inner')
+        
+        if records.empty:
+            logger.info("Processed 0 banding records")
+            return pd.DataFrame()
+            
+        # マスタIDはコードごとに1回だけ解決
+        band_ids = self.db_manager.resolve_master_ids('holding_bands', list(records['BandCode'].unique()))
+        tenor_ids = self.db_manager.resolve_master_ids('tenor_types', list(records['TenorName'].dropna().unique()))
+        
+        result_df = pd.DataFrame({
+            'ReportDate': pd.to_datetime(records['date']).dt.date,
+            'MetalID': self.db_manager.get_or_create_master_id('metals', 'COPPER'),
+            'ReportType': records['ReportType'],
+            'TenorTypeID': records['TenorName'].map(tenor_ids),
+            'BandID': records['BandCode'].map(band_ids),
+            'Value': records['Value']
+        })
         
-        for _, row in df.iterrows():
-            try:
-                security = row['security']
-                report_date = pd.to_datetime(row['date']).date()
-                value = row.get('PX_LAST', 0)
-                
-                # レポートタイプとバンドの識別
-                report_type = None
-                band_code = None
-                tenor_type_id = None
-                
-                # 先物バンディング
-                if 'LMFBJ' in security:
-                    match = re.search(r'LMFBJ([A-J])M(\d)', security)
-                    if match:
-                        band_letter = match.group(1)
-                        month_num = match.group(2)
-                        
-                        if band_letter in ['A', 'B', 'C', 'D', 'E']:
-                            report_type = 'Futures Long'
-                        else:
-                            report_type = 'Futures Short'
-                            
-                        band_code = ticker_info['band_mapping'].get(band_letter, 'Unknown')
-                        tenor_name = f'Generic {month_num}st Future' if month_num == '1' else \
-                                    f'Generic {month_num}nd Future' if month_num == '2' else \
-                                    f'Generic {month_num}rd Future'
-                        tenor_type_id = self.db_manager.get_or_create_master_id('tenor_types', tenor_name)
-                        
-                # ワラントバンディング
-                elif 'LMWHCA' in security:
-                    match = re.search(r'LMWHCA([A-Z])([A-E])', security)
-                    if match:
-                        type_letter = match.group(1)
-                        band_letter = match.group(2)
-                        
-                        if type_letter == 'D':
-                            report_type = 'Warrant'
-                        elif type_letter == 'C':
-                            report_type = 'Cash'
-                        elif type_letter == 'T':
-                            report_type = 'Tom'
-                            
-                        band_code = ticker_info['band_mapping'].get(band_letter, 'Unknown')
-                        
-                if report_type and band_code:
-                    band_id = self.db_manager.get_or_create_master_id('holding_bands', band_code)
-                    
-                    processed_row = {
-                        'ReportDate': report_date,
-                        'MetalID': self.db_manager.get_or_create_master_id('metals', 'COPPER'),
-                        'ReportType': report_type,
-                        'TenorTypeID': tenor_type_id,
-                        'BandID': band_id,
-                        'Value': value
-                    }
-                    
-                    processed_data.append(processed_row)
-                    
-            except Exception as e:
-                logger.error(f"Error processing banding data for {row.get('security')}: {e}")
-                continue
-                
-        result_df = pd.DataFrame(processed_data)
         logger.info(f"Processed {len(result_df)} banding records")
-        return result_df
+        return compact_frame(result_df)
         
     def process_company_stocks(self, df: pd.DataFrame, ticker_info: Dict) -> pd.DataFrame:
         """
@@ -557,10 +461,11 @@ class DataProcessor:
                 processed_data.append(processed_row)
                 
             except Exception as e:
-                logger.error(f"Error processing stock data for {row.get('security')}: {e}")
+                sampled_logger.error("Error processing stock data for {}: {}", row.get('security'), e,
+                                    key=f"Error processing stock data for {row.get('security')}")
                 continue
                 
-        result_df = pd.DataFrame(processed_data)
+        result_df = compact_frame(pd.DataFrame(processed_data))
         logger.info(f"Processed {len(result_df)} stock records")
         return result_df
         
@@ -596,24 +501,3 @@ class DataProcessor:
                         data[field] = None
                         
         return data
-        
-    def _determine_unit(self, security: str) -> str:
-        """
-        証券名から単位を推定
-        
-        Args:
-            security: 証券名
-            
-        Returns:
-            str: 単位
-        """
-        if 'Index' in security:
-            return 'Index Points'
-        elif 'Curncy' in security:
-            return 'Currency'
-        elif '%' in security or 'RATE' in security:
-            return '%'
-        elif 'Comdty' in security:
-            return 'USD'
-        else:
-            return 'Units'
\ No newline at end of file
@@ -1,6 +1,9 @@
 """
 SQL Serverデータベース接続・操作モジュール
 """
+import hashlib
+import json
+import pickle
 import pyodbc
 import pandas as pd
 from typing import Dict, List, Optional, Any, Tuple
@@ -14,13 +17,58 @@ from contextlib import contextmanager
 # プロジェクトルートとsrcディレクトリをPythonパスに追加
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 src_dir = os.path.join(project_root, 'src')
-sys.path.insert(0, project_root)
-sys.path.insert(0, src_dir)
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
 from config.database_config import (
-    get_connection_string, TABLES, BATCH_SIZE, MAX_RETRIES, RETRY_DELAY
+    get_connection_string, DATABASE_CONFIG, MASTER_SNAPSHOT_FILE, TABLES, BATCH_SIZE, MAX_RETRIES, RETRY_DELAY, QUARANTINE_DIR,
+    ENABLE_PARTITION_SWITCH, PARTITIONED_TABLES, PARTITION_SWITCH_MIN_ROWS, ENRICHED_REFRESH_PROCEDURE,
+    WRITE_BUFFER_MAX_ROWS, WRITE_BUFFER_MAX_SECONDS, TABLE_DATE_COLUMNS, MERGE_KEY_SHAPES,
+    BULK_INSERT_BATCH_SIZE, BULK_INSERT_DISABLE_INDEXES, BULK_INSERT_INDEX_MIN_ROWS
 )
 from config.logging_config import logger
+from utils import DATE_COLUMNS
+
+# マスタデータのカテゴリ -> (テーブル名, コードカラム, 名前カラム, IDカラム)
+MASTER_TABLES = {
+    'metals': ('M_Metal', 'MetalCode', 'MetalName', 'MetalID'),
+    'tenor_types': ('M_TenorType', 'TenorTypeName', 'Description', 'TenorTypeID'),
+    'indicators': ('M_Indicator', 'IndicatorCode', 'IndicatorName', 'IndicatorID'),
+    'regions': ('M_Region', 'RegionCode', 'RegionName', 'RegionID'),
+    'cotr_categories': ('M_COTRCategory', 'CategoryName', 'Description', 'COTRCategoryID'),
+    'holding_bands': ('M_HoldingBand', 'BandRange', 'Description', 'BandID')
+}
+
+# スナップショットで保持するマスタテーブル: 名前 -> (テーブル名, IDカラム)
+# MASTER_TABLESの6テーブルに加え、先物・実契約・営業日カレンダーも保持する
+SNAPSHOT_TABLES = {
+    **{category: (table, id_column) for category, (table, _, _, id_column) in MASTER_TABLES.items()},
+    'generic_futures': ('M_GenericFutures', 'GenericID'),
+    'actual_contracts': ('M_ActualContract', 'ActualContractID'),
+    'trading_calendar': ('M_TradingCalendar', 'CalendarID')
+}
+
+# スナップショットファイルの形式バージョン
+MASTER_SNAPSHOT_VERSION = 1
+
+# マスタ一括解決時の1バッチあたりのパラメータ数上限（SQL Serverの上限は2100）
+MASTER_PARAMETER_LIMIT = 2000
+
+# ステージテーブルへの一括INSERTの1回あたりの行数
+STAGE_INSERT_BATCH_SIZE = 100000
+
+# 一時的なエラーと判定するSQLSTATE（シリアライズ失敗/デッドロック、通信リンク障害、接続不可、タイムアウト）
+TRANSIENT_SQLSTATES = {'40001', '08S01', '08001', 'HYT00', 'HYT01'}
+
+# 一時的なエラーと判定するSQL Server/Azure SQLのエラー番号
+# 1205: デッドロック、40501: サービスビジー、40613: DB利用不可、40197: 処理エラー（フェイルオーバー）、
+# 10928/10929: リソース上限、49918-49920: 要求過多、4060: DBを開けない、10053/10054: 接続断、233: 接続切断
+TRANSIENT_ERROR_CODES = {1205, 40501, 40613, 40197, 10928, 10929, 49918, 49919, 49920, 4060, 10053, 10054, 233}
+
+# 行の値に起因するエラーと判定するSQLSTATEのクラス（22: データ例外（文字列切り捨て・数値オーバーフロー・変換失敗）、
+# 23: 整合性制約違反（一意キー重複・CHECK制約・外部キー））
+DATA_ERROR_SQLSTATE_CLASSES = ('22', '23')
 
 
 class DatabaseManager:
@@ -30,6 +78,10 @@ class DatabaseManager:
         self.connection_string = get_connection_string()
         self.connection = None
         self.master_data = {}
+        # スナップショット対象のマスタテーブル全体（名前 -> DataFrame。load_master_dataで設定）
+        self.master_tables: Dict[str, pd.DataFrame] = {}
+        # テーブル名 -> {'frames', 'rows', 'unique_columns', 'backfill', 'started'}（buffer_upsert）
+        self._write_buffer: Dict[str, Dict[str, Any]] = {}
         
     @contextmanager
     def get_connection(self):
@@ -57,60 +109,220 @@ class DatabaseManager:
             raise
             
     def disconnect(self):
-        """データベース接続を切断"""
+        """データベース接続を切断（未格納の書き込みバッファは格納してから切断）"""
+        if self._write_buffer:
+            logger.warning(f"Flushing pending buffered writes before disconnect: {list(self._write_buffer)}")
+            self.flush_writes()
         if self.connection:
             self.connection.close()
             logger.info("Disconnected from database")
             
     def load_master_data(self):
-        """マスタデータをメモリにロード"""
+        """
+        マスタデータをメモリにロード
+        
+        ローカルスナップショットがある場合は、各テーブルの変更トークン（行数・最大ID・チェックサム）を
+        1クエリで取得し、変化のないテーブルはスナップショットから、追加のみのテーブルは差分のみ、
+        それ以外は全件を1回のバッチ（複数結果セット）で取得する。スナップショットがない場合は
+        変更トークンと全テーブルを1回のバッチで取得する
+        """
         try:
+            snapshot = self._read_master_snapshot()
+            
             with self.get_connection() as conn:
-                # pandas警告を抑制
-                import warnings
-                with warnings.catch_warnings():
-                    warnings.filterwarnings("ignore", message="pandas only supports SQLAlchemy")
-                    
-                    # M_Metal
-                    query = "SELECT MetalID, MetalCode, MetalName FROM M_Metal"
-                    metals_df = pd.read_sql(query, conn)
-                    self.master_data['metals'] = dict(zip(metals_df['MetalCode'], metals_df['MetalID']))
-                    
-                    # M_TenorType
-                    query = "SELECT TenorTypeID, TenorTypeName FROM M_TenorType"
-                    tenor_df = pd.read_sql(query, conn)
-                    self.master_data['tenor_types'] = dict(zip(tenor_df['TenorTypeName'], tenor_df['TenorTypeID']))
-                    
-                    # M_Indicator
-                    query = "SELECT IndicatorID, IndicatorCode FROM M_Indicator"
-                    indicator_df = pd.read_sql(query, conn)
-                    self.master_data['indicators'] = dict(zip(indicator_df['IndicatorCode'], indicator_df['IndicatorID']))
-                    
-                    # M_Region
-                    query = "SELECT RegionID, RegionCode FROM M_Region"
-                    region_df = pd.read_sql(query, conn)
-                    self.master_data['regions'] = dict(zip(region_df['RegionCode'], region_df['RegionID']))
-                    
-                    # M_COTRCategory
-                    query = "SELECT COTRCategoryID, CategoryName FROM M_COTRCategory"
-                    cotr_df = pd.read_sql(query, conn)
-                    self.master_data['cotr_categories'] = dict(zip(cotr_df['CategoryName'], cotr_df['COTRCategoryID']))
+                cursor = conn.cursor()
+                if snapshot is None:
+                    plan = {name: None for name in SNAPSHOT_TABLES}
+                    tokens, frames = self._fetch_masters(cursor, plan, None)
+                else:
+                    tokens = self._fetch_master_tokens(cursor, snapshot['tokens'])
+                    plan = self._plan_master_refresh(snapshot['tokens'], tokens)
+                    frames = self._fetch_masters(cursor, plan, tokens)[1] if plan else {}
                     
-                    # M_HoldingBand
-                    query = "SELECT BandID, BandRange FROM M_HoldingBand"
-                    band_df = pd.read_sql(query, conn)
-                    self.master_data['holding_bands'] = dict(zip(band_df['BandRange'], band_df['BandID']))
+            tables = dict(snapshot['tables']) if snapshot else {}
+            for name, frame in frames.items():
+                if plan[name] is not None:
+                    # 追加行のみ取得したテーブル（トークン取得後に追加された行との重複はIDで除く）
+                    id_column = SNAPSHOT_TABLES[name][1]
+                    frame = pd.concat([tables[name], frame], ignore_index=True) \
+                        .drop_duplicates(subset=[id_column], keep='last').reset_index(drop=True)
+                tables[name] = frame
+            changed = list(plan)
+            
+            self.master_tables = tables
+            for category, (_, code_column, _, id_column) in MASTER_TABLES.items():
+                df = tables[category]
+                self.master_data[category] = dict(zip(df[code_column], df[id_column]))
+                
+            if changed:
+                self._write_master_snapshot(tokens, tables)
                 
-                logger.info("Master data loaded successfully")
-                logger.debug(f"Loaded {len(self.master_data['metals'])} metals, "
-                           f"{len(self.master_data['tenor_types'])} tenor types, "
-                           f"{len(self.master_data['indicators'])} indicators, "
-                           f"{len(self.master_data['regions'])} regions")
+            logger.info(f"Master data loaded successfully "
+                        f"({len(SNAPSHOT_TABLES) - len(changed)} tables from snapshot, "
+                        f"{len(changed)} refreshed: {changed})")
+            logger.debug(f"Loaded {len(self.master_data['metals'])} metals, "
+                       f"{len(self.master_data['tenor_types'])} tenor types, "
+                       f"{len(self.master_data['indicators'])} indicators, "
+                       f"{len(self.master_data['regions'])} regions")
                 
         except Exception as e:
             logger.error(f"Failed to load master data: {e}")
             raise
             
+    def _fetch_master_tokens(self, cursor, previous_tokens: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+        """
+        全マスタテーブルの変更トークンを1クエリで取得
+        
+        Args:
+            cursor: カーソル
+            previous_tokens: スナップショットの変更トークン（前回の最大ID以下の行の件数・チェックサムも取得する）
+            
+        Returns:
+            Dict[str, Dict]: 名前 -> {'rows', 'max_id', 'checksum', 'prefix_rows', 'prefix_checksum'}
+        """
+        query, params = self._master_token_query(previous_tokens)
+        cursor.execute(query, params)
+        return self._read_master_tokens(cursor)
+        
+    def _master_token_query(self, previous_tokens: Optional[Dict[str, Dict]]) -> Tuple[str, List[Any]]:
+        """変更トークン取得クエリ（テーブルごとのSELECTをUNION ALLで1結果セットにする）"""
+        selects = []
+        params: List[Any] = []
+        for name, (table, id_column) in SNAPSHOT_TABLES.items():
+            previous_max = (previous_tokens or {}).get(name, {}).get('max_id')
+            selects.append(f"""
+                SELECT N'{name}' AS Name, COUNT_BIG(*) AS RowCnt, MAX({id_column}) AS MaxID,
+                       CHECKSUM_AGG(BINARY_CHECKSUM(*)) AS Chk,
+                       SUM(CASE WHEN {id_column} <= ? THEN 1 ELSE 0 END) AS PrefixCnt,
+                       CHECKSUM_AGG(CASE WHEN {id_column} <= ? THEN BINARY_CHECKSUM(*) END) AS PrefixChk
+                FROM {table}""")
+            params.extend([previous_max if previous_max is not None else -1] * 2)
+        return ' UNION ALL '.join(selects), params
+        
+    @staticmethod
+    def _read_master_tokens(cursor) -> Dict[str, Dict]:
+        """変更トークンの結果セットを読み込む"""
+        return {
+            name: {
+                'rows': int(row_count), 'max_id': int(max_id) if max_id is not None else None,
+                'checksum': checksum, 'prefix_rows': int(prefix_rows or 0), 'prefix_checksum': prefix_checksum
+            }
+            for name, row_count, max_id, checksum, prefix_rows, prefix_checksum in cursor.fetchall()
+        }
+        
+    @staticmethod
+    def _is_append_only(previous: Dict, current: Dict) -> bool:
+        """前回の最大ID以下の行が変わらず、行が追加されただけか"""
+        return previous['max_id'] is not None and \
+            current['prefix_rows'] == previous['rows'] and \
+            current['prefix_checksum'] == previous['checksum']
+            
+    def _plan_master_refresh(self, previous_tokens: Dict[str, Dict],
+                             tokens: Dict[str, Dict]) -> Dict[str, Optional[int]]:
+        """
+        変更トークンを比較し、取得が必要なテーブルを決める
+        
+        Returns:
+            Dict[str, Optional[int]]: 名前 -> 差分取得の起点ID（全件取得の場合はNone）。変化のないテーブルは含まない
+        """
+        plan = {}
+        for name in SNAPSHOT_TABLES:
+            previous, current = previous_tokens.get(name), tokens[name]
+            if previous is None:
+                plan[name] = None
+            elif (previous['rows'], previous['max_id'], previous['checksum']) == \
+                    (current['rows'], current['max_id'], current['checksum']):
+                continue
+            elif self._is_append_only(previous, current):
+                plan[name] = previous['max_id']
+            else:
+                plan[name] = None
+        return plan
+        
+    def _fetch_masters(self, cursor, plan: Dict[str, Optional[int]],
+                       tokens: Optional[Dict[str, Dict]]) -> Tuple[Dict[str, Dict], Dict[str, pd.DataFrame]]:
+        """
+        計画されたマスタテーブルを1回のバッチ（複数結果セット）で取得
+        
+        Args:
+            cursor: カーソル
+            plan: 名前 -> 差分取得の起点ID（Noneは全件）
+            tokens: 取得済みの変更トークン（Noneの場合は同じバッチの先頭で取得する）
+            
+        Returns:
+            Tuple[Dict[str, Dict], Dict[str, pd.DataFrame]]: (変更トークン, 名前 -> 取得した行)
+        """
+        statements = ['SET NOCOUNT ON;']
+        params: List[Any] = []
+        if tokens is None:
+            token_query, token_params = self._master_token_query(None)
+            statements.append(token_query + ';')
+            params.extend(token_params)
+            
+        for name, since_id in plan.items():
+            table, id_column = SNAPSHOT_TABLES[name]
+            if since_id is None:
+                statements.append(f"SELECT * FROM {table};")
+            else:
+                statements.append(f"SELECT * FROM {table} WHERE {id_column} > ?;")
+                params.append(since_id)
+                
+        cursor.execute('\n'.join(statements), params)
+        
+        if tokens is None:
+            tokens = self._read_master_tokens(cursor)
+            cursor.nextset()
+            
+        frames = {}
+        for index, name in enumerate(plan):
+            columns = [column[0] for column in cursor.description]
+            frames[name] = pd.DataFrame.from_records([tuple(row) for row in cursor.fetchall()], columns=columns)
+            if index < len(plan) - 1:
+                cursor.nextset()
+        return tokens, frames
+        
+    @staticmethod
+    def _snapshot_identity() -> str:
+        """スナップショットの接続先識別子（別サーバー・DBのスナップショットを使わない）"""
+        return hashlib.sha256(
+            f"{DATABASE_CONFIG['server']}/{DATABASE_CONFIG['database']}".encode('utf-8')
+        ).hexdigest()
+        
+    def _read_master_snapshot(self) -> Optional[Dict[str, Any]]:
+        """ローカルスナップショットを読み込む（存在しない・形式違い・接続先違いの場合はNone）"""
+        if not os.path.exists(MASTER_SNAPSHOT_FILE):
+            return None
+        try:
+            with open(MASTER_SNAPSHOT_FILE, 'rb') as f:
+                snapshot = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable master snapshot {MASTER_SNAPSHOT_FILE}: {e}")
+            return None
+            
+        if snapshot.get('version') != MASTER_SNAPSHOT_VERSION or \
+                snapshot.get('identity') != self._snapshot_identity() or \
+                set(snapshot.get('tables', {})) != set(SNAPSHOT_TABLES):
+            logger.info("Master snapshot is for a different version or database, reloading")
+            return None
+        return snapshot
+        
+    def _write_master_snapshot(self, tokens: Dict[str, Dict], tables: Dict[str, pd.DataFrame]):
+        """ローカルスナップショットを保存（書き込み途中の中断で壊れないよう置き換えで保存）"""
+        try:
+            os.makedirs(os.path.dirname(MASTER_SNAPSHOT_FILE), exist_ok=True)
+            temp_path = f"{MASTER_SNAPSHOT_FILE}.tmp"
+            with open(temp_path, 'wb') as f:
+                pickle.dump({
+                    'version': MASTER_SNAPSHOT_VERSION,
+                    'identity': self._snapshot_identity(),
+                    'saved_at': datetime.now().isoformat(),
+                    'tokens': tokens,
+                    'tables': tables
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, MASTER_SNAPSHOT_FILE)
+        except Exception as e:
+            logger.warning(f"Failed to save master snapshot: {e}")
+            
     def get_or_create_master_id(self, category: str, code: str, name: Optional[str] = None, 
                                additional_fields: Optional[Dict] = None) -> int:
         """
@@ -129,93 +341,131 @@ class DatabaseManager:
         if code in self.master_data.get(category, {}):
             return self.master_data[category][code]
             
-        # 新規作成
-        table_mapping = {
-            'metals': 'M_Metal',
-            'tenor_types': 'M_TenorType',
-            'indicators': 'M_Indicator',
-            'regions': 'M_Region',
-            'cotr_categories': 'M_COTRCategory',
-            'holding_bands': 'M_HoldingBand'
-        }
+        ids = self.resolve_master_ids(
+            category, [code],
+            names={code: name} if name is not None else None,
+            extra={code: additional_fields} if additional_fields else None
+        )
+        return ids[code]
         
-        field_mapping = {
-            'metals': ('MetalCode', 'MetalName'),
-            'tenor_types': ('TenorTypeName', 'Description'),
-            'indicators': ('IndicatorCode', 'IndicatorName'),
-            'regions': ('RegionCode', 'RegionName'),
-            'cotr_categories': ('CategoryName', 'Description'),
-            'holding_bands': ('BandRange', 'Description')
-        }
+    def resolve_master_ids(self, category: str, codes: List[str],
+                           names: Optional[Dict[str, str]] = None,
+                           extra: Optional[Dict[str, Dict]] = None) -> Dict[str, int]:
+        """
+        複数コードのマスタIDをまとめて取得し、存在しないコードは一括作成
         
-        if category not in table_mapping:
-            raise ValueError(f"Unknown master data category: {category}")
-            
-        table_name = table_mapping[category]
-        code_field, name_field = field_mapping[category][:2]
+        キャッシュにないコードのみ、1往復のバッチ（複数行INSERT ... OUTPUT + SELECT）で解決する。
+        INSERTはUPDLOCK/HOLDLOCK付きのNOT EXISTSで判定するため、並行実行でも重複作成しない。
         
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
+        Args:
+            category: マスタデータのカテゴリ（'metals', 'indicators'など）
+            codes: コード値のリスト（重複可）
+            names: コード -> 名前（新規作成時）
+            extra: コード -> 追加フィールド（新規作成時）
             
-            # 既に存在するかチェック（別セッションで作成された可能性）
-            # Handle special case for COTR categories where ID field is COTRCategoryID
-            if category == 'cotr_categories':
-                id_field = 'COTRCategoryID'
-            else:
-                id_field = code_field.replace('Name', 'ID').replace('Code', 'ID').replace('Range', 'ID')
+        Returns:
+            Dict[str, int]: コード -> マスタID
+        """
+        if category not in MASTER_TABLES:
+            raise ValueError(f"Unknown master data category: {category}")
             
-            check_query = f"SELECT {id_field} FROM {table_name} WHERE {code_field} = ?"
-            cursor.execute(check_query, code)
-            result = cursor.fetchone()
+        cache = self.master_data.setdefault(category, {})
+        missing = [code for code in dict.fromkeys(codes) if code not in cache]
+        
+        if missing:
+            table_name, code_field, _, id_field = MASTER_TABLES[category]
             
-            if result:
-                new_id = result[0]
-                self.master_data[category][code] = new_id
-                return new_id
+            # 挿入カラム構成が同じコードごとにまとめる（追加フィールドはコードにより異なる場合がある）
+            rows_by_fields = {}
+            for code in missing:
+                fields = self._master_insert_fields(
+                    category, code, (names or {}).get(code), (extra or {}).get(code)
+                )
+                rows_by_fields.setdefault(tuple(fields), []).append(fields)
                 
-            # 新規挿入
-            if name is None:
-                if category == 'holding_bands':
-                    name = f"{code} holding band"  # holding_bandsの場合はより意味のある説明を設定
-                else:
-                    name = code  # 名前が提供されない場合はコードを使用
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
                 
-            insert_fields = [code_field, name_field]
-            insert_values = [code, name]
-            
-            # M_Metal テーブルの場合は CurrencyCode を必須フィールドとして追加
-            if category == 'metals':
-                # additional_fields で CurrencyCode が指定されていない場合はデフォルト値 'USD' を設定
-                if not additional_fields or 'CurrencyCode' not in additional_fields:
-                    insert_fields.append('CurrencyCode')
-                    insert_values.append('USD')
-            
-            # M_HoldingBand テーブルの場合は MinValue と MaxValue を解析して設定
-            elif category == 'holding_bands':
-                min_val, max_val = self._parse_band_range(code)
-                if min_val is not None:
-                    insert_fields.append('MinValue')
-                    insert_values.append(min_val)
-                if max_val is not None:
-                    insert_fields.append('MaxValue')
-                    insert_values.append(max_val)
-            
-            if additional_fields:
-                insert_fields.extend(additional_fields.keys())
-                insert_values.extend(additional_fields.values())
+                for field_names, rows in rows_by_fields.items():
+                    # SQL Serverのパラメータ上限（2100）を超えないようにチャンク分割
+                    chunk_size = max(1, MASTER_PARAMETER_LIMIT // (len(field_names) + 1))
+                    
+                    for i in range(0, len(rows), chunk_size):
+                        chunk = rows[i:i + chunk_size]
+                        columns = ', '.join(field_names)
+                        row_placeholder = f"({', '.join(['?'] * len(field_names))})"
+                        
+                        query = f"""
+                            SET NOCOUNT ON;
+                            INSERT INTO {table_name} ({columns})
+                            OUTPUT INSERTED.{code_field}
+                            SELECT {columns}
+                            FROM (VALUES {', '.join([row_placeholder] * len(chunk))}) AS v ({columns})
+                            WHERE NOT EXISTS (
+                                SELECT 1 FROM {table_name} t WITH (UPDLOCK, HOLDLOCK)
+                                WHERE t.{code_field} = v.{code_field}
+                            );
+                            SELECT {id_field}, {code_field} FROM {table_name}
+                            WHERE {code_field} IN ({', '.join(['?'] * len(chunk))});
+                        """
+                        params = [row[field] for row in chunk for field in field_names]
+                        params.extend(row[code_field] for row in chunk)
+                        
+                        cursor.execute(query, params)
+                        created = [r[0] for r in cursor.fetchall()]
+                        cursor.nextset()
+                        for master_id, code in cursor.fetchall():
+                            cache[code] = master_id
+                            
+                        for code in created:
+                            logger.info(f"Created new {category} entry: {code} with ID {cache.get(code)}")
+                            
+                conn.commit()
                 
-            insert_query = f"INSERT INTO {table_name} ({', '.join(insert_fields)}) " \
-                          f"OUTPUT INSERTED.{id_field} " \
-                          f"VALUES ({', '.join(['?'] * len(insert_values))})"
-            
-            cursor.execute(insert_query, insert_values)
-            new_id = cursor.fetchone()[0]
-            conn.commit()
+        return {code: cache[code] for code in codes if code in cache}
+        
+    def _master_insert_fields(self, category: str, code: str, name: Optional[str] = None,
+                              additional_fields: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        マスタデータ新規作成時の挿入フィールドを作成
+        
+        Args:
+            category: マスタデータのカテゴリ
+            code: コード値
+            name: 名前
+            additional_fields: 追加フィールド
             
-            self.master_data[category][code] = new_id
-            logger.info(f"Created new {category} entry: {code} with ID {new_id}")
+        Returns:
+            Dict[str, Any]: カラム名 -> 値
+        """
+        _, code_field, name_field, _ = MASTER_TABLES[category]
+        
+        if name is None:
+            if category == 'holding_bands':
+                name = f"{code} holding band"  # holding_bandsの場合はより意味のある説明を設定
+            else:
+                name = code  # 名前が提供されない場合はコードを使用
+                
+        fields = {code_field: code, name_field: name}
+        
+        # M_Metal テーブルの場合は CurrencyCode を必須フィールドとして追加
+        if category == 'metals':
+            # additional_fields で CurrencyCode が指定されていない場合はデフォルト値 'USD' を設定
+            if not additional_fields or 'CurrencyCode' not in additional_fields:
+                fields['CurrencyCode'] = 'USD'
+                
+        # M_HoldingBand テーブルの場合は MinValue と MaxValue を解析して設定
+        elif category == 'holding_bands':
+            min_val, max_val = self._parse_band_range(code)
+            if min_val is not None:
+                fields['MinValue'] = min_val
+            if max_val is not None:
+                fields['MaxValue'] = max_val
+                
+        if additional_fields:
+            fields.update(additional_fields)
             
-            return new_id
+        return fields
     
     def _parse_band_range(self, band_range: str) -> Tuple[Optional[float], Optional[float]]:
         """
@@ -247,15 +497,20 @@ class DatabaseManager:
         return None, None
             
     def upsert_dataframe(self, df: pd.DataFrame, table_name: str, 
-                        unique_columns: List[str], retry_count: int = 0) -> int:
+                        unique_columns: List[str], backfill: bool = False) -> int:
         """
         DataFrameをテーブルにUPSERT（存在する場合は更新、なければ挿入）
         
+        バッチ単位でコミットし、一時的なエラー（デッドロック・スロットリング・接続断）の場合は
+        コミット済みバッチの次から再開する。データエラーの場合は失敗したバッチを二分して
+        不正な行のみを隔離ファイルに退避し、残りの行はコミットする。
+        
         Args:
             df: 挿入/更新するデータフレーム
             table_name: テーブル名
             unique_columns: ユニークキーとなるカラムのリスト
-            retry_count: リトライ回数
+            backfill: バックフィル（大量の過去データ）の場合True。パーティション化テーブルでは
+                      ENABLE_PARTITION_SWITCHが有効な場合、ステージテーブル経由のパーティションSWITCHでロードする
             
         Returns:
             int: 処理された行数
@@ -264,77 +519,539 @@ class DatabaseManager:
             logger.warning(f"Empty dataframe provided for table {table_name}")
             return 0
             
+        if backfill and ENABLE_PARTITION_SWITCH and table_name in PARTITIONED_TABLES and \
+                len(df) >= PARTITION_SWITCH_MIN_ROWS:
+            try:
+                return self._load_via_partition_switch(df, table_name, unique_columns)
+            except pyodbc.ProgrammingError as e:
+                # ステージテーブル・手続きが未作成（sql/columnstore/ 未適用）の場合は通常のMERGE
+                logger.warning(f"Partition switch load unavailable for {table_name}, falling back to MERGE: {e}")
+                
+        if backfill and self._key_range_is_empty(df, table_name, unique_columns):
+            inserted_count, remaining = self._bulk_insert(df, table_name, unique_columns)
+            if remaining is None:
+                return inserted_count
+            # 既存行との重複・データエラーが発生したバッチ以降のみMERGEで反映（不正な行は隔離）
+            logger.warning(f"Key overlap or data error on {table_name} during bulk insert, "
+                           f"upserting remaining {len(remaining)} rows")
+            return inserted_count + self.upsert_dataframe(remaining, table_name, unique_columns)
+            
+        columns = df.columns.tolist()
+        
+        processed_count = 0
+        quarantined_count = 0
+        
+        # キーの形（データタイプ・NULLのキーカラム）ごとに、インデックスシーク可能なMERGEで反映
+        for merge_query, group_df in self._merge_groups(df, table_name, unique_columns):
+            rows = self._to_rows(group_df)
+            next_row = 0
+            attempt = 0
+            
+            while next_row < len(rows):
+                try:
+                    with self.get_connection() as conn:
+                        while next_row < len(rows):
+                            batch = rows[next_row:next_row + BATCH_SIZE]
+                            
+                            count, bad_rows = self._merge_rows(conn, merge_query, batch)
+                            processed_count += count
+                            
+                            if bad_rows:
+                                self._quarantine_rows(table_name, columns, bad_rows)
+                                quarantined_count += len(bad_rows)
+                                
+                            # コミット済み。次のバッチから再開できるよう位置を進める
+                            next_row += len(batch)
+                            attempt = 0
+                            logger.debug("Committed {}/{} rows for table {}", next_row, len(rows), table_name)
+                            
+                except Exception as e:
+                    if not self._is_transient_error(e) or attempt >= MAX_RETRIES:
+                        logger.error(f"Error upserting data to {table_name}: {e}")
+                        raise
+                        
+                    attempt += 1
+                    logger.warning(f"Transient error on {table_name}, resuming from row {next_row} "
+                                   f"(attempt {attempt}/{MAX_RETRIES}): {e}")
+                    time.sleep(RETRY_DELAY * attempt)
+                    
+        if quarantined_count:
+            logger.warning(f"Quarantined {quarantined_count} rows for {table_name} (see {QUARANTINE_DIR})")
+            
+        logger.info(f"Successfully upserted {processed_count} rows to {table_name}")
+        return processed_count
+        
+    def buffer_upsert(self, df: pd.DataFrame, table_name: str,
+                      unique_columns: List[str], backfill: bool = False) -> int:
+        """
+        DataFrameを書き込みバッファに追加（格納はflush_writesまたは上限到達時にまとめて行う）
+        
+        同じテーブルに書き込む複数カテゴリのデータを1回のUPSERT（1接続・同一MERGE文）にまとめ、
+        トランザクション数とMERGEのコンパイル回数を減らす。行数がWRITE_BUFFER_MAX_ROWS、または
+        最初の追加からの経過秒数がWRITE_BUFFER_MAX_SECONDSに達したテーブルはその場で格納する
+        
+        Args:
+            df: 挿入/更新するデータフレーム
+            table_name: テーブル名
+            unique_columns: ユニークキーとなるカラムのリスト
+            backfill: バックフィルの場合True（upsert_dataframeと同じ）
+            
+        Returns:
+            int: バッファに追加した行数
+        """
+        if df.empty:
+            logger.warning(f"Empty dataframe provided for table {table_name}")
+            return 0
+            
+        entry = self._write_buffer.setdefault(table_name, {
+            'frames': [], 'rows': 0, 'unique_columns': unique_columns,
+            'backfill': backfill, 'started': time.monotonic()
+        })
+        entry['frames'].append(df)
+        entry['rows'] += len(df)
+        logger.debug(f"Buffered {len(df)} rows for {table_name} ({entry['rows']} pending)")
+        
+        if entry['rows'] >= WRITE_BUFFER_MAX_ROWS or \
+                time.monotonic() - entry['started'] >= WRITE_BUFFER_MAX_SECONDS:
+            self._flush_table(table_name)
+        return len(df)
+        
+    def flush_writes(self, table_name: Optional[str] = None) -> Dict[str, int]:
+        """
+        書き込みバッファを格納
+        
+        テーブルごとに格納し、失敗したテーブルはエラーを記録して残りのテーブルの格納を続ける
+        
+        Args:
+            table_name: 格納するテーブル（Noneの場合は全テーブル）
+            
+        Returns:
+            Dict[str, int]: 格納に成功したテーブル -> 処理行数（失敗したテーブルは含まない）
+        """
+        table_names = [table_name] if table_name is not None else list(self._write_buffer)
+        results = {}
+        for name in table_names:
+            if name not in self._write_buffer:
+                continue
+            try:
+                results[name] = self._flush_table(name)
+            except Exception as e:
+                logger.error(f"Failed to flush buffered writes for {name}: {e}")
+        return results
+        
+    def pending_writes(self) -> Dict[str, int]:
+        """
+        書き込みバッファの未格納行数
+        
+        Returns:
+            Dict[str, int]: テーブル名 -> 未格納行数
+        """
+        return {name: entry['rows'] for name, entry in self._write_buffer.items()}
+        
+    def _flush_table(self, table_name: str) -> int:
+        """1テーブル分のバッファを取り出して格納（失敗した場合もバッファからは除く）"""
+        entry = self._write_buffer.pop(table_name)
+        
+        # 列構成が同じデータのみ結合する（列の異なるデータを結合すると欠けた列がNULLで更新されるため）
+        groups: Dict[Tuple[str, ...], List[pd.DataFrame]] = {}
+        for frame in entry['frames']:
+            groups.setdefault(tuple(frame.columns), []).append(frame)
+            
+        processed_count = 0
+        for columns, frames in groups.items():
+            combined = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+            # 同一キーが複数カテゴリに含まれる場合は後から追加された行を優先
+            key_columns = [c for c in entry['unique_columns'] if c in columns]
+            if key_columns:
+                combined = combined.drop_duplicates(subset=key_columns, keep='last')
+            processed_count += self.upsert_dataframe(
+                combined, table_name, entry['unique_columns'], backfill=entry['backfill']
+            )
+            
+        logger.info(f"Flushed {len(entry['frames'])} buffered frames ({entry['rows']} rows) "
+                    f"to {table_name} in {len(groups)} upsert(s)")
+        return processed_count
+        
+    def _key_range_is_empty(self, df: pd.DataFrame, table_name: str, unique_columns: List[str]) -> bool:
+        """
+        データのキー範囲（日付範囲 × 各キーカラムの値集合）にテーブルの既存行がないかを判定
+        
+        範囲内に既存行がなければ、どの行もMERGEで更新されることはないため一括INSERTできる
+        
+        Args:
+            df: 格納するデータフレーム
+            table_name: テーブル名
+            unique_columns: ユニークキーとなるカラムのリスト
+            
+        Returns:
+            bool: 既存行がない場合True（判定できない場合はFalse）
+        """
+        date_column = TABLE_DATE_COLUMNS.get(table_name)
+        if date_column not in df.columns or df[date_column].isna().any():
+            return False
+            
+        dates = pd.to_datetime(df[date_column])
+        conditions = [f"{date_column} BETWEEN ? AND ?"]
+        params: List[Any] = [dates.min().date(), dates.max().date()]
+        
+        for column in unique_columns:
+            if column == date_column or column not in df.columns:
+                continue
+            values = df[column].dropna().unique().tolist()
+            # パラメータ数の上限を超える場合はそのカラムでは絞り込まない（範囲が広がるだけで判定は正しい）
+            if len(params) + len(values) > MASTER_PARAMETER_LIMIT:
+                continue
+            predicates = []
+            if values:
+                predicates.append(f"{column} IN ({', '.join(['?'] * len(values))})")
+                params.extend(value.item() if hasattr(value, 'item') else value for value in values)
+            if df[column].isna().any():
+                predicates.append(f"{column} IS NULL")
+            conditions.append(f"({' OR '.join(predicates)})")
+            
+        query = f"SELECT TOP 1 1 FROM {table_name} WHERE {' AND '.join(conditions)}"
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                processed_count = 0
+                cursor.execute(query, params)
+                return cursor.fetchone() is None
+        except Exception as e:
+            logger.warning(f"Could not check existing rows in {table_name}, using MERGE: {e}")
+            return False
+            
+    def _bulk_insert(self, df: pd.DataFrame, table_name: str,
+                     unique_columns: List[str]) -> Tuple[int, Optional[pd.DataFrame]]:
+        """
+        MERGEを使わずにINSERTのみで一括ロード（fast_executemany、BULK_INSERT_BATCH_SIZE行ごとにコミット）
+        
+        一意制約違反（判定後に他プロセスが同じキーを書き込んだ場合等）や文字列切り捨て・数値オーバーフロー等の
+        データエラーが発生したバッチはロールバックし、そのバッチ以降の行を呼び出し元に返してMERGEで反映させる
+        （MERGE側で不正な行を特定して隔離する）
+        
+        Args:
+            df: ロードするデータフレーム
+            table_name: テーブル名
+            unique_columns: ユニークキーとなるカラムのリスト
+            
+        Returns:
+            Tuple[int, Optional[pd.DataFrame]]: (挿入行数, 未挿入の行（全て挿入できた場合はNone）)
+        """
+        # MERGEと同じく同一キーは後の行を優先
+        df = df.drop_duplicates(subset=[c for c in unique_columns if c in df.columns], keep='last')
+        columns = df.columns.tolist()
+        rows = self._to_rows(df)
+        
+        insert_query = f"INSERT INTO {table_name} ({', '.join(columns)}, LastUpdated) " \
+                       f"VALUES ({', '.join(['?'] * len(columns))}, GETDATE())"
+        
+        inserted_count = 0
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            disabled_indexes = []
+            if BULK_INSERT_DISABLE_INDEXES and len(rows) >= BULK_INSERT_INDEX_MIN_ROWS:
+                disabled_indexes = self._disable_indexes(conn, table_name)
                 
-                # バッチ処理
-                for i in range(0, len(df), BATCH_SIZE):
-                    batch_df = df.iloc[i:i + BATCH_SIZE]
-                    
-                    # MERGEステートメントを構築
-                    merge_query = self._build_merge_query(table_name, batch_df.columns.tolist(), 
-                                                         unique_columns)
-                    
-                    # バッチデータを処理
-                    for row_idx, row in batch_df.iterrows():
-                        values = [row[col] if pd.notna(row[col]) else None 
-                                 for col in batch_df.columns]
-                        try:
-                            cursor.execute(merge_query, values)
-                            processed_count += cursor.rowcount
-                        except Exception as row_error:
-                            logger.error(f"Error processing row {row_idx} in table {table_name}: {row_error}")
-                            logger.error(f"Row data: {dict(row)}")
-                            logger.error(f"Values: {values}")
+            try:
+                cursor.fast_executemany = True
+                for start in range(0, len(rows), BULK_INSERT_BATCH_SIZE):
+                    try:
+                        cursor.executemany(insert_query, rows[start:start + BULK_INSERT_BATCH_SIZE])
+                        conn.commit()
+                    except pyodbc.Error as e:
+                        if not self._is_data_error(e):
                             raise
-                        
-                    conn.commit()
-                    logger.debug(f"Processed batch {i//BATCH_SIZE + 1} for table {table_name}")
+                        conn.rollback()
+                        logger.debug(f"Bulk insert into {table_name} failed on row data: {e}")
+                        return inserted_count, df.iloc[start:]
+                    inserted_count += len(rows[start:start + BULK_INSERT_BATCH_SIZE])
+                    logger.debug(f"Bulk inserted {inserted_count}/{len(rows)} rows into {table_name}")
+            finally:
+                if disabled_indexes:
+                    self._rebuild_indexes(conn, table_name, disabled_indexes)
                     
-                logger.info(f"Successfully upserted {processed_count} rows to {table_name}")
-                return processed_count
-                
-        except Exception as e:
-            logger.error(f"Error upserting data to {table_name}: {e}")
+        logger.info(f"Bulk inserted {inserted_count} rows into {table_name} (no existing rows in key range)")
+        return inserted_count, None
+        
+    def _disable_indexes(self, conn, table_name: str) -> List[str]:
+        """
+        非一意の非クラスタ化インデックスを無効化（一意インデックスはキー重複の検出に必要なため残す）
+        
+        Returns:
+            List[str]: 無効化したインデックス名
+        """
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT name FROM sys.indexes
+            WHERE object_id = OBJECT_ID(?) AND type = 2
+              AND is_unique = 0 AND is_primary_key = 0 AND is_disabled = 0
+        """, (table_name,))
+        index_names = [row[0] for row in cursor.fetchall()]
+        for index_name in index_names:
+            cursor.execute(f"ALTER INDEX [{index_name}] ON {table_name} DISABLE")
+        conn.commit()
+        if index_names:
+            logger.info(f"Disabled {len(index_names)} nonclustered indexes on {table_name}: {index_names}")
+        return index_names
+        
+    def _rebuild_indexes(self, conn, table_name: str, index_names: List[str]):
+        """無効化したインデックスを再構築"""
+        cursor = conn.cursor()
+        for index_name in index_names:
+            cursor.execute(f"ALTER INDEX [{index_name}] ON {table_name} REBUILD")
+        conn.commit()
+        logger.info(f"Rebuilt {len(index_names)} indexes on {table_name}")
+        
+    def _load_via_partition_switch(self, df: pd.DataFrame, table_name: str,
+                                   unique_columns: List[str]) -> int:
+        """
+        ステージテーブルに一括ロードし、月次パーティション単位で本テーブルに反映
+        
+        本テーブル側が空の月はパーティションSWITCH（メタデータ操作のみ）、
+        既存データがある月はサーバー側でMERGEする（sql/columnstore/03_*.sql）
+        
+        Args:
+            df: ロードするデータフレーム
+            table_name: テーブル名
+            unique_columns: ユニークキーとなるカラムのリスト
             
-            if retry_count < MAX_RETRIES:
-                logger.info(f"Retrying... (attempt {retry_count + 1}/{MAX_RETRIES})")
-                time.sleep(RETRY_DELAY)
-                return self.upsert_dataframe(df, table_name, unique_columns, retry_count + 1)
-            else:
+        Returns:
+            int: 処理された行数
+        """
+        config = PARTITIONED_TABLES[table_name]
+        
+        # ステージの一意インデックス違反を避けるため、同一キーは後の行を優先
+        df = df.drop_duplicates(subset=[c for c in unique_columns if c in df.columns], keep='last')
+        columns = df.columns.tolist()
+        rows = self._to_rows(df)
+        
+        insert_query = f"INSERT INTO {config['stage_table']} ({', '.join(columns)}) " \
+                       f"VALUES ({', '.join(['?'] * len(columns))})"
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(f"EXEC {config['prepare_procedure']}")
+            conn.commit()
+            
+            cursor.fast_executemany = True
+            for i in range(0, len(rows), STAGE_INSERT_BATCH_SIZE):
+                cursor.executemany(insert_query, rows[i:i + STAGE_INSERT_BATCH_SIZE])
+            conn.commit()
+            
+            cursor.execute(f"EXEC {config['switch_procedure']}")
+            switched_rows, merged_rows, switched_partitions, merged_partitions = cursor.fetchone()
+            conn.commit()
+            
+        logger.info(f"Loaded {len(rows)} rows to {table_name} via partition switch "
+                   f"(switched {switched_rows} rows in {switched_partitions} partitions, "
+                   f"merged {merged_rows} rows in {merged_partitions} partitions)")
+        return len(rows)
+        
+    def _merge_rows(self, conn, merge_query: str, rows: List[List[Any]]) -> Tuple[int, List[Tuple[List[Any], str]]]:
+        """
+        行リストをMERGEしてコミット（データエラー時は二分して不正な行を特定）
+        
+        Args:
+            conn: データベース接続
+            merge_query: MERGEクエリ
+            rows: 値のリスト
+            
+        Returns:
+            Tuple[int, List[Tuple[List[Any], str]]]: (処理行数, [(不正な行, エラー内容)])
+        """
+        cursor = conn.cursor()
+        try:
+            count = 0
+            for values in rows:
+                cursor.execute(merge_query, values)
+                count += cursor.rowcount
+            conn.commit()
+            return count, []
+            
+        except Exception as e:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+                
+            # 一時的なエラーは呼び出し元でバッチ単位にリトライ
+            if self._is_transient_error(e):
                 raise
                 
+            if len(rows) == 1:
+                return 0, [(rows[0], str(e))]
+                
+            mid = len(rows) // 2
+            left_count, left_bad = self._merge_rows(conn, merge_query, rows[:mid])
+            right_count, right_bad = self._merge_rows(conn, merge_query, rows[mid:])
+            return left_count + right_count, left_bad + right_bad
+            
+    def _is_transient_error(self, error: Exception) -> bool:
+        """
+        リトライで回復し得る一時的なエラーかを判定
+        
+        Args:
+            error: 発生した例外
+            
+        Returns:
+            bool: デッドロック・スロットリング・接続断・タイムアウトの場合True
+        """
+        if not isinstance(error, pyodbc.Error):
+            return isinstance(error, (ConnectionError, TimeoutError))
+            
+        sqlstate = str(error.args[0]) if error.args else ''
+        if sqlstate in TRANSIENT_SQLSTATES:
+            return True
+            
+        # メッセージ中のネイティブエラー番号（例: "... (1205) (SQLExecDirectW)"）
+        error_codes = {int(code) for code in re.findall(r'\((\d+)\)', str(error))}
+        return bool(error_codes & TRANSIENT_ERROR_CODES)
+        
+    def _is_data_error(self, error: Exception) -> bool:
+        """
+        行の値に起因するエラー（MERGEで不正な行を特定して隔離できるもの）かを判定
+        
+        Args:
+            error: 発生した例外
+            
+        Returns:
+            bool: 一時的なエラーではなく、制約違反・データ例外（IntegrityError/DataError等）の場合True
+        """
+        if self._is_transient_error(error):
+            return False
+        if isinstance(error, (pyodbc.IntegrityError, pyodbc.DataError)):
+            return True
+        sqlstate = str(error.args[0]) if error.args else ''
+        return sqlstate.startswith(DATA_ERROR_SQLSTATE_CLASSES)
+        
+    @staticmethod
+    def _to_rows(df: pd.DataFrame) -> List[list]:
+        """
+        DataFrameをpyodbcに渡す行リストに変換
+        
+        NaN/NaT/NAはNone、datetime64の日付カラムはdateに変換する（category・NULL許容整数はPythonの値になる）
+        
+        Args:
+            df: 変換するデータフレーム
+            
+        Returns:
+            List[list]: Pythonネイティブ型の行リスト
+        """
+        date_columns = [c for c in df.columns.intersection(DATE_COLUMNS)
+                        if pd.api.types.is_datetime64_any_dtype(df[c])]
+        if date_columns:
+            df = df.assign(**{c: df[c].dt.date for c in date_columns})
+        return df.astype(object).where(df.notna(), None).values.tolist()
+        
+    def _quarantine_rows(self, table_name: str, columns: List[str],
+                         bad_rows: List[Tuple[List[Any], str]]):
+        """
+        不正な行を隔離ファイル（JSON Lines）に退避
+        
+        Args:
+            table_name: テーブル名
+            columns: カラムリスト
+            bad_rows: [(値のリスト, エラー内容)]
+        """
+        os.makedirs(QUARANTINE_DIR, exist_ok=True)
+        quarantine_path = os.path.join(
+            QUARANTINE_DIR, f"{table_name}_{datetime.now().strftime('%Y%m%d')}.jsonl"
+        )
+        
+        with open(quarantine_path, 'a', encoding='utf-8') as f:
+            for values, error in bad_rows:
+                record = {
+                    'table': table_name,
+                    'row': dict(zip(columns, values)),
+                    'error': error,
+                    'quarantined_at': datetime.now().isoformat()
+                }
+                f.write(json.dumps(record, default=str, ensure_ascii=False) + '\n')
+                
+        for values, error in bad_rows:
+            logger.error(f"Quarantined row in {table_name}: {dict(zip(columns, values))} ({error})")
+            
+    def _merge_groups(self, df: pd.DataFrame, table_name: str,
+                      unique_columns: List[str]) -> List[Tuple[str, pd.DataFrame]]:
+        """
+        行をキーの形ごとに分け、それぞれに等値条件のみのMERGEクエリを対応させる
+        
+        MERGE_KEY_SHAPESに定義されたデータタイプ（Generic/Actual）の行は、フィルター付き一意インデックスと
+        同じ列・同じフィルター（判別値はリテラル）で照合する。それ以外の行はNULLのキーカラムの組み合わせごとに
+        「= source.col」または「IS NULL」で照合する（ORを含まないためインデックスシークが可能）
+        
+        Args:
+            df: 格納するデータフレーム
+            table_name: テーブル名
+            unique_columns: ユニークキーとなるカラムのリスト
+            
+        Returns:
+            List[Tuple[str, pd.DataFrame]]: (MERGEクエリ, 対象行) のリスト
+        """
+        columns = df.columns.tolist()
+        key_columns = [c for c in unique_columns if c in df.columns]
+        groups = []
+        remaining = df
+        
+        if table_name in MERGE_KEY_SHAPES and MERGE_KEY_SHAPES[table_name][0] in df.columns:
+            discriminator, shapes = MERGE_KEY_SHAPES[table_name]
+            for value, match_columns in shapes.items():
+                if not set(match_columns) <= set(df.columns):
+                    continue
+                mask = (remaining[discriminator] == value) & remaining[match_columns].notna().all(axis=1)
+                if mask.any():
+                    query = self._build_merge_query(table_name, columns, match_columns,
+                                                    discriminator=(discriminator, value))
+                    groups.append((query, remaining[mask]))
+                    remaining = remaining[~mask]
+                    
+        if remaining.empty:
+            return groups
+        if not key_columns:
+            return groups + [(self._build_merge_query(table_name, columns, unique_columns), remaining)]
+            
+        null_patterns = remaining[key_columns].isna()
+        for pattern, group_df in remaining.groupby([null_patterns[c] for c in key_columns], sort=False):
+            null_columns = [c for c, is_null in zip(key_columns, pattern) if is_null]
+            query = self._build_merge_query(table_name, columns, unique_columns, null_columns=null_columns)
+            groups.append((query, group_df))
+        return groups
+        
     def _build_merge_query(self, table_name: str, columns: List[str], 
-                          unique_columns: List[str]) -> str:
+                          unique_columns: List[str],
+                          null_columns: Optional[List[str]] = None,
+                          discriminator: Optional[Tuple[str, str]] = None) -> str:
         """
         MERGEクエリを構築
         
         Args:
             table_name: テーブル名
             columns: カラムリスト
-            unique_columns: ユニークキーカラムリスト
+            unique_columns: 照合するキーカラムリスト
+            null_columns: 値がNULLの行のみを対象とするキーカラム（IS NULLで照合）
+            discriminator: (判別カラム, 判別値)。フィルター付き一意インデックスの条件としてリテラルで照合
             
         Returns:
             str: MERGEクエリ
         """
-        # ソーステーブルの値プレースホルダー
-        source_values = ', '.join(['?' for _ in columns])
-        source_columns = ', '.join(columns)
+        null_columns = null_columns or []
         
-        # JOIN条件 (NULL値を適切に処理)
+        # JOIN条件（等値またはIS NULLのみ。ORを使わずインデックスシーク可能にする）
         join_conditions = []
+        if discriminator:
+            column, value = discriminator
+            join_conditions.append(f"target.{column} = N'{value.replace(chr(39), chr(39) * 2)}'")
         for col in unique_columns:
-            # NULL値の比較を適切に処理
-            join_conditions.append(
-                f"(target.{col} = source.{col} OR (target.{col} IS NULL AND source.{col} IS NULL))"
-            )
+            if col in null_columns:
+                join_conditions.append(f"target.{col} IS NULL")
+            else:
+                join_conditions.append(f"target.{col} = source.{col}")
         join_conditions = ' AND '.join(join_conditions)
         
-        # UPDATE句（LastUpdated以外）
+        # UPDATE句（照合カラム・LastUpdated以外）
+        matched_columns = set(unique_columns) | ({discriminator[0]} if discriminator else set())
         update_columns = [col for col in columns 
-                         if col not in unique_columns and col != 'LastUpdated']
+                         if col not in matched_columns and col != 'LastUpdated']
         update_clause = ', '.join([f"target.{col} = source.{col}" 
                                    for col in update_columns])
         
@@ -435,6 +1152,33 @@ class DatabaseManager:
                         warnings.filterwarnings("ignore", message="pandas only supports SQLAlchemy")
                         return pd.read_sql(query, conn)
                 
+    def refresh_enriched_prices(self, start_date: Optional[str] = None,
+                                end_date: Optional[str] = None) -> int:
+        """
+        T_CommodityPriceEnriched（価格×実契約×残存営業日数）を差分リフレッシュ
+        
+        期間未指定の場合は前回リフレッシュ以降に価格・マッピング・実契約の満期日・取引所カレンダーが変わった
+        TradeDateのみ再計算する
+        
+        Args:
+            start_date: 再計算する開始日（YYYY-MM-DD、オプション）
+            end_date: 再計算する終了日（YYYY-MM-DD、オプション）
+            
+        Returns:
+            int: 再計算した行数
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"EXEC {ENRICHED_REFRESH_PROCEDURE} @StartDate = ?, @EndDate = ?",
+                (start_date, end_date)
+            )
+            refreshed_dates, refreshed_rows = cursor.fetchone()
+            conn.commit()
+            
+        logger.info(f"Refreshed T_CommodityPriceEnriched: {refreshed_rows} rows for {refreshed_dates} trade dates")
+        return refreshed_rows
+        
     def get_latest_date(self, table_name: str, date_column: str, 
                        where_clause: Optional[str] = None) -> Optional[datetime]:
         """
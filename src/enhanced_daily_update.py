@@ -1,8 +1,9 @@
 """
 Enhanced daily update module with market-aware timing and data validation
 """
+import copy
 import pandas as pd
-from datetime import datetime, timedelta, time
+from datetime import datetime, date, timedelta, time
 import pytz
 from typing import Dict, Tuple, Optional
 import hashlib
@@ -12,6 +13,17 @@ from config.logging_config import logger
 from config.bloomberg_config import BLOOMBERG_TICKERS
 
 
+# 市場別の更新対象カテゴリ
+MARKET_CATEGORIES = {
+    'LME': ['LME_COPPER_PRICES', 'LME_INVENTORY'],
+    'SHFE': ['SHFE_COPPER_PRICES', 'SHFE_INVENTORY'],
+    'CMX': ['CMX_COPPER_PRICES', 'CMX_INVENTORY'],
+    'GLOBAL': ['INTEREST_RATES', 'FX_RATES', 'COMMODITY_INDICES', 
+              'EQUITY_INDICES', 'ENERGY_PRICES', 'PHYSICAL_PREMIUMS',
+              'OTHER_INDICATORS', 'COMPANY_STOCKS']
+}
+
+
 class MarketTimingManager:
     """市場タイミングを管理するクラス"""
     
@@ -75,6 +87,56 @@ class MarketTimingManager:
         
         return start_date.replace(tzinfo=None), end_date.replace(tzinfo=None)
     
+    @classmethod
+    def get_safe_update_time(cls, market: str) -> Optional[datetime]:
+        """
+        当日のセトルメント後の安全な更新時刻を取得（市場ローカル時刻）
+        
+        Returns:
+            Optional[datetime]: 安全時刻（市場定義がない場合はNone）
+        """
+        if market not in cls.MARKET_HOURS:
+            return None
+            
+        market_info = cls.MARKET_HOURS[market]
+        tz = pytz.timezone(market_info['timezone'])
+        now_local = datetime.now(tz)
+        
+        settlement_datetime = now_local.replace(
+            hour=market_info['settlement_time'].hour,
+            minute=market_info['settlement_time'].minute,
+            second=0,
+            microsecond=0
+        )
+        
+        return settlement_datetime + timedelta(hours=market_info['delay_hours'])
+        
+    @classmethod
+    def is_update_due(cls, market: str, last_run_date: Optional[date] = None) -> bool:
+        """
+        常駐モード用：指定市場の当日分の更新を実行すべきか判断
+        
+        Args:
+            market: 市場コード
+            last_run_date: 前回更新を実行した市場ローカル日付
+            
+        Returns:
+            bool: セトルメント後の安全時刻を過ぎ、当日未実行の場合True
+        """
+        if not cls.should_update_market(market):
+            return False
+            
+        safe_time = cls.get_safe_update_time(market)
+        if safe_time is None:
+            # 市場定義がない場合（GLOBAL）は1日1回
+            return last_run_date != datetime.now().date()
+            
+        now_local = datetime.now(safe_time.tzinfo)
+        if now_local < safe_time:
+            return False
+            
+        return last_run_date != now_local.date()
+    
     @classmethod
     def should_update_market(cls, market: str) -> bool:
         """指定された市場のデータを更新すべきか判断"""
@@ -249,147 +311,119 @@ class EnhancedDailyUpdater:
             logger.error(f"Automatic rollover failed: {e}")
             # ロールオーバーエラーは日次更新を停止しない
         
-        # カテゴリーを市場別にグループ化
-        market_categories = {
-            'LME': ['LME_COPPER_PRICES', 'LME_INVENTORY'],
-            'SHFE': ['SHFE_COPPER_PRICES', 'SHFE_INVENTORY'],
-            'CMX': ['CMX_COPPER_PRICES', 'CMX_INVENTORY'],
-            'GLOBAL': ['INTEREST_RATES', 'FX_RATES', 'COMMODITY_INDICES', 
-                      'EQUITY_INDICES', 'ENERGY_PRICES', 'PHYSICAL_PREMIUMS',
-                      'OTHER_INDICATORS', 'COMPANY_STOCKS']
-        }
-        
         update_summary = {}
         
-        for market, categories in market_categories.items():
+        for market in MARKET_CATEGORIES:
             # 市場タイミングチェック
             if not self.timing_manager.should_update_market(market):
                 continue
                 
-            # 最適な更新時間範囲を取得
-            start_date, end_date = self.timing_manager.get_optimal_update_time(market)
-            logger.info(f"Processing {market} market data from {start_date} to {end_date}")
-            
-            for category_name in categories:
-                if category_name not in BLOOMBERG_TICKERS:
-                    continue
-                    
-                try:
-                    ticker_info = BLOOMBERG_TICKERS[category_name].copy()  # Deep copyを作成
-                    
-                    # MEST地域を除外（LME在庫の場合）
-                    if category_name == 'LME_INVENTORY':
-                        # MESTを含むティッカーを除外
-                        for data_type, tickers in ticker_info['securities'].items():
-                            ticker_info['securities'][data_type] = [
-                                t for t in tickers if '%MEST' not in t
-                            ]
-                        # region_mappingからもMESTを削除
-                        if '%MEST Index' in ticker_info.get('region_mapping', {}):
-                            del ticker_info['region_mapping']['%MEST Index']
-                    
-                    # 1. 新規データの取得
-                    logger.info(f"Fetching {category_name} data...")
-                    new_data_df = self._fetch_category_data(
-                        category_name, ticker_info, 
-                        start_date.strftime('%Y%m%d'), 
-                        end_date.strftime('%Y%m%d')
-                    )
-                    
-                    if new_data_df.empty:
-                        logger.warning(f"No new data fetched for {category_name}")
-                        continue
-                        
-                    # 2. 既存データとの重複期間を検証（一時的に無効化）
-                    validation_result = {'status': 'skipped', 'changes': []}
-                    logger.info(f"[{category_name}] Data validation temporarily disabled")
-                    
-                    # TODO: データベースクエリの形状問題解決後に再有効化
-                    # validation_start = start_date + timedelta(days=2)  # 重複検証は2日分
-                    # table_name = self._get_table_name(category_name)
-                    # 
-                    # if table_name:
-                    #     existing_data = self.validation_manager.get_overlapping_data(
-                    #         table_name, validation_start, end_date
-                    #     )
-                    #     
-                    #     # データ検証
-                    #     key_columns = self._get_key_columns(category_name)
-                    #     value_columns = self._get_value_columns(category_name)
-                    #     
-                    #     validation_result = self.validation_manager.validate_new_data(
-                    #         new_data_df, existing_data, key_columns, value_columns
-                    #     )
-                    #     
-                    #     self.validation_manager.log_validation_results(
-                    #         category_name, validation_result
-                    #     )
-                    #     
-                    #     # 変更率が高い場合は警告
-                    #     if validation_result.get('change_rate', 0) > 10:
-                    #         logger.error(f"High change rate detected for {category_name}: {validation_result['change_rate']:.2f}%")
-                    #         # 必要に応じて更新を中断するロジックを追加可能
-                            
-                    # 3. データの保存（UPSERT）
-                    record_count = self.ingestor.process_category(
-                        category_name, ticker_info,
-                        start_date.strftime('%Y%m%d'),
-                        end_date.strftime('%Y%m%d')
-                    )
-                    
-                    update_summary[category_name] = {
-                        'records': record_count,
-                        'validation': validation_result if 'validation_result' in locals() else None
-                    }
-                    
-                except Exception as e:
-                    logger.error(f"Failed to update {category_name}: {e}")
-                    import traceback
-                    logger.error(traceback.format_exc())
+            update_summary.update(self.update_market(market))
                     
         # 更新サマリーをログ出力
         self._log_update_summary(update_summary)
         
         # バンディングレポート（金曜日のみ）
         if datetime.now().weekday() == 4:
-            self._update_weekly_data()
+            self.update_weekly_data()
+            
+        # 満期・営業日情報を更新分のTradeDateのみ再計算
+        self.ingestor.refresh_enriched_prices()
             
         return update_summary
         
-    def _fetch_category_data(self, category_name: str, ticker_info: Dict,
-                           start_date: str, end_date: str) -> pd.DataFrame:
-        """カテゴリーのデータを取得（処理せずに生データを返す）"""
-        # この部分は実際のBloomberg APIからのデータ取得ロジックになります
-        # ここでは簡略化しています
-        securities = []
-        
-        # securitiesが辞書形式の場合
-        if isinstance(ticker_info.get('securities'), dict):
-            for data_type, tickers in ticker_info.get('securities', {}).items():
-                if isinstance(tickers, list):
-                    securities.extend(tickers)
-                elif isinstance(tickers, dict):
-                    for position_type, ticker_list in tickers.items():
-                        securities.extend(ticker_list)
-        # securitiesがリスト形式の場合
-        elif isinstance(ticker_info.get('securities'), list):
-            securities = ticker_info.get('securities', [])
-        # securitiesがその他の形式の場合
-        else:
-            securities = ticker_info.get('securities', [])
-                    
-        if not securities:
-            logger.warning(f"No securities found for {category_name}")
-            return pd.DataFrame()
-            
-        logger.debug(f"Fetching data for {len(securities)} securities: {securities[:5]}...")
+    def update_market(self, market: str) -> Dict:
+        """
+        指定市場のカテゴリを更新
+        
+        Args:
+            market: 市場コード（MARKET_CATEGORIESのキー）
             
-        # データ取得
-        df = self.ingestor.bloomberg.get_historical_data(
-            securities, ticker_info['fields'], start_date, end_date
-        )
+        Returns:
+            Dict: カテゴリ別の更新結果
+        """
+        update_summary = {}
         
-        return df
+        # 最適な更新時間範囲を取得
+        start_date, end_date = self.timing_manager.get_optimal_update_time(market)
+        logger.info(f"Processing {market} market data from {start_date} to {end_date}")
+        
+        for category_name in MARKET_CATEGORIES.get(market, []):
+            if category_name not in BLOOMBERG_TICKERS:
+                continue
+                
+            try:
+                # 常駐モードでは設定が後続ジョブに引き継がれるため、入れ子のリスト・辞書まで複製してから編集する
+                ticker_info = copy.deepcopy(BLOOMBERG_TICKERS[category_name])
+                
+                # MEST地域を除外（LME在庫の場合）
+                if category_name == 'LME_INVENTORY':
+                    # MESTを含むティッカーを除外
+                    for data_type, tickers in ticker_info['securities'].items():
+                        ticker_info['securities'][data_type] = [
+                            t for t in tickers if '%MEST' not in t
+                        ]
+                    # region_mappingからもMESTを削除
+                    if '%MEST Index' in ticker_info.get('region_mapping', {}):
+                        del ticker_info['region_mapping']['%MEST Index']
+                
+                # 1. 新規データの取得
+                logger.info(f"Fetching {category_name} data...")
+                new_data_df = self.ingestor.fetch_category(
+                    category_name, ticker_info,
+                    start_date.strftime('%Y%m%d'),
+                    end_date.strftime('%Y%m%d')
+                )
+                
+                if new_data_df.empty:
+                    logger.warning(f"No new data fetched for {category_name}")
+                    continue
+                    
+                # 2. 既存データとの重複期間を検証（一時的に無効化）
+                validation_result = {'status': 'skipped', 'changes': []}
+                logger.info(f"[{category_name}] Data validation temporarily disabled")
+                
+                # TODO: データベースクエリの形状問題解決後に再有効化
+                # validation_start = start_date + timedelta(days=2)  # 重複検証は2日分
+                # table_name = self._get_table_name(category_name)
+                # 
+                # if table_name:
+                #     existing_data = self.validation_manager.get_overlapping_data(
+                #         table_name, validation_start, end_date
+                #     )
+                #     
+                #     # データ検証
+                #     key_columns = self._get_key_columns(category_name)
+                #     value_columns = self._get_value_columns(category_name)
+                #     
+                #     validation_result = self.validation_manager.validate_new_data(
+                #         new_data_df, existing_data, key_columns, value_columns
+                #     )
+                #     
+                #     self.validation_manager.log_validation_results(
+                #         category_name, validation_result
+                #     )
+                #     
+                #     # 変更率が高い場合は警告
+                #     if validation_result.get('change_rate', 0) > 10:
+                #         logger.error(f"High change rate detected for {category_name}: {validation_result['change_rate']:.2f}%")
+                #         # 必要に応じて更新を中断するロジックを追加可能
+                        
+                # 3. 取得済みのデータを加工して保存（UPSERT）
+                processed_df = self.ingestor.transform_category(new_data_df, ticker_info)
+                record_count = self.ingestor.store_category(category_name, ticker_info['table'], processed_df)
+                
+                update_summary[category_name] = {
+                    'records': record_count,
+                    'validation': validation_result if 'validation_result' in locals() else None
+                }
+                
+            except Exception as e:
+                logger.error(f"Failed to update {category_name}: {e}")
+                import traceback
+                logger.error(traceback.format_exc())
+                
+        return update_summary
         
     def _get_table_name(self, category_name: str) -> Optional[str]:
         """カテゴリー名からテーブル名を取得"""
@@ -437,7 +471,7 @@ class EnhancedDailyUpdater:
         else:
             return []
             
-    def _update_weekly_data(self):
+    def update_weekly_data(self):
         """週次データの更新（COTRなど）"""
         logger.info("Processing weekly data updates...")
         
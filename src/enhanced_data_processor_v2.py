@@ -6,18 +6,26 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, date
 from typing import Dict, List, Optional, Any, Tuple
-from loguru import logger
 from database import DatabaseManager
 from data_processor import DataProcessor
+from trading_calendar import get_trading_calendar
+from config.logging_config import logger, sampled_logger
+from config.rollover_config import DISABLE_INLINE_MAPPING
 
 
 class EnhancedDataProcessorV2(DataProcessor):
     """自動マッピング機能を持つ拡張データプロセッサー"""
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, inline_mapping: Optional[bool] = None):
+        """
+        Args:
+            db_manager: DatabaseManager
+            inline_mapping: 不足マッピングを価格処理中に生成するか（Noneの場合はDISABLE_INLINE_MAPPINGに従う）
+        """
         super().__init__(db_manager)
         self.mapping_cache = {}  # {(GenericID, TradeDate): ActualContractID}
         self.contract_info_cache = {}  # {ActualContractID: contract_info}
+        self.inline_mapping = not DISABLE_INLINE_MAPPING if inline_mapping is None else inline_mapping
         
     def process_commodity_prices(self, df: pd.DataFrame, ticker_info: Dict[str, Any]) -> pd.DataFrame:
         """
@@ -41,31 +49,21 @@ class EnhancedDataProcessorV2(DataProcessor):
     def _apply_automatic_mapping(self, df: pd.DataFrame, generic_mask: pd.Series) -> pd.DataFrame:
         """ジェネリック先物に対して自動的にActualContractIDを設定"""
         
-        # 対象となる日付範囲を取得
-        trade_dates = df.loc[generic_mask, 'TradeDate'].unique()
+        # 対象となる日付範囲を取得（TradeDateはdatetime64のため、キャッシュのキーに合わせてdateに変換）
+        generic_trade_dates = pd.to_datetime(df.loc[generic_mask, 'TradeDate']).dt.date
+        trade_dates = generic_trade_dates.unique()
         generic_ids = df.loc[generic_mask, 'GenericID'].unique()
         
         # 必要なマッピングを一括取得
         self._ensure_mappings_loaded(trade_dates, generic_ids)
         
-        # 各行にマッピングを適用
-        for idx in df[generic_mask].index:
-            row = df.loc[idx]
-            trade_date = row['TradeDate']
-            generic_id = row['GenericID']
-            
-            # キャッシュからマッピングを取得
-            mapping_key = (generic_id, trade_date)
-            if mapping_key in self.mapping_cache:
-                actual_contract_id = self.mapping_cache[mapping_key]
-                # CHECK制約のため、GenericタイプではActualContractIDを設定しない
-                # マッピング情報はT_GenericContractMappingテーブルで管理
-                # df.loc[idx, 'ActualContractID'] = actual_contract_id
-                
-                # マッピングの存在を確認できたことをログに記録
-                logger.debug(f"マッピング確認: GenericID={generic_id}, Date={trade_date} → ActualContractID={actual_contract_id}")
-            else:
-                logger.warning(f"マッピングが見つかりません: GenericID={generic_id}, TradeDate={trade_date}")
+        # キャッシュでマッピングの存在を確認
+        # CHECK制約のため、GenericタイプではActualContractIDを設定しない（マッピングはT_GenericContractMappingで管理）
+        mapping_keys = list(zip(df.loc[generic_mask, 'GenericID'], generic_trade_dates))
+        missing_keys = [key for key in mapping_keys if key not in self.mapping_cache]
+        logger.debug("マッピング確認: {}/{}件", len(mapping_keys) - len(missing_keys), len(mapping_keys))
+        for generic_id, trade_date in missing_keys:
+            sampled_logger.warning("マッピングが見つかりません: GenericID={}, TradeDate={}", generic_id, trade_date)
                 
         return df
         
@@ -144,7 +142,11 @@ class EnhancedDataProcessorV2(DataProcessor):
                         
             if missing_mappings:
                 logger.warning(f"{len(missing_mappings)}件のマッピングが不足しています")
-                self._create_missing_mappings(missing_mappings)
+                if self.inline_mapping:
+                    self._create_missing_mappings(missing_mappings)
+                else:
+                    # 先行マッピングはAutoRolloverManagerが事前計算する（価格データはマッピングと独立して保存される）
+                    logger.warning("インラインのマッピング生成は無効です。自動ロールオーバーの先行マッピング計算を確認してください")
                 
     def _create_missing_mappings(self, missing_mappings: List[Tuple[int, date]]):
         """不足しているマッピングを自動生成"""
@@ -213,7 +215,7 @@ class EnhancedDataProcessorV2(DataProcessor):
         contracts = cursor.fetchall()
         
         if not contracts:
-            logger.warning(f"利用可能な契約が見つかりません: {exchange_code} Metal={metal_id} Date={trade_date}")
+            sampled_logger.warning("利用可能な契約が見つかりません: {} Metal={} Date={}", exchange_code, metal_id, trade_date)
             return None
             
         # ジェネリック番号に対応する契約を選択（1番限 = 最近月）
@@ -226,16 +228,18 @@ class EnhancedDataProcessorV2(DataProcessor):
     def _insert_mapping(self, cursor, generic_id: int, trade_date: date, actual_contract_id: int):
         """マッピングをデータベースに挿入"""
         
-        # 契約の満期日を取得してDaysToExpiryを計算
+        # 契約の満期日を取得してDaysToExpiry（取引所の営業日ベース）を計算
         cursor.execute("""
-            SELECT LastTradeableDate
+            SELECT LastTradeableDate, ExchangeCode
             FROM M_ActualContract
             WHERE ActualContractID = ?
         """, (actual_contract_id,))
         
         result = cursor.fetchone()
         if result and result[0]:
-            days_to_expiry = (result[0] - trade_date).days
+            days_to_expiry = get_trading_calendar(self.db_manager).trading_days_between(
+                trade_date, result[0], result[1]
+            )
         else:
             days_to_expiry = None
             
@@ -254,7 +258,7 @@ class EnhancedDataProcessorV2(DataProcessor):
                 VALUES (source.TradeDate, source.GenericID, source.ActualContractID, source.DaysToExpiry);
         """, (trade_date, generic_id, actual_contract_id, days_to_expiry))
         
-        logger.debug(f"マッピングを作成: GenericID={generic_id}, Date={trade_date}, ContractID={actual_contract_id}")
+        sampled_logger.debug("マッピングを作成: GenericID={}, Date={}, ContractID={}", generic_id, trade_date, actual_contract_id)
         
     def clear_cache(self):
         """キャッシュをクリア"""
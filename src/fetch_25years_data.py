@@ -1,95 +1,27 @@
 """
 25年分のヒストリカルデータを段階的に取得するスクリプト
-大量データのため、年単位でバッチ処理を行い、エラー時の再開も可能
+大量データのため、(年, カテゴリ)単位の作業に分割してプロセスプールで並列に取得し、
+完了した作業単位を進捗ファイルに記録してエラー時の再開を可能にする
 """
 import sys
 import os
-import json
-from datetime import datetime, timedelta
-import logging
-import time
-from bloomberg_api import BloombergDataFetcher
-from database import DatabaseManager
-from main import BloombergSQLIngestor
-from historical_mapping_updater import HistoricalMappingUpdater
-
-# ロギング設定
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('fetch_25years.log'),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
-
-# 進捗ファイル
-PROGRESS_FILE = 'fetch_25years_progress.json'
+import argparse
+from datetime import datetime
 
-def load_progress():
-    """進捗状況を読み込む"""
-    if os.path.exists(PROGRESS_FILE):
-        with open(PROGRESS_FILE, 'r') as f:
-            return json.load(f)
-    return {'completed_years': []}
+# プロジェクトルートとsrcディレクトリをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(project_root, 'src')
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
-def save_progress(progress):
-    """進捗状況を保存"""
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f, indent=2)
-
-def fetch_year_data(year: int, bloomberg_fetcher, db_manager):
-    """1年分のデータを取得"""
-    start_date = f"{year}-01-01"
-    end_date = f"{year}-12-31"
-    
-    # 今年の場合は今日までのデータのみ取得
-    if year == datetime.now().year:
-        end_date = datetime.now().strftime('%Y-%m-%d')
-    
-    logger.info(f"\n{'='*60}")
-    logger.info(f"{year}年のデータを取得: {start_date} から {end_date}")
-    logger.info(f"{'='*60}")
-    
-    try:
-        # 1. マッピングデータを取得
-        logger.info(f"[{year}] Generic-Actual契約マッピングを取得中...")
-        mapping_updater = HistoricalMappingUpdater(bloomberg_fetcher, db_manager)
-        mapping_updater.update_historical_mappings(start_date, end_date)
-        
-        # 2. 価格データを取得
-        logger.info(f"[{year}] 価格データを取得中...")
-        ingestor = BloombergSQLIngestor(bloomberg_fetcher, db_manager)
-        
-        # LME銅価格
-        logger.info(f"[{year}] LME銅価格データ...")
-        ingestor.ingest_lme_copper_prices(start_date, end_date, is_initial=True)
-        
-        # LME在庫
-        logger.info(f"[{year}] LME在庫データ...")
-        ingestor.ingest_lme_inventory(start_date, end_date, is_initial=True)
-        
-        # 他取引所データ
-        logger.info(f"[{year}] SHFE/COMEX価格データ...")
-        ingestor.ingest_other_exchange_prices(start_date, end_date, is_initial=True)
-        ingestor.ingest_other_exchange_inventory(start_date, end_date, is_initial=True)
-        
-        # 市場指標
-        logger.info(f"[{year}] 市場指標データ...")
-        ingestor.ingest_market_indicators(start_date, end_date, is_initial=True)
-        
-        # 取得結果を確認
-        show_year_summary(db_manager, year)
-        
-        logger.info(f"[{year}] ✓ 完了")
-        return True
-        
-    except Exception as e:
-        logger.error(f"[{year}] ✗ エラー: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return False
+from database import DatabaseManager
+from backfill_executor import BackfillExecutor
+from utils import create_summary_report
+from config.backfill_config import (
+    BACKFILL_MAX_WORKERS, BACKFILL_BLOOMBERG_CONCURRENCY, BACKFILL_PROGRESS_FILE
+)
+from config.logging_config import logger
 
 def show_year_summary(db_manager: DatabaseManager, year: int):
     """年次サマリーを表示"""
@@ -127,78 +59,61 @@ def show_year_summary(db_manager: DatabaseManager, year: int):
 
 def main():
     """メイン処理"""
-    # 開始年と終了年を設定
+    # 開始年と終了年を設定（デフォルトは25年前から今年まで）
     end_year = datetime.now().year
-    start_year = end_year - 24  # 25年前から
-    
-    # 引数で範囲を指定可能
-    if len(sys.argv) >= 3:
-        start_year = int(sys.argv[1])
-        end_year = int(sys.argv[2])
+    parser = argparse.ArgumentParser(description='25年分のヒストリカルデータを並列取得')
+    parser.add_argument('start_year', nargs='?', type=int, default=end_year - 24)
+    parser.add_argument('end_year', nargs='?', type=int, default=end_year)
+    parser.add_argument('--workers', type=int, default=BACKFILL_MAX_WORKERS,
+                        help='ワーカープロセス数')
+    parser.add_argument('--bloomberg-concurrency', type=int, default=BACKFILL_BLOOMBERG_CONCURRENCY,
+                        help='全ワーカー合計のBloomberg同時リクエスト数')
+    args = parser.parse_args()
+    start_year, end_year = args.start_year, args.end_year
     
     logger.info(f"データ取得期間: {start_year}年 から {end_year}年 (計{end_year - start_year + 1}年間)")
     
-    # 進捗を読み込む
-    progress = load_progress()
-    completed_years = progress.get('completed_years', [])
+    executor = BackfillExecutor(
+        start_year, end_year,
+        max_workers=args.workers,
+        bloomberg_concurrency=args.bloomberg_concurrency,
+        progress_file=BACKFILL_PROGRESS_FILE
+    )
     
-    if completed_years:
-        logger.info(f"完了済み年: {completed_years}")
+    # 進捗を読み込む
+    completed_years = executor.load_progress()
+    if executor.completed_units:
+        logger.info(f"完了済み年: {completed_years}（完了済み作業単位: {len(executor.completed_units)}件）")
         response = input("\n既存の進捗から続行しますか？ (Y/N): ")
         if response.upper() != 'Y':
-            completed_years = []
-            progress = {'completed_years': []}
-    
-    # Bloomberg API接続
-    bloomberg_fetcher = BloombergDataFetcher()
-    db_manager = DatabaseManager()
-    
-    if not bloomberg_fetcher.connect():
-        logger.error("Bloomberg API接続に失敗しました")
-        return 1
+            executor.reset_progress()
     
     try:
-        # 年ごとにデータを取得
-        for year in range(start_year, end_year + 1):
-            if year in completed_years:
-                logger.info(f"\n{year}年: スキップ（完了済み）")
-                continue
-            
-            # データ取得
-            success = fetch_year_data(year, bloomberg_fetcher, db_manager)
-            
-            if success:
-                # 進捗を保存
-                completed_years.append(year)
-                progress['completed_years'] = sorted(completed_years)
-                save_progress(progress)
-                
-                # API負荷軽減のため少し待機
-                if year < end_year:
-                    logger.info("次の年の処理まで10秒待機...")
-                    time.sleep(10)
-            else:
-                logger.error(f"{year}年の処理に失敗しました。処理を中断します。")
-                logger.info(f"再開するには同じコマンドを実行してください。")
-                break
+        data_counts = executor.run()
+        logger.info(create_summary_report(data_counts))
+        
+        if executor.failed_units:
+            logger.error(f"{len(executor.failed_units)}件の作業単位が失敗しました。")
+            logger.info("再開するには同じコマンドを実行してください。")
+            return 1
         
         # 最終サマリー
-        if len(completed_years) == (end_year - start_year + 1):
-            logger.info("\n" + "="*60)
-            logger.info("全ての年のデータ取得が完了しました！")
-            show_final_summary(db_manager, start_year, end_year)
-            
-            # 進捗ファイルを削除
-            if os.path.exists(PROGRESS_FILE):
-                os.remove(PROGRESS_FILE)
+        logger.info("\n" + "="*60)
+        logger.info("全ての年のデータ取得が完了しました！")
+        db_manager = DatabaseManager()
+        for year in range(start_year, end_year + 1):
+            show_year_summary(db_manager, year)
+        show_final_summary(db_manager, start_year, end_year)
+        
+        # 進捗ファイルを削除
+        if os.path.exists(BACKFILL_PROGRESS_FILE):
+            os.remove(BACKFILL_PROGRESS_FILE)
         
         return 0
         
     except Exception as e:
         logger.error(f"エラーが発生しました: {e}")
         return 1
-    finally:
-        bloomberg_fetcher.disconnect()
 
 def show_final_summary(db_manager: DatabaseManager, start_year: int, end_year: int):
     """最終サマリーを表示"""
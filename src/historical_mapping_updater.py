@@ -7,13 +7,23 @@ FUT_CUR_GEN_TICKERをヒストリカルデータとして取得し、
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
-import logging
 from bloomberg_api import BloombergDataFetcher
+from contract_resolver import contract_security, get_contract_resolver
 from database import DatabaseManager
+from trading_calendar import get_trading_calendar
 from config.bloomberg_config import BLOOMBERG_TICKERS
+from config.logging_config import logger, sampled_logger
 
-# ロガー設定
-logger = logging.getLogger(__name__)
+# 実契約の静的情報（リファレンスキャッシュから取得し、日次のヒストリカルでは取得しない）
+CONTRACT_REFERENCE_FIELDS = [
+    'LAST_TRADEABLE_DT',     # 最終取引日
+    'FUT_DLV_DT_LAST',       # 最終受渡日
+    'FUT_CONTRACT_DT',       # 契約月
+    'FUT_CONT_SIZE',         # 契約サイズ
+    'FUT_TICK_SIZE',         # ティックサイズ
+    'NAME',                  # 契約名
+    'EXCH_CODE'              # 取引所コード
+]
 
 class HistoricalMappingUpdater:
     """ヒストリカルなGeneric-Actual契約マッピングを管理"""
@@ -21,6 +31,8 @@ class HistoricalMappingUpdater:
     def __init__(self, bloomberg_fetcher: BloombergDataFetcher, db_manager: DatabaseManager):
         self.bloomberg = bloomberg_fetcher
         self.db_manager = db_manager
+        # 契約ティッカー -> ActualContractID（update_historical_mappingsで設定）
+        self.contract_ids: Dict[str, int] = {}
         
     def update_historical_mappings(self, start_date: str, end_date: str, 
                                  generic_tickers: Optional[List[str]] = None):
@@ -50,14 +62,9 @@ class HistoricalMappingUpdater:
         tickers = generic_futures['GenericTicker'].tolist()
         logger.info(f"更新対象: {len(tickers)}件のジェネリック先物")
         
-        # FUT_CUR_GEN_TICKERをヒストリカルで取得
+        # FUT_CUR_GEN_TICKERのみヒストリカルで取得（契約の静的情報は契約単位で後から結合）
         fields = [
-            'FUT_CUR_GEN_TICKER',     # その日のジェネリック契約
-            'LAST_TRADEABLE_DT',       # 最終取引日
-            'FUT_DLV_DT_LAST',         # 最終受渡日
-            'FUT_CONTRACT_DT',         # 契約月
-            'FUT_CONT_SIZE',           # 契約サイズ
-            'FUT_TICK_SIZE'            # ティックサイズ
+            'FUT_CUR_GEN_TICKER'      # その日のジェネリック契約
         ]
         
         # 日付フォーマットをYYYYMMDDに変換
@@ -78,19 +85,23 @@ class HistoricalMappingUpdater:
             
         # データフレームの構造を確認
         logger.info(f"取得したデータ: {len(hist_data)}件")
-        logger.debug(f"データフレームのカラム: {hist_data.columns.tolist()}")
-        logger.debug(f"データフレームのインデックス: {hist_data.index.names}")
+        logger.debug("データフレームのカラム: {}", hist_data.columns.tolist())
+        logger.debug("データフレームのインデックス: {}", hist_data.index.names)
         
         # 最初の数行を確認
         if len(hist_data) > 0:
-            logger.debug(f"データサンプル:\n{hist_data.head()}")
+            # DataFrameの文字列化はDEBUGが出力される場合のみ行う
+            logger.opt(lazy=True).debug("データサンプル:\n{}", lambda: hist_data.head())
             if 'date' in hist_data.columns:
-                logger.debug(f"日付のデータ型: {hist_data['date'].dtype}")
-                logger.debug(f"日付の例: {hist_data['date'].iloc[0]}")
+                logger.debug("日付のデータ型: {}", hist_data['date'].dtype)
+                logger.debug("日付の例: {}", hist_data['date'].iloc[0])
         
         # 日付カラムを datetime 型に変換
         if 'date' in hist_data.columns:
             hist_data['date'] = pd.to_datetime(hist_data['date'])
+            
+        hist_data = self._attach_contract_reference(hist_data)
+        self.contract_ids = self._resolve_contracts(hist_data, generic_futures)
         
         # 日付ごとにマッピングを処理
         for trade_date in pd.date_range(start_date, end_date):
@@ -98,6 +109,68 @@ class HistoricalMappingUpdater:
             
         logger.info("ヒストリカルマッピング更新完了")
         
+    def _attach_contract_reference(self, hist_data: pd.DataFrame) -> pd.DataFrame:
+        """
+        各日のジェネリック契約の静的情報（最終取引日・契約サイズ等）を結合
+        
+        静的情報は契約ごとに1回だけリファレンスキャッシュ経由で取得する
+        
+        Args:
+            hist_data: FUT_CUR_GEN_TICKERのヒストリカルデータ
+            
+        Returns:
+            pd.DataFrame: CONTRACT_REFERENCE_FIELDSの列を追加したデータ
+        """
+        if 'FUT_CUR_GEN_TICKER' not in hist_data.columns:
+            return hist_data.reindex(columns=list(hist_data.columns) + CONTRACT_REFERENCE_FIELDS)
+            
+        # FUT_CUR_GEN_TICKERの値（'LPN25'）-> リクエスト用の証券名（'LPN25 Comdty'）
+        securities = {contract_security(c): c for c in hist_data['FUT_CUR_GEN_TICKER'].dropna().astype(str).unique()}
+        ref_data = pd.DataFrame()
+        if securities:
+            ref_data = self.bloomberg.get_static_reference_data(list(securities), CONTRACT_REFERENCE_FIELDS)
+        ref_data = ref_data.reindex(columns=['security'] + CONTRACT_REFERENCE_FIELDS)
+        ref_data['FUT_CUR_GEN_TICKER'] = ref_data.pop('security').astype(str).map(securities).astype(object)
+        
+        hist_data['FUT_CUR_GEN_TICKER'] = hist_data['FUT_CUR_GEN_TICKER'].astype(object)
+        return hist_data.merge(
+            ref_data.dropna(subset=['FUT_CUR_GEN_TICKER']),
+            on='FUT_CUR_GEN_TICKER', how='left'
+        )
+        
+    def _resolve_contracts(self, hist_data: pd.DataFrame, generic_futures: pd.DataFrame) -> Dict[str, int]:
+        """
+        期間中に出現した全契約のActualContractIDを一括で解決（未登録の契約はまとめて作成）
+        
+        1桁年のティッカー（HGN5等）は契約が最初に出現した日を基準に年を判定する
+        
+        Args:
+            hist_data: _attach_contract_referenceの出力（security・date列）
+            generic_futures: 対象のジェネリック先物（GenericTicker・MetalID・ExchangeCode）
+            
+        Returns:
+            Dict[str, int]: 契約ティッカー -> ActualContractID
+        """
+        if 'FUT_CUR_GEN_TICKER' not in hist_data.columns or 'security' not in hist_data.columns:
+            return {}
+            
+        contracts = hist_data[hist_data['FUT_CUR_GEN_TICKER'].notna()]
+        if 'date' in contracts.columns:
+            contracts = contracts.sort_values('date')
+        contracts = contracts.drop_duplicates(subset=['FUT_CUR_GEN_TICKER'], keep='first')
+        
+        generic_by_ticker = generic_futures.drop_duplicates('GenericTicker').set_index('GenericTicker')
+        security = contracts['security'].astype(str)
+        resolver_input = pd.DataFrame({
+            'ContractTicker': contracts['FUT_CUR_GEN_TICKER'].astype(str),
+            'MetalID': security.map(generic_by_ticker['MetalID']),
+            'ExchangeCode': security.map(generic_by_ticker['ExchangeCode']),
+            **{field: contracts[field] for field in CONTRACT_REFERENCE_FIELDS if field in contracts.columns}
+        })
+        if 'date' in contracts.columns:
+            resolver_input['AsOf'] = contracts['date']
+        return get_contract_resolver(self.db_manager).resolve(resolver_input)
+        
     def _process_date_mappings(self, trade_date, hist_data: pd.DataFrame, 
                               generic_futures: pd.DataFrame):
         """特定日のマッピングを処理"""
@@ -113,14 +186,14 @@ class HistoricalMappingUpdater:
             date_data = hist_data[hist_data.index == pd.Timestamp(trade_date)]
         
         if date_data.empty:
-            logger.debug(f"{trade_date}: データなし（休場日の可能性）")
+            sampled_logger.debug("{}: データなし（休場日の可能性）", trade_date)
             return
             
-        logger.info(f"{trade_date}: {len(date_data)}件のマッピングを処理")
+        sampled_logger.info("{}: {}件のマッピングを処理", trade_date, len(date_data))
         
         # tickerでグループ化（security列を使用）
         if 'security' in date_data.columns:
-            grouped = date_data.groupby('security')
+            grouped = date_data.groupby('security', observed=True)
         elif 'ticker' in date_data.columns:
             grouped = date_data.groupby('ticker')
         elif date_data.index.nlevels > 1 and 'ticker' in date_data.index.names:
@@ -140,22 +213,18 @@ class HistoricalMappingUpdater:
                 current_contract = ticker_data.get('FUT_CUR_GEN_TICKER')
             
             if pd.isna(current_contract) or current_contract is None:
-                logger.warning(f"{trade_date} {ticker}: 現在の契約が取得できません")
+                sampled_logger.warning("{} {}: 現在の契約が取得できません", trade_date, ticker)
                 continue
                 
             # ジェネリック先物情報を取得
             matching_futures = generic_futures[generic_futures['GenericTicker'] == ticker]
             if matching_futures.empty:
-                logger.debug(f"{trade_date} {ticker}: ジェネリック先物マスタに存在しません")
+                sampled_logger.debug("{} {}: ジェネリック先物マスタに存在しません", trade_date, ticker)
                 continue
             generic_info = matching_futures.iloc[0]
             
-            # 実契約を確認・作成
-            actual_contract_id = self._ensure_actual_contract(
-                current_contract, 
-                generic_info,
-                ticker_data.iloc[0] if isinstance(ticker_data, pd.DataFrame) else ticker_data
-            )
+            # 実契約（update_historical_mappingsで一括解決済み）
+            actual_contract_id = self.contract_ids.get(str(current_contract))
             
             if actual_contract_id:
                 # マッピングを更新
@@ -163,136 +232,27 @@ class HistoricalMappingUpdater:
                     trade_date,
                     generic_info['GenericID'],
                     actual_contract_id,
-                    ticker_data
+                    ticker_data,
+                    generic_info['ExchangeCode']
                 )
                 
-    def _ensure_actual_contract(self, contract_ticker: str, generic_info: pd.Series,
-                               bloomberg_data: pd.Series) -> Optional[int]:
-        """実契約を確認し、存在しない場合は作成"""
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # 既存チェック
-            cursor.execute(
-                "SELECT ActualContractID FROM M_ActualContract WHERE ContractTicker = ?",
-                (contract_ticker,)
-            )
-            existing = cursor.fetchone()
-            
-            if existing:
-                return existing[0]
-                
-            # 新規契約の場合、Bloomberg APIから正確な情報を取得
-            logger.info(f"新しい契約を発見: {contract_ticker}。Bloomberg APIから詳細情報を取得します。")
-            
-            # 実契約の詳細情報を取得するためのフィールド
-            actual_fields = [
-                'LAST_TRADEABLE_DT',     # 最終取引日
-                'FUT_DLV_DT_LAST',       # 最終受渡日
-                'FUT_CONTRACT_DT',       # 契約月
-                'FUT_CONT_SIZE',         # 契約サイズ
-                'FUT_TICK_SIZE',         # ティックサイズ
-                'NAME',                  # 契約名
-                'EXCH_CODE'             # 取引所コード
-            ]
-            
-            # 実契約のリファレンスデータを取得
-            ref_data = self.bloomberg.get_reference_data([contract_ticker], actual_fields)
-            
-            if ref_data.empty:
-                logger.error(f"Bloomberg APIから{contract_ticker}の情報を取得できませんでした")
-                return None
-                
-            actual_data = ref_data.iloc[0]
-            
-            # 契約月の解析
-            contract_month = None
-            contract_year = None
-            contract_month_code = None
-            
-            contract_date = actual_data.get('FUT_CONTRACT_DT')
-            if pd.notna(contract_date):
-                try:
-                    # 日付の処理
-                    if hasattr(contract_date, 'date'):
-                        contract_dt = contract_date
-                    else:
-                        contract_dt = pd.to_datetime(contract_date)
-                        
-                    contract_month = contract_dt.month
-                    contract_year = contract_dt.year
-                    
-                    # 月コード生成
-                    month_codes = ['F', 'G', 'H', 'J', 'K', 'M', 'N', 'Q', 'U', 'V', 'X', 'Z']
-                    contract_month_code = month_codes[contract_month - 1]
-                except Exception as e:
-                    logger.warning(f"契約月解析エラー: {e}")
-                    
-            # 最終取引日の処理
-            last_tradeable = actual_data.get('LAST_TRADEABLE_DT')
-            if pd.notna(last_tradeable):
-                if hasattr(last_tradeable, 'date'):
-                    last_tradeable = last_tradeable.date()
-                else:
-                    last_tradeable = pd.to_datetime(last_tradeable).date()
-                    
-            # 最終受渡日の処理
-            delivery_date = actual_data.get('FUT_DLV_DT_LAST')
-            if pd.notna(delivery_date):
-                if hasattr(delivery_date, 'date'):
-                    delivery_date = delivery_date.date()
-                else:
-                    delivery_date = pd.to_datetime(delivery_date).date()
-                    
-            # 挿入
-            cursor.execute("""
-                INSERT INTO M_ActualContract (
-                    ContractTicker, MetalID, ExchangeCode, ContractMonth,
-                    ContractYear, ContractMonthCode, LastTradeableDate,
-                    DeliveryDate, ContractSize, TickSize
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                contract_ticker,
-                int(generic_info['MetalID']),
-                generic_info['ExchangeCode'],
-                contract_month,
-                contract_year,
-                contract_month_code,
-                last_tradeable,
-                delivery_date,
-                float(actual_data.get('FUT_CONT_SIZE')) if pd.notna(actual_data.get('FUT_CONT_SIZE')) else None,
-                float(actual_data.get('FUT_TICK_SIZE')) if pd.notna(actual_data.get('FUT_TICK_SIZE')) else None
-            ))
-            
-            cursor.execute("SELECT @@IDENTITY")
-            actual_contract_id = cursor.fetchone()[0]
-            conn.commit()
-            
-            logger.info(f"新規実契約作成完了: {contract_ticker} (ID: {actual_contract_id})")
-            logger.info(f"  LastTradeableDate: {last_tradeable}")
-            logger.info(f"  DeliveryDate: {delivery_date}")
-            logger.info(f"  ContractMonth: {contract_month}/{contract_year}")
-            
-            return actual_contract_id
-            
     def _update_mapping(self, trade_date, generic_id: int,
-                       actual_contract_id: int, bloomberg_data: pd.Series):
+                       actual_contract_id: int, bloomberg_data: pd.Series,
+                       exchange_code: Optional[str] = None):
         """マッピングを更新（MERGE操作）"""
         with self.db_manager.get_connection() as conn:
             cursor = conn.cursor()
             
-            # 残存日数計算
+            # 残存日数計算（取引所の営業日ベース）
             days_to_expiry = None
             last_tradeable = bloomberg_data.get('LAST_TRADEABLE_DT')
             if pd.notna(last_tradeable):
                 try:
-                    if hasattr(last_tradeable, 'date'):
-                        last_tradeable_dt = last_tradeable.date()
-                    else:
-                        last_tradeable_dt = pd.to_datetime(last_tradeable).date()
-                    days_to_expiry = (last_tradeable_dt - trade_date).days
+                    days_to_expiry = get_trading_calendar(self.db_manager).trading_days_between(
+                        trade_date, last_tradeable, exchange_code
+                    )
                 except Exception as e:
-                    logger.warning(f"残存日数計算エラー: {e}")
+                    sampled_logger.warning("残存日数計算エラー: {}", e)
                     
             # MERGE操作
             cursor.execute("""
@@ -310,7 +270,7 @@ class HistoricalMappingUpdater:
             """, (trade_date, int(generic_id), int(actual_contract_id), days_to_expiry))
             
             conn.commit()
-            logger.debug(f"マッピング更新: {trade_date} GenericID {generic_id} -> ContractID {actual_contract_id}")
+            sampled_logger.debug("マッピング更新: {} GenericID {} -> ContractID {}", trade_date, generic_id, actual_contract_id)
             
     def _get_all_generic_futures(self) -> pd.DataFrame:
         """全てのアクティブなジェネリック先物を取得"""
@@ -342,12 +302,6 @@ def main():
     import sys
     from datetime import datetime
     
-    # ロギング設定
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
     # 引数チェック
     if len(sys.argv) < 3:
         print("使用方法: python historical_mapping_updater.py [開始日] [終了日] [ティッカー（オプション）]")
@@ -0,0 +1,312 @@
+"""
+常駐型データ取得デーモン
+Bloombergセッション・DB接続・マスタデータキャッシュを保持したまま、
+市場タイミングに合わせた定期更新とファイルキュー経由のオンデマンドジョブを実行する
+"""
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional, Any
+
+# プロジェクトルートとsrcディレクトリをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(project_root, 'src')
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from enhanced_daily_update import EnhancedDailyUpdater, MarketTimingManager, MARKET_CATEGORIES
+from utils import create_summary_report
+
+from config.bloomberg_config import BLOOMBERG_TICKERS
+from config.daemon_config import (
+    DAEMON_QUEUE_DIR, DAEMON_POLL_INTERVAL, MASTER_DATA_REFRESH_INTERVAL,
+    DEFAULT_REFETCH_DAYS, DAEMON_STOP_FILE
+)
+from config.logging_config import logger, log_suppression_summary
+
+# サポートするジョブタイプ
+JOB_TYPES = ('daily', 'rollover', 'backfill', 'refetch')
+
+# キューのサブディレクトリ
+QUEUE_STATES = ('pending', 'processing', 'done', 'failed')
+
+
+def submit_job(job_type: str, categories: Optional[List[str]] = None,
+               start_date: Optional[str] = None, end_date: Optional[str] = None,
+               days: Optional[int] = None, queue_dir: str = DAEMON_QUEUE_DIR) -> str:
+    """
+    デーモンのジョブキューにジョブを投入
+
+    Args:
+        job_type: ジョブタイプ（'daily', 'rollover', 'backfill', 'refetch'）
+        categories: 対象カテゴリ（Noneの場合は全カテゴリ）
+        start_date: 開始日（YYYYMMDD、backfill用）
+        end_date: 終了日（YYYYMMDD、backfill用）
+        days: 遡及日数（refetch用）
+        queue_dir: キューディレクトリ
+
+    Returns:
+        str: 投入したジョブのファイルパス
+    """
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"Invalid job type: {job_type}. Use one of {JOB_TYPES}")
+    if job_type == 'backfill' and not (start_date and end_date):
+        raise ValueError("backfill job requires start_date and end_date")
+
+    if categories:
+        unknown = [c for c in categories if c not in BLOOMBERG_TICKERS]
+        if unknown:
+            raise ValueError(f"Unknown categories: {unknown}")
+
+    job = {
+        'job_id': f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}",
+        'type': job_type,
+        'categories': categories,
+        'start_date': start_date,
+        'end_date': end_date,
+        'days': days,
+        'submitted_at': datetime.now().isoformat()
+    }
+
+    pending_dir = os.path.join(queue_dir, 'pending')
+    os.makedirs(pending_dir, exist_ok=True)
+
+    # 一時ファイルに書き込んでからリネーム（デーモンが書きかけのファイルを読まないように）
+    job_path = os.path.join(pending_dir, f"{job['job_id']}.json")
+    tmp_path = job_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(job, f, indent=2)
+    os.replace(tmp_path, job_path)
+
+    return job_path
+
+
+class IngestionDaemon:
+    """接続とキャッシュを保持したまま定期更新・オンデマンドジョブを実行する常駐クラス"""
+
+    def __init__(self, ingestor, queue_dir: str = DAEMON_QUEUE_DIR,
+                 poll_interval: int = DAEMON_POLL_INTERVAL):
+        self.ingestor = ingestor
+        self.queue_dir = queue_dir
+        self.poll_interval = poll_interval
+        self.updater = None
+        self.market_run_dates: Dict[str, date] = {}
+        self.last_rollover_date: Optional[date] = None
+        self.last_weekly_date: Optional[date] = None
+        self.master_loaded_at: Optional[datetime] = None
+        self._running = False
+
+    def start(self):
+        """デーモンを起動し、停止要求まで処理を継続"""
+        logger.info("Starting ingestion daemon...")
+
+        for state in QUEUE_STATES:
+            os.makedirs(os.path.join(self.queue_dir, state), exist_ok=True)
+
+        # 初期化は起動時の1回のみ（Bloombergセッション・DB接続・マスタデータ）
+        self.ingestor.initialize()
+        self.master_loaded_at = datetime.now()
+        self.updater = EnhancedDailyUpdater(self.ingestor)
+
+        self._running = True
+        logger.info(f"Ingestion daemon started (queue: {self.queue_dir}, poll: {self.poll_interval}s)")
+
+        try:
+            while self._running:
+                self.run_once()
+
+                if self._stop_requested():
+                    logger.info("Stop file detected, shutting down daemon")
+                    break
+
+                time.sleep(self.poll_interval)
+
+        except KeyboardInterrupt:
+            logger.info("Daemon interrupted by user")
+
+        finally:
+            self._running = False
+            self.ingestor.cleanup()
+            logger.info("Ingestion daemon stopped")
+
+    def stop(self):
+        """次のポーリングでデーモンを停止"""
+        self._running = False
+
+    def run_once(self):
+        """1回分のポーリング処理（マスタ更新 → 定期更新 → キュー処理）"""
+        try:
+            self._refresh_master_data_if_stale()
+            self._run_scheduled_updates()
+            self._process_job_queue()
+        except Exception as e:
+            logger.error(f"Daemon cycle failed: {e}", exc_info=True)
+            self._recover_connections()
+
+    def _run_scheduled_updates(self):
+        """市場タイミングに応じた日次更新を実行"""
+        due_markets = [
+            market for market in MARKET_CATEGORIES
+            if MarketTimingManager.is_update_due(market, self.market_run_dates.get(market))
+        ]
+
+        if not due_markets:
+            return
+
+        # ロールオーバーはその日最初の更新前に1回だけ実行
+        if self.last_rollover_date != date.today():
+            self._run_rollover()
+            self.last_rollover_date = date.today()
+
+        for market in due_markets:
+            logger.info(f"Scheduled update for {market} market")
+            summary = self.updater.update_market(market)
+            self.market_run_dates[market] = self._market_today(market)
+
+            record_counts = {category: result.get('records', 0) for category, result in summary.items()}
+            logger.info(create_summary_report(record_counts))
+
+        # 満期・営業日情報を更新分のTradeDateのみ再計算
+        self.ingestor.refresh_enriched_prices()
+
+        # 週次データ（金曜日のみ）
+        if datetime.now().weekday() == 4 and self.last_weekly_date != date.today():
+            self.updater.update_weekly_data()
+            self.last_weekly_date = date.today()
+
+    def _market_today(self, market: str) -> date:
+        """市場ローカルの当日日付を取得"""
+        safe_time = MarketTimingManager.get_safe_update_time(market)
+        return safe_time.date() if safe_time else date.today()
+
+    def _run_rollover(self):
+        """保持中の接続を使用して自動ロールオーバーを実行"""
+        try:
+            from auto_rollover_manager import AutoRolloverManager
+            rollover_manager = AutoRolloverManager(self.ingestor.bloomberg, self.ingestor.db_manager)
+            if not rollover_manager.execute_auto_rollover():
+                logger.warning("Automatic rollover encountered issues")
+        except Exception as e:
+            # ロールオーバーエラーは定期更新を停止しない
+            logger.error(f"Automatic rollover failed: {e}")
+
+    def _process_job_queue(self):
+        """キューに投入されたジョブを古い順に処理"""
+        pending_dir = os.path.join(self.queue_dir, 'pending')
+        job_files = sorted(f for f in os.listdir(pending_dir) if f.endswith('.json'))
+
+        for job_file in job_files:
+            processing_path = os.path.join(self.queue_dir, 'processing', job_file)
+            try:
+                # 処理中ディレクトリへ移動（二重実行防止）
+                os.replace(os.path.join(pending_dir, job_file), processing_path)
+            except OSError:
+                continue
+
+            job = {}
+            try:
+                with open(processing_path, 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+
+                logger.info(f"Running job {job.get('job_id')} ({job.get('type')})")
+                job['result'] = self.run_job(job)
+                job['finished_at'] = datetime.now().isoformat()
+                final_state = 'done'
+
+            except Exception as e:
+                logger.error(f"Job {job_file} failed: {e}", exc_info=True)
+                job['error'] = str(e)
+                job['finished_at'] = datetime.now().isoformat()
+                final_state = 'failed'
+                self._recover_connections()
+
+            # ジョブごとにサンプリングで抑制したログの件数を出力
+            log_suppression_summary()
+
+            with open(processing_path, 'w', encoding='utf-8') as f:
+                json.dump(job, f, indent=2, default=str)
+            os.replace(processing_path, os.path.join(self.queue_dir, final_state, job_file))
+
+    def run_job(self, job: Dict[str, Any]) -> Dict[str, int]:
+        """
+        ジョブを実行
+
+        Args:
+            job: ジョブ定義（submit_jobで作成した辞書）
+
+        Returns:
+            Dict[str, int]: カテゴリ別の処理件数
+        """
+        job_type = job.get('type')
+
+        if job_type == 'daily':
+            self.ingestor.data_counts = {}
+            self.ingestor.run_daily_update()
+            return dict(self.ingestor.data_counts)
+
+        if job_type == 'rollover':
+            self._run_rollover()
+            self.ingestor.refresh_enriched_prices()
+            return {}
+
+        if job_type == 'backfill':
+            start_date, end_date = job['start_date'], job['end_date']
+        elif job_type == 'refetch':
+            days = job.get('days') or DEFAULT_REFETCH_DAYS
+            end_date = datetime.now().strftime('%Y%m%d')
+            start_date = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
+        else:
+            raise ValueError(f"Invalid job type: {job_type}")
+
+        categories = job.get('categories') or list(BLOOMBERG_TICKERS.keys())
+        record_counts = {}
+
+        # バックフィルはパーティション化テーブルへSWITCH経由でロード
+        self.ingestor.backfill = job_type == 'backfill'
+        try:
+            for category_name in categories:
+                record_counts[category_name] = self.ingestor.process_category(
+                    category_name, BLOOMBERG_TICKERS[category_name], start_date, end_date
+                )
+        finally:
+            self.ingestor.backfill = False
+
+        self.ingestor.refresh_enriched_prices()
+        logger.info(create_summary_report(record_counts))
+        return record_counts
+
+    def _refresh_master_data_if_stale(self):
+        """一定間隔でマスタデータを再ロード（他プロセスによる追加を取り込む）"""
+        if self.master_loaded_at is None:
+            return
+
+        elapsed = (datetime.now() - self.master_loaded_at).total_seconds()
+        if elapsed >= MASTER_DATA_REFRESH_INTERVAL:
+            logger.info("Refreshing master data cache...")
+            self.ingestor.db_manager.load_master_data()
+            self.master_loaded_at = datetime.now()
+
+    def _recover_connections(self):
+        """エラー発生後に接続を張り直す"""
+        logger.info("Re-establishing Bloomberg and database connections...")
+        try:
+            self.ingestor.bloomberg.disconnect()
+            if not self.ingestor.bloomberg.connect():
+                logger.error("Failed to reconnect to Bloomberg API")
+
+            self.ingestor.db_manager.disconnect()
+            self.ingestor.db_manager.connect()
+        except Exception as e:
+            logger.error(f"Reconnection failed: {e}")
+
+    def _stop_requested(self) -> bool:
+        """停止要求ファイルの有無を確認（存在する場合は削除して停止）"""
+        stop_path = os.path.join(self.queue_dir, DAEMON_STOP_FILE)
+        if os.path.exists(stop_path):
+            os.remove(stop_path)
+            return True
+        return False
@@ -0,0 +1,33 @@
+"""
+遅延インポートユーティリティ
+pandas等の重いモジュールを初回の属性アクセス時まで読み込まない
+"""
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    モジュールを遅延インポート
+
+    Args:
+        name: モジュール名（例: 'pandas'）
+
+    Returns:
+        ModuleType: 初回の属性アクセス時に実際に読み込まれるモジュール
+    """
+    # 既に読み込み済みの場合はそのまま返す
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -2,36 +2,52 @@
 Bloomberg データ取得・SQL Server格納システム
 メインエントリーポイント
 """
+from __future__ import annotations
+
 import argparse
+import copy
+import json
 import sys
 import os
-import pandas as pd
 from datetime import datetime, timedelta
 # from typing import List  # Python 3.9+ では不要
 
 # プロジェクトルートとsrcディレクトリをPythonパスに追加
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 src_dir = os.path.join(project_root, 'src')
-sys.path.insert(0, project_root)
-sys.path.insert(0, src_dir)
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# pandas・Bloomberg API・DBドライバは重いため初回使用時に読み込む（--help等の起動を高速化）
+from lazy_import import lazy_import
+from ticker_registry import get_ticker_spec, CATEGORY_TYPES
+from utils import measure_execution_time, create_summary_report, compact_frame, split_date_range
 
-from bloomberg_api import BloombergDataFetcher
-from database import DatabaseManager
-from data_processor import DataProcessor
-from utils import measure_execution_time, create_summary_report
+pd = lazy_import('pandas')
 
-from config.bloomberg_config import BLOOMBERG_TICKERS, get_date_range
-from config.logging_config import logger
+from config.bloomberg_config import (
+    BLOOMBERG_TICKERS, get_date_range, INITIAL_LOAD_CHUNK_DAYS, INITIAL_LOAD_CHECKPOINT_FILE
+)
+from config.logging_config import logger, log_suppression_summary
 
 
 class BloombergSQLIngestor:
     """Bloomberg データ取得・SQL Server格納を管理するメインクラス"""
     
     def __init__(self):
+        from bloomberg_api import BloombergDataFetcher
+        from database import DatabaseManager
+        
         self.bloomberg = BloombergDataFetcher()
         self.db_manager = DatabaseManager()
         self.processor = None
         self.data_counts = {}
+        # バックフィル中はパーティション化テーブルへSWITCH経由でロード
+        self.backfill = False
+        # 日次更新中はテーブルごとに書き込みをバッファし、まとめて格納（flush_buffered_writes）
+        self.write_behind = False
+        self._buffered_categories: dict[str, list[str]] = {}
         
     def initialize(self):
         """システムの初期化"""
@@ -48,6 +64,7 @@ class BloombergSQLIngestor:
         self.db_manager.load_master_data()
         
         # データプロセッサーの初期化
+        from data_processor import DataProcessor
         self.processor = DataProcessor(self.db_manager)
         
         logger.info("Initialization completed successfully")
@@ -57,12 +74,13 @@ class BloombergSQLIngestor:
         logger.info("Cleaning up resources...")
         self.bloomberg.disconnect()
         self.db_manager.disconnect()
+        log_suppression_summary()
         
     @measure_execution_time
     def process_category(self, category_name: str, ticker_info: dict, 
                         start_date: str, end_date: str) -> int:
         """
-        カテゴリ別にデータを処理
+        カテゴリ別にデータを処理（取得・加工・格納）
         
         Args:
             category_name: カテゴリ名
@@ -76,78 +94,317 @@ class BloombergSQLIngestor:
         logger.info(f"Processing {category_name}...")
         
         try:
-            # 証券リストとフィールドの取得
-            if isinstance(ticker_info['securities'], dict):
-                # 複雑な構造（在庫データなど）
-                all_securities = []
-                for sec_list in ticker_info['securities'].values():
-                    if isinstance(sec_list, list):
-                        all_securities.extend(sec_list)
-                    elif isinstance(sec_list, dict):
-                        for subsec_list in sec_list.values():
-                            all_securities.extend(subsec_list)
-            else:
-                all_securities = ticker_info['securities']
+            df = self.fetch_category(category_name, ticker_info, start_date, end_date)
+            processed_df = self.transform_category(df, ticker_info)
+            return self.store_category(category_name, ticker_info['table'], processed_df)
                 
-            fields = ticker_info['fields']
+        except Exception as e:
+            logger.error(f"Error processing {category_name}: {e}")
+            return 0
             
-            # データ取得（リファレンスまたはヒストリカル）
-            if ticker_info.get('frequency') == 'Weekly':
-                # 週次データは最新のみ取得
-                df = self.bloomberg.get_reference_data(all_securities, fields)
-            else:
-                # 日次データはヒストリカル取得
-                df = self.bloomberg.batch_request(
-                    all_securities, fields, start_date, end_date,
-                    request_type='historical'
-                )
-                
-            if df.empty:
-                logger.warning(f"No data retrieved for {category_name}")
-                return 0
+    def process_category_streaming(self, category_name: str, ticker_info: dict,
+                                   start_date: str, end_date: str,
+                                   checkpoint: dict, chunk_days: int = INITIAL_LOAD_CHUNK_DAYS) -> int:
+        """
+        カテゴリの期間をチャンクに分割し、チャンクごとに取得・加工・格納して破棄する
+        
+        取得データを保持するのは常に1チャンク分のみのため、期間の長さに関わらずメモリ使用量は一定。
+        日次データはiter_historical_dataで証券ごとに受信し、取得エラー・応答途絶は例外としてチャンクを失敗させる
+        （空データとして格納しない）。格納が完了したチャンクの終了日をチェックポイントに記録し、再実行時は
+        その翌日から取得する。チャンクが失敗した場合は以降のチャンクを取得せず次のカテゴリへ進む
+        （再実行で失敗チャンクから再開）
+        
+        Args:
+            category_name: カテゴリ名
+            ticker_info: ティッカー設定情報
+            start_date: 開始日（YYYYMMDD）
+            end_date: 終了日（YYYYMMDD）
+            checkpoint: チェックポイント（カテゴリ名 -> {'completed_until', 'records'}）。更新して保存する
+            chunk_days: チャンクの日数
+            
+        Returns:
+            int: 格納されたレコード数（チェックポイント以前の実行分を含む）
+        """
+        state = checkpoint.setdefault(category_name, {'completed_until': None, 'records': 0})
+        if state['completed_until'] and state['completed_until'] >= start_date:
+            resume_date = datetime.strptime(state['completed_until'], '%Y%m%d') + timedelta(days=1)
+            start_date = resume_date.strftime('%Y%m%d')
+            logger.info(f"Resuming {category_name} from {start_date} (checkpoint)")
+            
+        # 週次データは最新値のリファレンス取得のため分割しない
+        if ticker_info.get('frequency') == 'Weekly':
+            chunks = [(start_date, end_date)] if start_date <= end_date else []
+        else:
+            chunks = split_date_range(start_date, end_date, chunk_days) if start_date <= end_date else []
+            
+        for index, (chunk_start, chunk_end) in enumerate(chunks, 1):
+            try:
+                if self._request_type(ticker_info) == 'historical':
+                    df = self._stream_historical(ticker_info, chunk_start, chunk_end)
+                else:
+                    df = self.fetch_category(category_name, ticker_info, chunk_start, chunk_end)
+                processed_df = self.transform_category(df, ticker_info)
+                del df
+                record_count = self.store_category(category_name, ticker_info['table'], processed_df)
+                del processed_df
+            except Exception as e:
+                logger.error(f"Error processing {category_name} chunk {chunk_start}-{chunk_end}: {e}")
+                break
                 
-            # データ処理
-            table_name = ticker_info['table']
-            processed_df = pd.DataFrame()
-            
-            if table_name == 'T_CommodityPrice':
-                processed_df = self.processor.process_commodity_prices(df, ticker_info)
-            elif table_name == 'T_LMEInventory':
-                processed_df = self.processor.process_lme_inventory(df, ticker_info)
-            elif table_name == 'T_OtherExchangeInventory':
-                processed_df = self._process_other_inventory(df, ticker_info)
-            elif table_name == 'T_MarketIndicator':
-                processed_df = self.processor.process_market_indicators(df, ticker_info)
-            elif table_name == 'T_MacroEconomicIndicator':
-                processed_df = self._process_macro_indicators(df, ticker_info)
-            elif table_name == 'T_COTR':
-                processed_df = self.processor.process_cotr_data(df, ticker_info)
-            elif table_name == 'T_BandingReport':
-                processed_df = self.processor.process_banding_report(df, ticker_info)
-            elif table_name == 'T_CompanyStockPrice':
-                processed_df = self.processor.process_company_stocks(df, ticker_info)
+            state['completed_until'] = chunk_end
+            state['records'] += record_count
+            self._save_checkpoint(checkpoint)
+            logger.info(f"{category_name} chunk {index}/{len(chunks)} ({chunk_start}-{chunk_end}): "
+                        f"{record_count} records")
+            
+        return state['records']
+        
+    def _stream_historical(self, ticker_info: dict, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        カテゴリのヒストリカルデータを証券ごとに受信して1チャンク分にまとめる
+        
+        加工は在庫のピボット等で証券をまたぐため、チャンク単位で行う。get_historical_dataと異なり
+        取得エラーを空データにせず、そのまま送出する
+        
+        Args:
+            ticker_info: ティッカー設定情報
+            start_date: 開始日（YYYYMMDD）
+            end_date: 終了日（YYYYMMDD）
+            
+        Returns:
+            pd.DataFrame: 取得データ（期間中にデータがない場合は空）
+            
+        Raises:
+            TimeoutError: Bloombergの応答が途絶えた場合
+        """
+        frames = list(self.bloomberg.iter_historical_data(
+            self._category_securities(ticker_info), ticker_info['fields'], start_date, end_date
+        ))
+        return compact_frame(pd.concat(frames, ignore_index=True)) if frames else pd.DataFrame()
+        
+    def _load_checkpoint(self) -> dict:
+        """初回ロードのチェックポイントを読み込む"""
+        if os.path.exists(INITIAL_LOAD_CHECKPOINT_FILE):
+            with open(INITIAL_LOAD_CHECKPOINT_FILE, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            logger.info(f"Loaded initial load checkpoint: {INITIAL_LOAD_CHECKPOINT_FILE}")
+            return checkpoint
+        return {}
+        
+    def _save_checkpoint(self, checkpoint: dict):
+        """初回ロードのチェックポイントを保存（書き込み途中の中断で壊れないよう置き換えで保存）"""
+        os.makedirs(os.path.dirname(INITIAL_LOAD_CHECKPOINT_FILE), exist_ok=True)
+        temp_path = f"{INITIAL_LOAD_CHECKPOINT_FILE}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, indent=2)
+        os.replace(temp_path, INITIAL_LOAD_CHECKPOINT_FILE)
+        
+    def fetch_category(self, category_name: str, ticker_info: dict,
+                       start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        カテゴリのデータをBloombergから取得
+        
+        Args:
+            category_name: カテゴリ名
+            ticker_info: ティッカー設定情報
+            start_date: 開始日
+            end_date: 終了日
+            
+        Returns:
+            pd.DataFrame: 取得データ（取得できない場合は空）
+        """
+        df = self._fetch_securities(
+            self._category_securities(ticker_info), ticker_info['fields'],
+            self._request_type(ticker_info), start_date, end_date
+        )
+        if df.empty:
+            logger.warning(f"No data retrieved for {category_name}")
+        return df
+        
+    def fetch_categories(self, categories: dict[str, dict],
+                         start_date: str, end_date: str) -> dict[str, pd.DataFrame]:
+        """
+        フィールドリストとリクエスト種別が同じカテゴリの証券をまとめて取得し、カテゴリ別に振り分ける
+        
+        指標系カテゴリ（INDICATOR_FIELDS）や在庫・バンディング（INVENTORY_FIELDS）のように
+        同じフィールド・期間で取得するカテゴリは1回のリクエストにまとめる
+        
+        Args:
+            categories: カテゴリ名 -> ティッカー設定情報
+            start_date: 開始日
+            end_date: 終了日
+            
+        Returns:
+            dict[str, pd.DataFrame]: カテゴリ名 -> 取得データ（取得できない場合は空）
+        """
+        groups: dict[tuple, list[str]] = {}
+        for category_name, ticker_info in categories.items():
+            key = (tuple(ticker_info['fields']), self._request_type(ticker_info))
+            groups.setdefault(key, []).append(category_name)
+            
+        results = {}
+        for (fields, request_type), category_names in groups.items():
+            category_securities = {
+                name: self._category_securities(categories[name]) for name in category_names
+            }
+            # 複数カテゴリに含まれる証券は1回だけリクエストする
+            securities = list(dict.fromkeys(
+                security for name in category_names for security in category_securities[name]
+            ))
+            logger.info(f"Fetching {len(securities)} securities for {category_names} "
+                        f"({request_type}, fields={list(fields)})")
+            try:
+                df = self._fetch_securities(securities, list(fields), request_type, start_date, end_date)
+            except Exception as e:
+                logger.error(f"Error fetching {category_names}: {e}")
+                df = pd.DataFrame()
                 
-            # データベースに格納
-            if not processed_df.empty:
-                unique_columns = self._get_unique_columns(table_name)
-                record_count = self.db_manager.upsert_dataframe(
-                    processed_df, table_name, unique_columns
-                )
-                logger.info(f"Stored {record_count} records for {category_name}")
-                return record_count
-            else:
-                logger.warning(f"No processed data for {category_name}")
-                return 0
+            for name in category_names:
+                if df.empty:
+                    category_df = pd.DataFrame()
+                else:
+                    category_df = df[df['security'].isin(category_securities[name])].reset_index(drop=True)
+                    if isinstance(category_df['security'].dtype, pd.CategoricalDtype):
+                        category_df['security'] = category_df['security'].cat.remove_unused_categories()
+                if category_df.empty:
+                    logger.warning(f"No data retrieved for {name}")
+                results[name] = category_df
                 
-        except Exception as e:
-            logger.error(f"Error processing {category_name}: {e}")
+        return results
+        
+    def _fetch_securities(self, securities: list[str], fields: list[str], request_type: str,
+                          start_date: str, end_date: str) -> pd.DataFrame:
+        """証券リストをリファレンスまたはヒストリカルで取得"""
+        if request_type == 'reference':
+            # 週次データは最新のみ取得
+            return self.bloomberg.get_reference_data(securities, fields)
+        # 日次データはヒストリカル取得
+        return self.bloomberg.batch_request(
+            securities, fields, start_date, end_date,
+            request_type='historical'
+        )
+        
+    @staticmethod
+    def _request_type(ticker_info: dict) -> str:
+        """カテゴリのリクエスト種別（週次はreference、それ以外はhistorical）"""
+        return 'reference' if ticker_info.get('frequency') == 'Weekly' else 'historical'
+        
+    @staticmethod
+    def _category_securities(ticker_info: dict) -> list[str]:
+        """ティッカー設定情報の証券リストを平坦化"""
+        if not isinstance(ticker_info['securities'], dict):
+            return list(ticker_info['securities'])
+            
+        # 複雑な構造（在庫データなど）
+        all_securities = []
+        for sec_list in ticker_info['securities'].values():
+            if isinstance(sec_list, list):
+                all_securities.extend(sec_list)
+            elif isinstance(sec_list, dict):
+                for subsec_list in sec_list.values():
+                    all_securities.extend(subsec_list)
+        return all_securities
+        
+    def transform_category(self, df: pd.DataFrame, ticker_info: dict) -> pd.DataFrame:
+        """
+        取得データを格納先テーブルの形式に加工
+        
+        Args:
+            df: Bloombergからの取得データ
+            ticker_info: ティッカー設定情報
+            
+        Returns:
+            pd.DataFrame: 加工済みデータ
+        """
+        if df.empty:
+            return pd.DataFrame()
+            
+        table_name = ticker_info['table']
+        processed_df = pd.DataFrame()
+        
+        if table_name == 'T_CommodityPrice':
+            processed_df = self.processor.process_commodity_prices(df, ticker_info)
+        elif table_name == 'T_LMEInventory':
+            processed_df = self.processor.process_lme_inventory(df, ticker_info)
+        elif table_name == 'T_OtherExchangeInventory':
+            processed_df = self._process_other_inventory(df, ticker_info)
+        elif table_name == 'T_MarketIndicator':
+            processed_df = self.processor.process_market_indicators(df, ticker_info)
+        elif table_name == 'T_MacroEconomicIndicator':
+            processed_df = self._process_macro_indicators(df, ticker_info)
+        elif table_name == 'T_COTR':
+            processed_df = self.processor.process_cotr_data(df, ticker_info)
+        elif table_name == 'T_BandingReport':
+            processed_df = self.processor.process_banding_report(df, ticker_info)
+        elif table_name == 'T_CompanyStockPrice':
+            processed_df = self.processor.process_company_stocks(df, ticker_info)
+            
+        return processed_df
+        
+    def store_category(self, category_name: str, table_name: str, processed_df: pd.DataFrame) -> int:
+        """
+        加工済みデータをデータベースに格納
+        
+        Args:
+            category_name: カテゴリ名
+            table_name: 格納先テーブル名
+            processed_df: 加工済みデータ
+            
+        Returns:
+            int: 格納されたレコード数
+        """
+        if processed_df.empty:
+            logger.warning(f"No processed data for {category_name}")
             return 0
             
+        unique_columns = self._get_unique_columns(table_name)
+        if self.write_behind:
+            buffered = self._buffered_categories.setdefault(table_name, [])
+            buffered.append(category_name)
+            try:
+                record_count = self.db_manager.buffer_upsert(
+                    processed_df, table_name, unique_columns, backfill=self.backfill
+                )
+            except Exception:
+                # 上限到達による格納が失敗した場合、同じバッファのカテゴリも未格納
+                for buffered_name in buffered:
+                    self.data_counts[buffered_name] = 0
+                del self._buffered_categories[table_name]
+                raise
+            if table_name not in self.db_manager.pending_writes():
+                # 上限到達でバッファ分を格納済み
+                del self._buffered_categories[table_name]
+            logger.info(f"Buffered {record_count} records for {category_name}")
+            return record_count
+            
+        record_count = self.db_manager.upsert_dataframe(
+            processed_df, table_name, unique_columns, backfill=self.backfill
+        )
+        logger.info(f"Stored {record_count} records for {category_name}")
+        return record_count
+            
+    def flush_buffered_writes(self):
+        """
+        書き込みバッファをテーブルごとにまとめて格納
+        
+        格納に失敗したテーブルのカテゴリはレコード数を0とする
+        """
+        buffered_categories, self._buffered_categories = self._buffered_categories, {}
+        results = self.db_manager.flush_writes()
+        for table_name, category_names in buffered_categories.items():
+            if table_name in results:
+                logger.info(f"Stored {results[table_name]} records to {table_name} for {category_names}")
+            else:
+                logger.error(f"Buffered records for {category_names} were not stored to {table_name}")
+                for category_name in category_names:
+                    self.data_counts[category_name] = 0
+                    
     def _process_other_inventory(self, df: pd.DataFrame, ticker_info: dict) -> pd.DataFrame:
         """他取引所在庫データを処理"""
         if df.empty:
             return pd.DataFrame()
             
+        metal_id = self.db_manager.get_or_create_master_id('metals', ticker_info['metal'])
         processed_data = []
         
         for _, row in df.iterrows():
@@ -156,12 +413,15 @@ class BloombergSQLIngestor:
             value = row.get('PX_LAST', 0)
             
             # データタイプの識別
-            type_mapping = ticker_info.get('type_mapping', {})
-            data_type = type_mapping.get(security, 'total_stock')
+            spec = get_ticker_spec(security)
+            if spec and spec.table == 'T_OtherExchangeInventory':
+                data_type = spec.data_type
+            else:
+                data_type = ticker_info.get('type_mapping', {}).get(security, 'total_stock')
             
             processed_row = {
                 'ReportDate': report_date,
-                'MetalID': self.db_manager.get_or_create_master_id('metals', ticker_info['metal']),
+                'MetalID': metal_id,
                 'ExchangeCode': ticker_info['exchange'],
                 'TotalStock': value if data_type == 'total_stock' else None,
                 'OnWarrant': value if data_type == 'on_warrant' else None
@@ -169,13 +429,35 @@ class BloombergSQLIngestor:
             
             processed_data.append(processed_row)
             
-        return pd.DataFrame(processed_data)
+        return compact_frame(pd.DataFrame(processed_data))
         
     def _process_macro_indicators(self, df: pd.DataFrame, ticker_info: dict) -> pd.DataFrame:
         """マクロ経済指標データを処理"""
         if df.empty:
             return pd.DataFrame()
             
+        # 国コード・単位・頻度はティッカーレジストリから取得
+        specs = {}
+        for security in df['security'].unique():
+            spec = get_ticker_spec(security)
+            if spec is None or spec.table != 'T_MacroEconomicIndicator':
+                logger.warning(f"Unknown macro indicator: {security}")
+                continue
+            specs[security] = spec
+            
+        # インジケーターIDの取得（証券ごとに1回、未登録分は一括作成）
+        indicator_ids = self.db_manager.resolve_master_ids(
+            'indicators', [spec.code for spec in specs.values()],
+            names={spec.code: security for security, spec in specs.items()},
+            extra={
+                spec.code: {
+                    'Category': ticker_info.get('category', 'Macro Economic'),
+                    'Unit': spec.unit,
+                    'Freq': spec.frequency
+                } for spec in specs.values()
+            }
+        )
+        
         processed_data = []
         
         for _, row in df.iterrows():
@@ -183,47 +465,27 @@ class BloombergSQLIngestor:
             report_date = pd.to_datetime(row['date']).date()
             value = row.get('PX_LAST')
             
-            # 国コードの識別
-            country_code = None
-            for country, securities in ticker_info['securities'].items():
-                if security in securities:
-                    country_code = country
-                    break
-                    
-            # インジケーターコードの生成
-            indicator_code = security.split()[0]
-            
-            # インジケーターIDの取得
-            indicator_id = self.db_manager.get_or_create_master_id(
-                'indicators',
-                indicator_code,
-                name=security,
-                additional_fields={
-                    'Category': ticker_info.get('category', 'Macro Economic'),
-                    'Unit': '%' if 'PMI' in security else 'YoY %',
-                    'Freq': self._determine_frequency(security)
-                }
-            )
+            spec = specs.get(security)
+            if spec is None:
+                continue
             
             processed_row = {
                 'ReportDate': report_date,
-                'IndicatorID': indicator_id,
-                'CountryCode': country_code,
+                'IndicatorID': indicator_ids[spec.code],
+                'CountryCode': spec.country,
                 'Value': value
             }
             
             processed_data.append(processed_row)
             
-        return pd.DataFrame(processed_data)
+        return compact_frame(pd.DataFrame(processed_data))
         
-    def _determine_frequency(self, security: str) -> str:
-        """証券名から更新頻度を推定"""
-        if 'PMI' in security:
-            return 'Monthly'
-        elif 'GDP' in security:
-            return 'Yearly'
-        else:
-            return 'Monthly'
+    def refresh_enriched_prices(self):
+        """満期・営業日情報のマテリアライズテーブルを差分リフレッシュ（失敗しても更新処理は継続）"""
+        try:
+            self.db_manager.refresh_enriched_prices()
+        except Exception as e:
+            logger.error(f"Failed to refresh T_CommodityPriceEnriched: {e}")
             
     def _get_unique_columns(self, table_name: str) -> list[str]:
         """テーブルのユニークキーカラムを取得"""
@@ -245,17 +507,35 @@ class BloombergSQLIngestor:
         """初回データロードを実行"""
         logger.info("Starting initial historical data load...")
         
-        for category_name, ticker_info in BLOOMBERG_TICKERS.items():
-            # カテゴリに応じた期間を取得
-            category_type = self._get_category_type(category_name)
-            start_date, end_date = get_date_range('initial', category_type)
-            
-            record_count = self.process_category(
-                category_name, ticker_info, start_date, end_date
-            )
+        checkpoint = self._load_checkpoint()
+        incomplete = []
+        
+        self.backfill = True
+        try:
+            for category_name, ticker_info in BLOOMBERG_TICKERS.items():
+                # カテゴリに応じた期間を取得
+                category_type = CATEGORY_TYPES.get(category_name, 'indicators')
+                start_date, end_date = get_date_range('initial', category_type)
+                
+                # 期間をチャンクに分割して逐次格納（メモリ使用量を期間の長さに依存させない）
+                record_count = self.process_category_streaming(
+                    category_name, ticker_info, start_date, end_date, checkpoint
+                )
+                
+                self.data_counts[category_name] = record_count
+                if checkpoint[category_name]['completed_until'] != end_date:
+                    incomplete.append(category_name)
+        finally:
+            self.backfill = False
             
-            self.data_counts[category_name] = record_count
+        # 全カテゴリが終了日まで完了した場合のみチェックポイントを削除
+        if incomplete:
+            logger.warning(f"Initial load incomplete for {incomplete}. "
+                           f"Rerun to resume from checkpoint: {INITIAL_LOAD_CHECKPOINT_FILE}")
+        elif os.path.exists(INITIAL_LOAD_CHECKPOINT_FILE):
+            os.remove(INITIAL_LOAD_CHECKPOINT_FILE)
             
+        self.refresh_enriched_prices()
         logger.info("Initial load completed")
         
     @measure_execution_time
@@ -273,9 +553,10 @@ class BloombergSQLIngestor:
             'COMPANY_STOCKS'
         ]
         
+        categories = {}
         for category_name in daily_categories:
             if category_name in BLOOMBERG_TICKERS:
-                ticker_info = BLOOMBERG_TICKERS[category_name].copy()  # Deep copyを作成
+                ticker_info = copy.deepcopy(BLOOMBERG_TICKERS[category_name])  # Deep copyを作成
                 
                 # MEST地域を除外（LME在庫の場合）
                 if category_name == 'LME_INVENTORY':
@@ -287,17 +568,39 @@ class BloombergSQLIngestor:
                     # region_mappingからもMESTを削除
                     if '%MEST Index' in ticker_info.get('region_mapping', {}):
                         del ticker_info['region_mapping']['%MEST Index']
+                        
+                categories[category_name] = ticker_info
                 
-                # 過去3日分のデータを取得（週末対応）
-                end_date = datetime.now().strftime('%Y%m%d')
-                start_date = (datetime.now() - timedelta(days=3)).strftime('%Y%m%d')
-                
-                record_count = self.process_category(
-                    category_name, ticker_info, start_date, end_date
-                )
-                
-                self.data_counts[category_name] = record_count
+        # 書き込みはテーブルごとにバッファし、最後にまとめて格納する
+        self.write_behind = True
+        try:
+            self._run_daily_categories(categories)
+        finally:
+            self.write_behind = False
+            self.flush_buffered_writes()
+            
+        self.refresh_enriched_prices()
+        logger.info("Daily update completed")
+        
+    def _run_daily_categories(self, categories: dict[str, dict]):
+        """日次・週次・月次カテゴリを取得・加工し、格納（write_behind中はバッファに追加）"""
+        # 過去3日分のデータを取得（週末対応）
+        end_date = datetime.now().strftime('%Y%m%d')
+        start_date = (datetime.now() - timedelta(days=3)).strftime('%Y%m%d')
+        
+        # 同じフィールド・期間のカテゴリはまとめて取得し、カテゴリ別に加工・格納
+        fetched = self.fetch_categories(categories, start_date, end_date)
+        for category_name, ticker_info in categories.items():
+            logger.info(f"Processing {category_name}...")
+            try:
+                processed_df = self.transform_category(fetched.pop(category_name), ticker_info)
+                record_count = self.store_category(category_name, ticker_info['table'], processed_df)
+            except Exception as e:
+                logger.error(f"Error processing {category_name}: {e}")
+                record_count = 0
                 
+            self.data_counts[category_name] = record_count
+            
         # 週次データ（COTR）の処理
         if datetime.now().weekday() == 4:  # 金曜日
             logger.info("Processing weekly COTR data...")
@@ -314,11 +617,9 @@ class BloombergSQLIngestor:
                 if not df.empty:
                     processed_df = self.processor.process_cotr_data(df, ticker_info)
                     if not processed_df.empty:
-                        record_count = self.db_manager.upsert_dataframe(
-                            processed_df, ticker_info['table'], 
-                            self._get_unique_columns(ticker_info['table'])
+                        self.data_counts['COTR_DATA'] = self.store_category(
+                            'COTR_DATA', ticker_info['table'], processed_df
                         )
-                        self.data_counts['COTR_DATA'] = record_count
                         
         # 月次データ（マクロ指標）の処理
         if datetime.now().day <= 7:  # 月初の1週間
@@ -335,25 +636,7 @@ class BloombergSQLIngestor:
                 
                 self.data_counts['MACRO_INDICATORS'] = record_count
                 
-        logger.info("Daily update completed")
-        
-    def _get_category_type(self, category_name: str) -> str:
-        """カテゴリ名からタイプを判定"""
-        if 'PRICE' in category_name:
-            return 'prices'
-        elif 'INVENTORY' in category_name:
-            return 'inventory'
-        elif 'MACRO' in category_name:
-            return 'macro'
-        elif 'COTR' in category_name:
-            return 'cotr'
-        elif 'BANDING' in category_name:
-            return 'banding'
-        elif 'STOCK' in category_name:
-            return 'stocks'
-        else:
-            return 'indicators'
-            
+
     def run(self, mode: str = 'daily'):
         """
         メイン実行メソッド
@@ -390,16 +673,40 @@ def main():
     )
     parser.add_argument(
         '--mode',
-        choices=['initial', 'daily'],
+        choices=['initial', 'daily', 'daemon'],
         default='daily',
-        help='Execution mode: initial (historical load) or daily (update)'
+        help='Execution mode: initial (historical load), daily (update) or daemon (resident process)'
+    )
+    parser.add_argument(
+        '--enqueue',
+        choices=['daily', 'rollover', 'backfill', 'refetch'],
+        help='Submit a job to the running daemon instead of executing directly'
     )
+    parser.add_argument('--categories', nargs='+', help='Target categories for enqueued job')
+    parser.add_argument('--start-date', help='Start date for backfill job (YYYYMMDD)')
+    parser.add_argument('--end-date', help='End date for backfill job (YYYYMMDD)')
+    parser.add_argument('--days', type=int, help='Lookback days for refetch job')
     
     args = parser.parse_args()
     
     try:
+        if args.enqueue:
+            # デーモンへのジョブ投入（Bloomberg/DBへは接続しない）
+            from ingestion_daemon import submit_job
+            job_path = submit_job(
+                args.enqueue, categories=args.categories,
+                start_date=args.start_date, end_date=args.end_date, days=args.days
+            )
+            logger.info(f"Job submitted: {job_path}")
+            sys.exit(0)
+        
         ingestor = BloombergSQLIngestor()
-        ingestor.run(mode=args.mode)
+        
+        if args.mode == 'daemon':
+            from ingestion_daemon import IngestionDaemon
+            IngestionDaemon(ingestor).start()
+        else:
+            ingestor.run(mode=args.mode)
         logger.info("Process completed successfully")
         sys.exit(0)
         
@@ -409,5 +716,4 @@ def main():
         
 
 if __name__ == "__main__":
-    import pandas as pd  # ここでインポート（グローバルスコープで必要）
     main()
\ No newline at end of file
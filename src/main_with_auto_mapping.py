@@ -44,8 +44,10 @@ class BloombergSQLIngestorWithMapping:
             # マスターデータのロード
             self.db_manager.load_master_data()
             
-            # Enhanced Data Processorの初期化（自動マッピング機能付き）
-            self.processor = EnhancedDataProcessorV2(self.db_manager)
+            # Enhanced Data Processorの初期化（自動マッピング機能付き。初期ロードは不足マッピングをその場で生成）
+            self.processor = EnhancedDataProcessorV2(
+                self.db_manager, inline_mapping=True if mode == 'initial' else None
+            )
             
             # 実行モードに応じて処理
             if mode == 'initial':
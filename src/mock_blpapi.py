@@ -16,7 +16,24 @@ class DataType:
 
 
 class Event:
+    PARTIAL_RESPONSE = "PARTIAL_RESPONSE"
     RESPONSE = "RESPONSE"
+    REQUEST_STATUS = "REQUEST_STATUS"
+    TIMEOUT = "TIMEOUT"
+
+
+class CorrelationId:
+    def __init__(self, value: Any = None):
+        self._value = value
+        
+    def value(self):
+        return self._value
+        
+    def __eq__(self, other):
+        return isinstance(other, CorrelationId) and self._value == other._value
+        
+    def __hash__(self):
+        return hash(self._value)
 
 
 class Element:
@@ -60,11 +77,6 @@ class MockFieldData:
     def hasElement(self, name: str):
         return name == "date" or name in self.data
         
-    def getElement(self, name: str):
-        if name == "date":
-            return Element("date", self.date_val, DataType.DATE)
-        return Element(name, self.data.get(name), DataType.FLOAT64)
-        
     def getElementAsDatetime(self, name: str):
         return self.date_val
         
@@ -72,6 +84,12 @@ class MockFieldData:
         return len(self.data) + 1  # +1 for date
         
     def getElement(self, index):
+        # 名前または位置で取得（blpapiのElement.getElementと同じ）
+        if isinstance(index, str):
+            if index == "date":
+                return Element("date", self.date_val, DataType.DATE)
+            return Element(index, self.data.get(index), DataType.FLOAT64)
+            
         if index == 0:
             return Element("date", self.date_val, DataType.DATE)
         
@@ -113,14 +131,40 @@ class MockFieldDataArray:
         return self.field_data_list[index]
 
 
+class MockReferenceFieldData:
+    def __init__(self, data: dict):
+        self.data = data
+        
+    def numElements(self):
+        return len(self.data)
+        
+    def getElement(self, index):
+        key = index if isinstance(index, str) else list(self.data.keys())[index]
+        value = self.data.get(key)
+        datatype = DataType.DATE if isinstance(value, date) else DataType.FLOAT64
+        return Element(key, value, datatype)
+
+
+class MockReferenceSecurityData(MockSecurityData):
+    def getElement(self, name: str):
+        if name == "fieldData":
+            return MockReferenceFieldData(self.field_data_list)
+        return None
+
+
 class MockMessage:
-    def __init__(self, message_type: str, security_data: MockSecurityData):
+    def __init__(self, message_type: str, security_data: MockSecurityData,
+                 correlation_id: Optional[CorrelationId] = None):
         self._message_type = message_type
         self.security_data = security_data
+        self.correlation_id = correlation_id
         
     def messageType(self):
         return self._message_type
         
+    def correlationIds(self):
+        return [self.correlation_id] if self.correlation_id is not None else []
+        
     def hasElement(self, name: str):
         return name == "securityData"
         
@@ -143,7 +187,8 @@ class MockEvent:
 
 
 class MockRequest:
-    def __init__(self):
+    def __init__(self, request_type: str = "HistoricalDataRequest"):
+        self.request_type = request_type
         self.elements = {}
         self.arrays = {}
         
@@ -166,12 +211,14 @@ class MockElementArray:
 
 class MockService:
     def createRequest(self, request_type: str):
-        return MockRequest()
+        return MockRequest(request_type)
 
 
 class MockSession:
     def __init__(self):
         self.service = MockService()
+        self.pending = []  # 送信済みリクエストの未送出メッセージ [(CorrelationId, [MockMessage])]
+        self.correlation_counter = 0
         
     def start(self):
         return True
@@ -182,10 +229,45 @@ class MockSession:
     def getService(self, service_name: str):
         return self.service
         
-    def sendRequest(self, request: MockRequest):
-        pass
+    def sendRequest(self, request: MockRequest, correlationId: Optional[CorrelationId] = None):
+        if correlationId is None:
+            self.correlation_counter += 1
+            correlationId = CorrelationId(f"mock-{self.correlation_counter}")
+        if request.request_type == "HistoricalDataRequest":
+            messages = self._build_messages(request, correlationId)
+        else:
+            messages = [self._build_reference_message(request, correlationId)]
+        self.pending.append((correlationId, messages))
+        return correlationId
+        
+    def cancel(self, correlationId: CorrelationId):
+        self.pending = [(cid, messages) for cid, messages in self.pending if cid != correlationId]
         
     def nextEvent(self, timeout: int):
+        # 証券ごとに1メッセージずつPARTIAL_RESPONSEで返し、リクエストの最後のメッセージはRESPONSE
+        if not self.pending:
+            return MockEvent(Event.TIMEOUT, [])
+        correlation_id, messages = self.pending[0]
+        if len(messages) <= 1:
+            self.pending.pop(0)
+            return MockEvent(Event.RESPONSE, messages)
+        return MockEvent(Event.PARTIAL_RESPONSE, [messages.pop(0)])
+        
+    def _build_reference_message(self, request: MockRequest, correlation_id: CorrelationId) -> MockMessage:
+        # 全証券を1メッセージで返す（_DTで終わるフィールドは日付）
+        securities = request.arrays.get("securities", MockElementArray()).values
+        fields = request.arrays.get("fields", MockElementArray()).values
+        security_data = [
+            MockReferenceSecurityData(security, {
+                field: date.today() + timedelta(days=random.randint(1, 90)) if field.endswith('_DT')
+                else round(random.uniform(100, 1000), 2)
+                for field in fields
+            })
+            for security in securities
+        ]
+        return MockMessage("ReferenceDataResponse", MockFieldDataArray(security_data), correlation_id)
+        
+    def _build_messages(self, request: MockRequest, correlation_id: CorrelationId) -> list:
         # Generate mock data
         securities = request.arrays.get("securities", MockElementArray()).values
         fields = request.arrays.get("fields", MockElementArray()).values
@@ -236,10 +318,10 @@ class MockSession:
                 field_data_list.append(MockFieldData(date_val, data))
                 
             security_data = MockSecurityData(security, field_data_list)
-            message = MockMessage("HistoricalDataResponse", security_data)
+            message = MockMessage("HistoricalDataResponse", security_data, correlation_id)
             messages.append(message)
             
-        return MockEvent(Event.RESPONSE, messages)
+        return messages
         
     def stop(self):
         pass
@@ -266,8 +348,11 @@ class Session:
     def getService(self, service_name: str):
         return self.mock_session.getService(service_name)
         
-    def sendRequest(self, request):
-        return self.mock_session.sendRequest(request)
+    def sendRequest(self, request, correlationId: Optional[CorrelationId] = None):
+        return self.mock_session.sendRequest(request, correlationId)
+        
+    def cancel(self, correlationId: CorrelationId):
+        return self.mock_session.cancel(correlationId)
         
     def nextEvent(self, timeout: int):
         return self.mock_session.nextEvent(timeout)
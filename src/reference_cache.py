@@ -0,0 +1,288 @@
+"""
+静的リファレンスデータのキャッシュ
+契約サイズ・ティックサイズ・最終取引日等、契約期間中ほぼ変わらないフィールドを
+(証券, フィールド)単位でSQLiteに保持し、フィールド別の有効期間内はBloombergに再リクエストしない。
+ジェネリック先物（LP1・HG3等）はロールで指す契約が変わるため、キャッシュせず常に取得する。
+ファイルに永続化するため、実行・プロセス・スクリプトをまたいで共有される
+"""
+import os
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# プロジェクトルートとsrcディレクトリをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(project_root, 'src')
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from config.bloomberg_config import (
+    REFERENCE_CACHE_FILE, REFERENCE_CACHE_TTL_DAYS, REFERENCE_CACHE_EXPIRING_DATE_FIELDS
+)
+from config.logging_config import logger
+from ticker_registry import get_ticker_spec
+
+# 並列バックフィルの複数プロセスから同時に書き込まれるため、ロック解除を待つ秒数
+SQLITE_TIMEOUT_SECONDS = 30
+
+CacheKey = Tuple[str, str]
+
+
+def _encode(value: Any) -> Tuple[str, Optional[str]]:
+    """値を(型, 文字列)に変換"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return 'null', None
+    if isinstance(value, datetime):
+        return 'date', value.date().isoformat()
+    if isinstance(value, date):
+        return 'date', value.isoformat()
+    if isinstance(value, pd.Timestamp):
+        return 'date', value.date().isoformat()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return 'float', repr(float(value))
+    return 'str', str(value)
+
+
+def _decode(value_type: str, value: Optional[str]) -> Any:
+    """(型, 文字列)を値に戻す"""
+    if value_type == 'null' or value is None:
+        return None
+    if value_type == 'date':
+        return date.fromisoformat(value)
+    if value_type == 'float':
+        return float(value)
+    return value
+
+
+class ReferenceDataCache:
+    """(証券, フィールド)単位のTTL付きリファレンスデータキャッシュ"""
+
+    def __init__(self, path: str = REFERENCE_CACHE_FILE,
+                 ttl_days: Optional[Dict[str, int]] = None,
+                 expiring_date_fields: Optional[List[str]] = None):
+        """
+        Args:
+            path: SQLiteファイルのパス
+            ttl_days: フィールド -> 有効期間（日）。ここにないフィールドはキャッシュしない
+            expiring_date_fields: 値の日付を過ぎたら期限切れとするフィールド
+        """
+        self.path = path
+        self.ttl_days = REFERENCE_CACHE_TTL_DAYS if ttl_days is None else ttl_days
+        self.expiring_date_fields = set(
+            REFERENCE_CACHE_EXPIRING_DATE_FIELDS if expiring_date_fields is None else expiring_date_fields
+        )
+        self._initialized = False
+
+    def is_cacheable(self, field: str) -> bool:
+        """キャッシュ対象のフィールドか"""
+        return field in self.ttl_days
+
+    @staticmethod
+    def is_cacheable_security(security: str) -> bool:
+        """キャッシュ対象の証券か（ジェネリック先物は対象外）"""
+        spec = get_ticker_spec(security)
+        return spec is None or spec.data_type != 'Generic'
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT_SECONDS)
+        if not self._initialized:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS reference_cache (
+                    security TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    value_type TEXT NOT NULL,
+                    value TEXT,
+                    fetched_at TEXT NOT NULL,
+                    expires_at TEXT NOT NULL,
+                    PRIMARY KEY (security, field)
+                )
+            """)
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def _open(self):
+        """コミット・クローズ付きの接続（withブロックで使用）"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        return _ClosingConnection(self._connect())
+
+    def get(self, securities: List[str], fields: List[str]) -> Dict[CacheKey, Any]:
+        """
+        有効期間内のキャッシュ値を取得
+
+        Args:
+            securities: 証券リスト
+            fields: フィールドリスト（キャッシュ対象外は無視）
+
+        Returns:
+            Dict[CacheKey, Any]: (証券, フィールド) -> 値（ヒットしたもののみ。値がNULLの場合はNone）
+        """
+        fields = [field for field in fields if self.is_cacheable(field)]
+        securities = [security for security in securities if self.is_cacheable_security(security)]
+        if not securities or not fields:
+            return {}
+
+        try:
+            with self._open() as conn:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (security TEXT, field TEXT)")
+                conn.execute("DELETE FROM wanted")
+                conn.executemany(
+                    "INSERT INTO wanted VALUES (?, ?)",
+                    [(security, field) for security in dict.fromkeys(securities) for field in fields]
+                )
+                rows = conn.execute("""
+                    SELECT c.security, c.field, c.value_type, c.value
+                    FROM reference_cache c
+                    JOIN wanted w ON w.security = c.security AND w.field = c.field
+                    WHERE c.expires_at > ?
+                """, (datetime.now().isoformat(),)).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read reference cache, fetching from Bloomberg: {e}")
+            return {}
+
+        return {(security, field): _decode(value_type, value) for security, field, value_type, value in rows}
+
+    def put(self, values: Dict[CacheKey, Any]):
+        """
+        値をキャッシュに保存（キャッシュ対象外のフィールドは無視）
+
+        Args:
+            values: (証券, フィールド) -> 値（ジェネリック先物の値は保存しない）
+        """
+        now = datetime.now()
+        rows = []
+        for (security, field), value in values.items():
+            if not self.is_cacheable(field) or not self.is_cacheable_security(security):
+                continue
+            value_type, encoded = _encode(value)
+            expires_at = now + timedelta(days=self.ttl_days[field])
+            if value_type == 'date' and field in self.expiring_date_fields:
+                # 最終取引日等を過ぎるとジェネリックはロールし、値が変わる
+                expires_at = min(expires_at, datetime.combine(date.fromisoformat(encoded), datetime.min.time()))
+            rows.append((security, field, value_type, encoded, now.isoformat(), expires_at.isoformat()))
+
+        if not rows:
+            return
+
+        try:
+            with self._open() as conn:
+                conn.executemany("""
+                    INSERT OR REPLACE INTO reference_cache
+                        (security, field, value_type, value, fetched_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to write reference cache: {e}")
+
+    def invalidate(self, securities: Optional[List[str]] = None):
+        """
+        キャッシュを削除
+
+        Args:
+            securities: 削除する証券（Noneの場合は全件）
+        """
+        with self._open() as conn:
+            if securities is None:
+                conn.execute("DELETE FROM reference_cache")
+            else:
+                conn.executemany("DELETE FROM reference_cache WHERE security = ?",
+                                 [(security,) for security in securities])
+
+    def fetch(self, securities: List[str], fields: List[str],
+              fetcher: Callable[[List[str], List[str]], pd.DataFrame],
+              refresh: bool = False) -> pd.DataFrame:
+        """
+        キャッシュにない(証券, フィールド)のみfetcherで取得し、キャッシュと合わせて返す
+
+        キャッシュ対象外のフィールドを含む場合、そのフィールドは全証券についてfetcherで取得する
+
+        Args:
+            securities: 証券リスト
+            fields: フィールドリスト
+            fetcher: (証券リスト, フィールドリスト) -> DataFrame（get_reference_dataと同じ形式）
+            refresh: キャッシュを読まずに全て再取得する（取得結果はキャッシュに保存）
+
+        Returns:
+            pd.DataFrame: 'security'列と各フィールド列（get_reference_dataと同じ形式）
+        """
+        securities = list(dict.fromkeys(securities))
+        cached = {} if refresh else self.get(securities, fields)
+
+        # 取得が必要な証券ごとのフィールドを、同じフィールドの組み合わせでまとめてリクエストする
+        missing: Dict[Tuple[str, ...], List[str]] = {}
+        for security in securities:
+            needed = tuple(field for field in fields if (security, field) not in cached)
+            if needed:
+                missing.setdefault(needed, []).append(security)
+
+        fetched_frames = []
+        for needed, group in missing.items():
+            df = fetcher(group, list(needed))
+            if df.empty:
+                continue
+            fetched_frames.append(df)
+            # 返ってきた証券のみ保存（リクエスト失敗をNULLとしてキャッシュしない）
+            self.put({
+                (security, field): value
+                for record in df.reindex(columns=['security'] + list(needed)).to_dict('records')
+                for security, field, value in ((str(record['security']), f, record[f]) for f in needed)
+            })
+
+        hits = len(cached)
+        total = len(securities) * len(fields)
+        logger.info(f"Reference cache: {hits}/{total} values cached, "
+                    f"{sum(len(group) for group in missing.values())} securities fetched")
+
+        records: Dict[str, Dict[str, Any]] = {}
+        for (security, field), value in cached.items():
+            records.setdefault(security, {'security': security})[field] = value
+        for df in fetched_frames:
+            for record in df.to_dict('records'):
+                security = str(record['security'])
+                row = records.setdefault(security, {'security': security})
+                row.update({key: value for key, value in record.items() if key in fields})
+
+        if not records:
+            return pd.DataFrame()
+        ordered = [records[security] for security in securities if security in records]
+        return pd.DataFrame(ordered).reindex(columns=['security'] + list(fields))
+
+
+class _ClosingConnection:
+    """成功時にコミットし、必ずクローズするsqlite3接続のラッパー"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self.conn.close()
+        return False
+
+
+_reference_cache: Optional[ReferenceDataCache] = None
+
+
+def get_reference_cache() -> ReferenceDataCache:
+    """
+    プロセス共通のリファレンスデータキャッシュを取得
+
+    Returns:
+        ReferenceDataCache: キャッシュ
+    """
+    global _reference_cache
+    if _reference_cache is None:
+        _reference_cache = ReferenceDataCache()
+    return _reference_cache
@@ -0,0 +1,110 @@
+"""
+Bloombergリクエストの分割計画
+証券数と推定レスポンスサイズ（証券数 × フィールド数 × 営業日数）がBloombergの上限内に収まるよう、
+リクエストを証券グループ × 期間のシャードに分割する
+"""
+import math
+import os
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+# プロジェクトルートとsrcディレクトリをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(project_root, 'src')
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from utils import chunk_list, split_date_range
+from config.bloomberg_config import MAX_SECURITIES_PER_REQUEST, MAX_DATA_POINTS_PER_REQUEST
+
+# 暦日数から営業日数を見積もる係数（週5日）
+BUSINESS_DAY_RATIO = 5 / 7
+
+
+@dataclass
+class RequestShard:
+    """1回のBloombergリクエストで取得する単位"""
+    securities: List[str]
+    fields: List[str]
+    start_date: Optional[str] = None  # YYYYMMDD（リファレンスデータはNone）
+    end_date: Optional[str] = None
+
+    @property
+    def estimated_points(self) -> int:
+        """推定データ点数"""
+        return len(self.securities) * len(self.fields) * _estimate_business_days(self.start_date, self.end_date)
+
+
+def _estimate_business_days(start_date: Optional[str], end_date: Optional[str]) -> int:
+    """期間の推定営業日数（期間なしは1）"""
+    if not start_date or not end_date:
+        return 1
+    days = (datetime.strptime(end_date, '%Y%m%d') - datetime.strptime(start_date, '%Y%m%d')).days + 1
+    return max(1, math.ceil(days * BUSINESS_DAY_RATIO))
+
+
+def _securities_per_shard(securities: List[str], fields: List[str], max_securities: int, max_points: int) -> int:
+    """1日分でも点数上限を超えない証券数"""
+    return max(1, min(max_securities, len(securities), max_points // max(1, len(fields))))
+
+
+def plan_historical_requests(securities: List[str], fields: List[str], start_date: str, end_date: str,
+                             max_securities: int = MAX_SECURITIES_PER_REQUEST,
+                             max_points: int = MAX_DATA_POINTS_PER_REQUEST) -> List[RequestShard]:
+    """
+    ヒストリカルリクエストの分割計画
+
+    証券を上限数ごとのグループに分け、グループの推定データ点数が上限を超える場合は期間も分割する
+
+    Args:
+        securities: 証券リスト
+        fields: フィールドリスト
+        start_date: 開始日（YYYYMMDD）
+        end_date: 終了日（YYYYMMDD）
+        max_securities: 1リクエストあたりの証券数上限
+        max_points: 1リクエストあたりの推定データ点数上限
+
+    Returns:
+        List[RequestShard]: シャードのリスト（証券グループ順、期間順）
+    """
+    if not securities or not fields:
+        return []
+
+    group_size = _securities_per_shard(securities, fields, max_securities, max_points)
+    shards = []
+    for group in chunk_list(list(securities), group_size):
+        shard = RequestShard(group, list(fields), start_date, end_date)
+        if shard.estimated_points <= max_points:
+            shards.append(shard)
+            continue
+        # 営業日数の上限から暦日数に換算して期間を分割
+        max_business_days = max(1, max_points // (len(group) * len(fields)))
+        chunk_days = max(1, math.floor(max_business_days / BUSINESS_DAY_RATIO))
+        for chunk_start, chunk_end in split_date_range(start_date, end_date, chunk_days):
+            shards.append(RequestShard(group, list(fields), chunk_start, chunk_end))
+    return shards
+
+
+def plan_reference_requests(securities: List[str], fields: List[str],
+                            max_securities: int = MAX_SECURITIES_PER_REQUEST,
+                            max_points: int = MAX_DATA_POINTS_PER_REQUEST) -> List[RequestShard]:
+    """
+    リファレンスリクエストの分割計画（証券数のみで分割）
+
+    Args:
+        securities: 証券リスト
+        fields: フィールドリスト
+        max_securities: 1リクエストあたりの証券数上限
+        max_points: 1リクエストあたりのデータ点数上限
+
+    Returns:
+        List[RequestShard]: シャードのリスト
+    """
+    if not securities or not fields:
+        return []
+
+    group_size = _securities_per_shard(securities, fields, max_securities, max_points)
+    return [RequestShard(group, list(fields)) for group in chunk_list(list(securities), group_size)]
@@ -0,0 +1,291 @@
+"""
+ティッカーレジストリ
+BLOOMBERG_TICKERSから証券ごとの属性（カテゴリ・テーブル・データタイプ・取引所・メタル・
+地域・単位・頻度・テナー等）をインポート時に1回だけ導出し、各プロセッサからO(1)で参照する
+"""
+import os
+import re
+import sys
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional
+
+# プロジェクトルートとsrcディレクトリをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(project_root, 'src')
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from config.bloomberg_config import BLOOMBERG_TICKERS
+
+
+class TickerSpec(NamedTuple):
+    """証券1件分の属性"""
+    security: str
+    category: Optional[str]     # BLOOMBERG_TICKERSのカテゴリ名
+    table: Optional[str]        # 格納先テーブル
+    data_type: Optional[str]    # 価格: Cash/TomNext/Generic等、在庫: TotalStock等、COTR: 出力列、バンディング: レポートタイプ
+    exchange: Optional[str]     # 取引所コード
+    metal: Optional[str]        # メタルコード（取引所別: COPPER/CU_SHFE/CU_CMX）
+    region: Optional[str]       # LME在庫の地域コード
+    unit: Optional[str]         # 指標の単位
+    frequency: Optional[str]    # 更新頻度
+    tenor: Optional[str]        # テナー名
+    band: Optional[str]         # バンディングのバンドコード
+    group: Optional[str]        # COTRカテゴリ名
+    country: Optional[str]      # マクロ指標の国コード
+    code: str                   # 指標コード（'SOFRRATE Index' -> 'SOFRRATE'）
+
+
+# カテゴリ名 -> 初回ロード期間のタイプ（INITIAL_LOAD_PERIODSのキー）
+def _category_type(category_name: str) -> str:
+    """カテゴリ名からタイプを判定"""
+    if 'PRICE' in category_name:
+        return 'prices'
+    elif 'INVENTORY' in category_name:
+        return 'inventory'
+    elif 'MACRO' in category_name:
+        return 'macro'
+    elif 'COTR' in category_name:
+        return 'cotr'
+    elif 'BANDING' in category_name:
+        return 'banding'
+    elif 'STOCK' in category_name:
+        return 'stocks'
+    else:
+        return 'indicators'
+
+
+CATEGORY_TYPES: Dict[str, str] = {name: _category_type(name) for name in BLOOMBERG_TICKERS}
+
+# LME在庫ティッカーのプレフィックス -> T_LMEInventoryの列名
+LME_INVENTORY_DATA_TYPES = {
+    'NLSCA': 'TotalStock',
+    'NLECA': 'OnWarrant',
+    'NLFCA': 'CancelledWarrant',
+    'NLJCA': 'Inflow',
+    'NLKCA': 'Outflow'
+}
+
+# 先物ティッカーのプレフィックス -> 取引所
+FUTURES_EXCHANGES = {'LP': 'LME', 'CU': 'SHFE', 'HG': 'COMEX'}
+
+# ジェネリック（LP1 Comdty等）・実契約（LPN25・HGN5 Comdty等。限月コードはF-Z）のティッカー全体に一致するパターン
+GENERIC_CONTRACT_PATTERN = re.compile(r'^(?:LP|CU|HG)\d{1,2}(?: Comdty)?$')
+ACTUAL_CONTRACT_PATTERN = re.compile(r'^(?:LP[FGHJKMNQUVXZ]\d{2}|(?:HG|CU)[FGHJKMNQUVXZ]\d{1,2})(?: Comdty)?$')
+
+# 設定にない証券の導出属性のキャッシュ件数（常駐プロセスで実契約ティッカーが増え続けても上限を超えない）
+DERIVED_SPEC_CACHE_SIZE = 4096
+
+
+def _price_metal_code(security: str, default: str = 'COPPER') -> str:
+    """取引所別のメタルコードを決定"""
+    if security.startswith('CU') and not security.startswith('CU_'):
+        return 'CU_SHFE'
+    elif security.startswith('HG'):
+        return 'CU_CMX'
+    return default
+
+
+def _price_data_type(security: str) -> Optional[str]:
+    """価格ティッカーのデータタイプを判定（Cash/TomNext/3MFutures/Spread/Generic/Actual）"""
+    if 'Index' in security and any(cash_code in security for cash_code in ['LMCADY', 'LMCADS']):
+        return 'Cash'
+    elif 'TT00' in security or 'TN00' in security:
+        return 'TomNext'
+    elif 'LMCADS03' in security:
+        return '3MFutures'
+    elif 'LMCADS 0003' in security:
+        return 'Spread'
+    elif ACTUAL_CONTRACT_PATTERN.match(security):
+        return 'Actual'
+    elif GENERIC_CONTRACT_PATTERN.match(security):
+        return 'Generic'
+    return None
+
+
+def indicator_unit(security: str) -> str:
+    """証券名から単位を推定"""
+    if 'Index' in security:
+        return 'Index Points'
+    elif 'Curncy' in security:
+        return 'Currency'
+    elif '%' in security or 'RATE' in security:
+        return '%'
+    elif 'Comdty' in security:
+        return 'USD'
+    else:
+        return 'Units'
+
+
+def _macro_frequency(security: str) -> str:
+    """証券名から更新頻度を推定"""
+    if 'PMI' in security:
+        return 'Monthly'
+    elif 'GDP' in security:
+        return 'Yearly'
+    else:
+        return 'Monthly'
+
+
+def _tenor_name(month_num: int) -> str:
+    """限月番号からテナー名を作成（1 -> Generic 1st Future）"""
+    suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(month_num, 'th')
+    return f'Generic {month_num}{suffix} Future'
+
+
+def classify_price_ticker(security: str, category: Optional[str] = None,
+                          metal: str = 'COPPER') -> TickerSpec:
+    """
+    価格ティッカーの属性を導出（設定にない実契約ティッカー等にも使用）
+
+    Args:
+        security: 証券コード
+        category: カテゴリ名
+        metal: 既定のメタルコード
+
+    Returns:
+        TickerSpec: 証券属性
+    """
+    data_type = _price_data_type(security)
+    exchange = None
+    if data_type in ('Generic', 'Actual'):
+        exchange = next((ex for prefix, ex in FUTURES_EXCHANGES.items() if security.startswith(prefix)), None)
+
+    return TickerSpec(
+        security=security, category=category, table='T_CommodityPrice', data_type=data_type,
+        exchange=exchange, metal=_price_metal_code(security, metal), region=None, unit=None,
+        frequency='Daily', tenor=None, band=None, group=None, country=None,
+        code=security.split()[0]
+    )
+
+
+def _spec(security: str, category: str, config: Dict, **attributes) -> TickerSpec:
+    """カテゴリ既定値で証券属性を作成"""
+    values = {
+        'security': security, 'category': category, 'table': config.get('table'),
+        'data_type': None, 'exchange': config.get('exchange'), 'metal': config.get('metal'),
+        'region': None, 'unit': None, 'frequency': 'Daily', 'tenor': None, 'band': None,
+        'group': None, 'country': None, 'code': security.split()[0]
+    }
+    values.update(attributes)
+    return TickerSpec(**values)
+
+
+def _build_registry() -> Dict[str, TickerSpec]:
+    """BLOOMBERG_TICKERSから証券属性のレジストリを構築"""
+    registry: Dict[str, TickerSpec] = {}
+
+    def register(spec: TickerSpec):
+        # 複数カテゴリに同一証券がある場合は最初の定義を優先
+        registry.setdefault(spec.security, spec)
+
+    for category, config in BLOOMBERG_TICKERS.items():
+        table = config.get('table')
+        securities = config['securities']
+
+        if table == 'T_CommodityPrice':
+            for security in securities:
+                spec = classify_price_ticker(security, category, config.get('metal', 'COPPER'))
+                register(spec._replace(tenor=config.get('tenor_mapping', {}).get(security)))
+
+        elif table == 'T_LMEInventory':
+            prefix_pattern = re.compile('(' + '|'.join(LME_INVENTORY_DATA_TYPES) + ')')
+            for security in (s for group in securities.values() for s in group):
+                region = next((r for suffix, r in config['region_mapping'].items() if security.endswith(suffix)), 'GLOBAL')
+                prefix = prefix_pattern.search(security)
+                register(_spec(security, category, config, region=region,
+                               data_type=LME_INVENTORY_DATA_TYPES[prefix.group(1)] if prefix else None))
+
+        elif table == 'T_OtherExchangeInventory':
+            for security in securities:
+                register(_spec(security, category, config,
+                               data_type=config.get('type_mapping', {}).get(security, 'total_stock')))
+
+        elif table == 'T_MacroEconomicIndicator':
+            for country, country_securities in securities.items():
+                for security in country_securities:
+                    register(_spec(security, category, config, country=country,
+                                   unit='%' if 'PMI' in security else 'YoY %',
+                                   frequency=_macro_frequency(security)))
+
+        elif table == 'T_COTR':
+            for category_key, sides in securities.items():
+                for side, side_securities in sides.items():
+                    for measure, security in zip(config['measure_order'], side_securities):
+                        register(_spec(security, category, config, metal='COPPER', frequency='Weekly',
+                                       group=config['category_names'][category_key],
+                                       data_type=f"{side.capitalize()}{measure}"))
+
+        elif table == 'T_BandingReport':
+            for report_key, report_securities in securities.items():
+                # 先物バンディングは限月別（M1-M3）の辞書、ワラントバンディングはリスト
+                tenors = report_securities if isinstance(report_securities, dict) else {None: report_securities}
+                for tenor, tenor_securities in tenors.items():
+                    for security in tenor_securities:
+                        # バンド文字は限月指定（M1等）の直前、またはIndexの直前の1文字
+                        band_letter = re.search(r'([A-J])(?:M\d)? Index$', security).group(1)
+                        register(_spec(security, category, config, metal='COPPER',
+                                       data_type=config['report_types'][report_key],
+                                       band=config['band_mapping'][band_letter],
+                                       tenor=_tenor_name(int(tenor.lstrip('M'))) if tenor else None))
+
+        elif table == 'T_MarketIndicator':
+            for security in securities:
+                register(_spec(security, category, config, unit=indicator_unit(security)))
+
+        else:
+            for security in securities:
+                register(_spec(security, category, config))
+
+    return registry
+
+
+# 証券コード -> 属性（インポート時に1回だけ構築。読み取り専用）
+TICKER_REGISTRY: Mapping[str, TickerSpec] = MappingProxyType(_build_registry())
+
+_ticker_frames: Dict[Optional[str], object] = {}
+
+
+@lru_cache(maxsize=DERIVED_SPEC_CACHE_SIZE)
+def _derived_ticker_spec(security: str) -> Optional[TickerSpec]:
+    """設定にない価格ティッカー（実契約等）の属性を導出（判定できない場合はNone）"""
+    spec = classify_price_ticker(security)
+    return spec if spec.data_type is not None else None
+
+
+def get_ticker_spec(security: str) -> Optional[TickerSpec]:
+    """
+    証券属性を取得
+
+    設定にない価格ティッカー（実契約等）は属性を導出する（レジストリには追加せず、件数上限付きでキャッシュ）
+
+    Args:
+        security: 証券コード
+
+    Returns:
+        Optional[TickerSpec]: 証券属性（判定できない場合はNone）
+    """
+    spec = TICKER_REGISTRY.get(security)
+    if spec is None:
+        return _derived_ticker_spec(security)
+    return spec
+
+
+def ticker_frame(category: Optional[str] = None):
+    """
+    レジストリのDataFrameビューを取得（プロセッサでのmerge用）
+
+    Args:
+        category: カテゴリ名（Noneの場合は全証券）
+
+    Returns:
+        pd.DataFrame: 1行1証券の属性テーブル
+    """
+    if category not in _ticker_frames:
+        import pandas as pd
+
+        specs = [spec for spec in TICKER_REGISTRY.values() if category is None or spec.category == category]
+        _ticker_frames[category] = pd.DataFrame(specs, columns=TickerSpec._fields)
+    return _ticker_frames[category]
@@ -0,0 +1,243 @@
+"""
+取引所別営業日カレンダー
+M_TradingCalendarを取引所ごとに1回だけロードしてnumpyのbusdaycalendarに変換し、
+営業日判定・営業日数・営業日加算を日付配列に対してベクトル演算で提供する
+"""
+import os
+import sys
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# プロジェクトルートとsrcディレクトリをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(project_root, 'src')
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from config.logging_config import logger
+
+# カレンダー未登録の取引所・期間は土日のみを非営業日とする（dbo.GetTradingDaysBetweenの簡易計算と同じ）
+WEEKMASK = '1111100'
+WEEKDAY_CALENDAR = np.busdaycalendar(weekmask=WEEKMASK)
+
+
+def _to_days(values: Any) -> np.ndarray:
+    """日付（スカラー・リスト・Series・配列）をdatetime64[D]の1次元配列に変換"""
+    return pd.to_datetime(np.ravel(np.asarray(values, dtype=object))).values.astype('datetime64[D]')
+
+
+def _is_scalar(*values: Any) -> bool:
+    """全ての入力がスカラーか判定"""
+    return all(np.ndim(value) == 0 for value in values)
+
+
+class TradingCalendar:
+    """取引所別営業日カレンダー"""
+
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager
+        self.calendars: Dict[str, np.busdaycalendar] = {}
+        self.loaded = False
+
+    def load(self):
+        """M_TradingCalendarの休日を取引所別にロード（マスタスナップショットがあればそれを使用。なければ1クエリ）"""
+        self.calendars = {}
+        self.loaded = True
+
+        if self.db_manager is None:
+            logger.warning("No database manager for trading calendar, using weekday-only calendar")
+            return
+
+        master_calendar = getattr(self.db_manager, 'master_tables', {}).get('trading_calendar')
+        try:
+            if master_calendar is not None:
+                non_trading = master_calendar[master_calendar['IsTradingDay'] == 0]
+                rows = list(zip(non_trading['ExchangeCode'], non_trading['CalendarDate']))
+            else:
+                rows = self._query_non_trading_days()
+        except Exception as e:
+            logger.warning(f"Failed to load M_TradingCalendar, using weekday-only calendar: {e}")
+            return
+
+        holidays = defaultdict(list)
+        for exchange_code, calendar_date in rows:
+            holidays[exchange_code].append(calendar_date)
+
+        for exchange_code, dates in holidays.items():
+            # 土日は週マスクで除外済みのため、平日の休場日のみを祝日として登録
+            self.calendars[exchange_code] = np.busdaycalendar(
+                weekmask=WEEKMASK, holidays=_to_days(dates)
+            )
+
+        logger.info(f"Loaded trading calendars for {len(self.calendars)} exchanges "
+                    f"({len(rows)} non-trading days)")
+
+    def _query_non_trading_days(self) -> list:
+        """M_TradingCalendarの非営業日を取得"""
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT ExchangeCode, CalendarDate
+                FROM M_TradingCalendar
+                WHERE IsTradingDay = 0
+            """)
+            return cursor.fetchall()
+
+    def calendar(self, exchange: Optional[str]) -> np.busdaycalendar:
+        """
+        取引所のbusdaycalendarを取得
+
+        Args:
+            exchange: 取引所コード（LME/SHFE/CMX）
+
+        Returns:
+            np.busdaycalendar: 営業日カレンダー（未登録の場合は土日のみ除外）
+        """
+        if not self.loaded:
+            self.load()
+        return self.calendars.get(exchange, WEEKDAY_CALENDAR)
+
+    def _by_exchange(self, func, exchange: Any, size: int) -> np.ndarray:
+        """取引所ごとにfunc(mask, busdaycalendar)を適用（取引所が配列の場合）"""
+        if np.ndim(exchange) == 0:
+            return func(slice(None), self.calendar(exchange))
+        if size == 0:
+            return func(slice(None), WEEKDAY_CALENDAR)
+
+        exchanges = np.ravel(np.asarray(exchange, dtype=object))
+        results = None
+        for code in pd.unique(exchanges):
+            mask = exchanges == code
+            values = func(mask, self.calendar(code))
+            if results is None:
+                results = np.empty(size, dtype=values.dtype)
+            results[mask] = values
+        return results
+
+    def is_trading_day(self, dates: Any, exchange: Any):
+        """
+        営業日判定
+
+        Args:
+            dates: 日付（スカラーまたは配列）
+            exchange: 取引所コード（スカラーまたはdatesと同じ長さの配列）
+
+        Returns:
+            np.ndarray: 営業日ならTrue（日付がNaTの場合はFalse）。スカラー入力ではbool
+        """
+        days = _to_days(dates)
+        valid = ~np.isnat(days)
+
+        def compute(mask, busdaycal):
+            subset = days[mask]
+            ok = ~np.isnat(subset)
+            result = np.zeros(len(subset), dtype=bool)
+            result[ok] = np.is_busday(subset[ok], busdaycal=busdaycal)
+            return result
+
+        result = self._by_exchange(compute, exchange, len(days)) & valid
+        return bool(result[0]) if _is_scalar(dates) else result
+
+    def trading_days_between(self, start_dates: Any, end_dates: Any, exchange: Any):
+        """
+        開始日より後、終了日以前の営業日数（dbo.GetTradingDaysBetweenと同じ数え方）
+
+        終了日が開始日より前の場合は負の値を返す
+
+        Args:
+            start_dates: 開始日（スカラーまたは配列）
+            end_dates: 終了日（スカラーまたは配列）
+            exchange: 取引所コード（スカラーまたは配列）
+
+        Returns:
+            np.ndarray: 営業日数（いずれかの日付がNaTの場合はNaN）。スカラー入力ではOptional[int]
+        """
+        starts, ends = np.broadcast_arrays(_to_days(start_dates), _to_days(end_dates))
+        valid = ~(np.isnat(starts) | np.isnat(ends))
+
+        def compute(mask, busdaycal):
+            s, e, ok = starts[mask], ends[mask], valid[mask]
+            result = np.full(len(s), np.nan)
+            s, e = s[ok], e[ok]
+            # (start, end] を数えるため両端を1日ずらして [start+1, end+1) とする（逆順の場合は符号を反転）
+            low, high = np.minimum(s, e), np.maximum(s, e)
+            counts = np.busday_count(low + 1, high + 1, busdaycal=busdaycal)
+            result[ok] = np.where(e < s, -counts, counts)
+            return result
+
+        result = self._by_exchange(compute, exchange, len(starts))
+        if _is_scalar(start_dates, end_dates):
+            return None if np.isnan(result[0]) else int(result[0])
+        return result
+
+    def add_trading_days(self, dates: Any, days: Any, exchange: Any):
+        """
+        N営業日後（負の場合はN営業日前）の日付（dbo.AddTradingDaysと同じく起点日自体は数えない）
+
+        Args:
+            dates: 起点日（スカラーまたは配列）
+            days: 加算する営業日数（スカラーまたは配列）
+            exchange: 取引所コード（スカラーまたは配列）
+
+        Returns:
+            np.ndarray: datetime64[D]の配列（起点日がNaTの場合はNaT）。スカラー入力ではOptional[date]
+        """
+        starts, offsets = np.broadcast_arrays(_to_days(dates), np.ravel(np.asarray(days, dtype=np.int64)))
+        valid = ~np.isnat(starts)
+
+        def compute(mask, busdaycal):
+            s, n, ok = starts[mask], offsets[mask], valid[mask]
+            result = np.full(len(s), np.datetime64('NaT'), dtype='datetime64[D]')
+            # 起点日が休日の場合、加算時は直前の営業日、減算時は直後の営業日を起点にすると
+            # 「起点日の翌営業日から数えてN日目」になる
+            forward = ok & (n >= 0)
+            backward = ok & (n < 0)
+            result[forward] = np.busday_offset(s[forward], n[forward], roll='backward', busdaycal=busdaycal)
+            result[backward] = np.busday_offset(s[backward], n[backward], roll='forward', busdaycal=busdaycal)
+            return result
+
+        result = self._by_exchange(compute, exchange, len(starts))
+        if _is_scalar(dates, days):
+            return None if np.isnat(result[0]) else result[0].astype(date)
+        return result
+
+    def trading_days(self, start_date: Any, end_date: Any, exchange: Optional[str]) -> np.ndarray:
+        """
+        期間内（両端を含む）の営業日の配列
+
+        Args:
+            start_date: 開始日
+            end_date: 終了日
+            exchange: 取引所コード
+
+        Returns:
+            np.ndarray: datetime64[D]の営業日配列
+        """
+        start, end = _to_days(start_date)[0], _to_days(end_date)[0]
+        days = np.arange(start, end + 1, dtype='datetime64[D]')
+        return days[np.is_busday(days, busdaycal=self.calendar(exchange))]
+
+
+_trading_calendar: Optional[TradingCalendar] = None
+
+
+def get_trading_calendar(db_manager=None) -> TradingCalendar:
+    """
+    プロセス共通の営業日カレンダーを取得（初回のみM_TradingCalendarをロード）
+
+    Args:
+        db_manager: DatabaseManager（初回呼び出し時に使用。Noneの場合は土日のみ除外）
+
+    Returns:
+        TradingCalendar: 営業日カレンダー
+    """
+    global _trading_calendar
+    if _trading_calendar is None or (_trading_calendar.db_manager is None and db_manager is not None):
+        _trading_calendar = TradingCalendar(db_manager)
+        _trading_calendar.load()
+    return _trading_calendar
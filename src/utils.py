@@ -1,10 +1,11 @@
 """
 ユーティリティ関数
 """
+from __future__ import annotations
+
 import time
 from functools import wraps
 from typing import Callable, Any
-import pandas as pd
 from datetime import datetime, date, timedelta
 import sys
 import os
@@ -12,11 +13,25 @@ import os
 # プロジェクトルートとsrcディレクトリをPythonパスに追加
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 src_dir = os.path.join(project_root, 'src')
-sys.path.insert(0, project_root)
-sys.path.insert(0, src_dir)
+for path in (project_root, src_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
 from config.logging_config import logger
 from config.database_config import MAX_RETRIES, RETRY_DELAY
+from lazy_import import lazy_import
+
+pd = lazy_import('pandas')
+
+# 取り込みフレームの列型（compact_frame）
+# 行ごとに繰り返されるコード文字列はcategory、マスタIDは32bit・数量は64bitのNULL許容整数、日付はdatetime64
+# 価格・指標値はDB側のDECIMAL(18,4)の有効桁を保つためfloat64のまま
+CATEGORY_COLUMNS = ('security', 'DataType', 'ExchangeCode', 'CountryCode', 'ReportType', 'CompanyTicker', 'Unit')
+INT32_COLUMNS = ('MetalID', 'GenericID', 'ActualContractID', 'IndicatorID', 'RegionID',
+                 'COTRCategoryID', 'TenorTypeID', 'BandID')
+INT64_COLUMNS = ('Volume', 'OpenInterest', 'TotalStock', 'OnWarrant', 'CancelledWarrant',
+                 'Inflow', 'Outflow', 'LongPosition', 'ShortPosition', 'NetPosition')
+DATE_COLUMNS = ('date', 'TradeDate', 'ReportDate')
 
 
 def retry_on_error(max_retries: int = MAX_RETRIES, delay: int = RETRY_DELAY) -> Callable:
@@ -107,27 +122,24 @@ def convert_date_format(date_obj: Any, target_format: str = '%Y%m%d') -> str:
         raise TypeError(f"Unsupported date type: {type(date_obj)}")
         
 
-def get_business_days(start_date: date, end_date: date) -> list[date]:
+def get_business_days(start_date: date, end_date: date, exchange: str = None,
+                      db_manager=None) -> list[date]:
     """
     指定期間の営業日リストを取得
     
     Args:
         start_date: 開始日
         end_date: 終了日
+        exchange: 取引所コード（LME/SHFE/CMX）。M_TradingCalendarの休場日を除外する
+        db_manager: DatabaseManager（カレンダー未ロードの場合に使用。Noneの場合は土日のみ除外）
         
     Returns:
         list[date]: 営業日のリスト
     """
-    business_days = []
-    current_date = start_date
+    from trading_calendar import get_trading_calendar
     
-    while current_date <= end_date:
-        # 土日を除外（0=月曜日, 6=日曜日）
-        if current_date.weekday() < 5:
-            business_days.append(current_date)
-        current_date += timedelta(days=1)
-        
-    return business_days
+    calendar = get_trading_calendar(db_manager)
+    return calendar.trading_days(start_date, end_date, exchange).astype(date).tolist()
     
 
 def chunk_list(lst: list[Any], chunk_size: int) -> list[list[Any]]:
@@ -144,6 +156,61 @@ def chunk_list(lst: list[Any], chunk_size: int) -> list[list[Any]]:
     return [lst[i:i + chunk_size] for i in range(0, len(lst), chunk_size)]
     
 
+def split_date_range(start_date: str, end_date: str, chunk_days: int) -> list[tuple[str, str]]:
+    """
+    期間を指定日数ごとのチャンクに分割
+    
+    Args:
+        start_date: 開始日（YYYYMMDD）
+        end_date: 終了日（YYYYMMDD）
+        chunk_days: チャンクの日数（0以下の場合は分割しない）
+        
+    Returns:
+        list[tuple[str, str]]: (開始日, 終了日) のリスト（YYYYMMDD、両端を含む）
+    """
+    if chunk_days <= 0:
+        return [(start_date, end_date)]
+        
+    start = datetime.strptime(start_date, '%Y%m%d').date()
+    end = datetime.strptime(end_date, '%Y%m%d').date()
+    chunks = []
+    while start <= end:
+        chunk_end = min(start + timedelta(days=chunk_days - 1), end)
+        chunks.append((start.strftime('%Y%m%d'), chunk_end.strftime('%Y%m%d')))
+        start = chunk_end + timedelta(days=1)
+    return chunks
+    
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    取り込みフレームの列をメモリ効率の良い型に変換（Pythonのstr/dateオブジェクトを行ごとに持たない）
+    
+    Args:
+        df: Bloombergの生データまたは処理済みデータ（列を置き換えて返す）
+        
+    Returns:
+        pd.DataFrame: 変換後のデータフレーム
+    """
+    for column in df.columns.intersection(DATE_COLUMNS):
+        df[column] = pd.to_datetime(df[column], errors='coerce')
+    for column in df.columns.intersection(CATEGORY_COLUMNS):
+        df[column] = df[column].astype('category')
+    for column in df.columns.intersection(INT32_COLUMNS):
+        df[column] = _to_nullable_int(df[column], 'Int32')
+    for column in df.columns.intersection(INT64_COLUMNS):
+        df[column] = _to_nullable_int(df[column], 'Int64')
+    return df
+    
+
+def _to_nullable_int(series: pd.Series, dtype: str) -> pd.Series:
+    """NULL許容整数型に変換（小数を含む列は丸めずにfloat64のまま）"""
+    values = pd.to_numeric(series, errors='coerce')
+    if (values.dropna() % 1 != 0).any():
+        return values
+    return values.astype(dtype)
+    
+
+
 def measure_execution_time(func: Callable) -> Callable:
     """
     関数の実行時間を測定するデコレータ